@@ -1,15 +1,24 @@
 from flask import Flask, jsonify, render_template, request
 from flask_socketio import SocketIO
-import pyautogui
-import base64
-from io import BytesIO
 import socket
-from threading import Event
-from models import ModelFactory
+from models import ImageInput, ModelFactory, StreamEvent
+from models import openai_compat, session as http_session
+from blob import BlobChannel
+from encode import TILE_SIZE, submit as submit_encode
+from live import LIVE_FPS, LIVE_MAX_EDGE, LIVE_TILE, LiveView
+from prefetch import Prefetcher
+from preprocess import prepare_encoded
+from store import SCREENSHOT_TTL, ScreenshotStore
+from streaming import GenerationJob, coalesce, negotiate_protocol
+from watch import WATCH_BUDGET, WATCH_MIN_GAP, ScreenWatch
+from worker import start_capture_service
 import os
+import collections
 import json
 import shutil
 import traceback
+import uuid
+import time
 import requests
 import faulthandler
 import signal
@@ -61,12 +70,35 @@ UPDATE_INFO_FILE = _data_file('update_info.json')
 # 提示词：config/prompts.json 是内置种子（保留在仓库），运行副本在 .snapsolver/
 PROMPT_FILE = _data_file('prompts.json', seed=os.path.join(CONFIG_DIR, 'prompts.json'), migrate=False)
 
-# 跟踪用户生成任务的字典
-generation_tasks = {}
+# 合帧预算（毫秒）：两帧最小间隔 / 增量最长滞留，可用环境变量覆盖
+FRAME_INTERVAL = int(os.environ.get('SNAPSOLVER_FRAME_INTERVAL_MS', 50)) / 1000
+FRAME_MAX_DELAY = int(os.environ.get('SNAPSOLVER_FRAME_MAX_DELAY_MS', 150)) / 1000
+
+# 服务端持有的截图原始像素：解题时凭 screenshot_id + crop_rect 在这里裁剪
+screenshot_store = ScreenshotStore(ttl=int(os.environ.get('SNAPSOLVER_SCREENSHOT_TTL', SCREENSHOT_TTL)))
+
+# 单次 request_tiles 最多取多少块（2560x1440 整屏按 512 切共 15 块）
+MAX_TILES_PER_REQUEST = 32
+
+# 生成任务：job_id → GenerationJob（结束后保留一段时间供重连续传）
+generation_jobs = {}
+# 每个 sid 当前挂着的生成任务，stop_generation / stream_ack / resync_stream 从这里取
+active_jobs = {}
+# 旁观设备 sid → 正在同看的生成任务（只收广播，不能停止）
+watching_jobs = {}
+# 开着监视模式的 sid → ScreenWatch 会话
+screen_watches = {}
+# 手机端上传图片的编码统计（最近若干次）：客户端报告的格式 / 体积 / 编码耗时 + 服务端实收字节
+recent_uploads = collections.deque(maxlen=100)
+_UPLOAD_REPORT_KEYS = ('bytes', 'encode_ms', 'mime', 'width', 'height', 'worker')
 
 # 初始化模型工厂
 ModelFactory.initialize()
 
+# 截屏服务：默认在独立进程里截屏与编码（预览、切块、送模型前的预处理、实时画面），原始像素经共享内存交回（SNAPSOLVER_CAPTURE_WORKER=0 关闭）；
+# 截图后端由 SNAPSOLVER_CAPTURE_BACKEND 指定，否则启动时自动挑可用的最快后端
+capture_service = start_capture_service()
+
 def get_local_ip():
     try:
         # Get local IP address
@@ -96,6 +128,20 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    # 生成不随断线中止：任务脱离连接继续跑，帧进重放缓冲等重连续传
+    job = active_jobs.pop(request.sid, None)
+    if job is not None:
+        job.detach(request.sid)
+    job = watching_jobs.pop(request.sid, None)
+    if job is not None:
+        job.unwatch(request.sid)
+    live_view.unsubscribe(request.sid)
+    blob_channel.unbind(sid=request.sid)
+    if prefetcher is not None:
+        prefetcher.unsubscribe(request.sid)
+    watch = screen_watches.pop(request.sid, None)
+    if watch is not None:
+        watch.stop()
     print('Client disconnected')
 
 def create_model_instance(model_id, settings, is_reasoning=False):
@@ -192,29 +238,173 @@ def handle_stop_generation():
     sid = request.sid
     print(f"接收到停止生成请求: {sid}")
     
-    if sid in generation_tasks:
+    job = active_jobs.get(sid)
+    if job is not None and not job.finished:
         # 设置停止标志
-        stop_event = generation_tasks[sid]
-        stop_event.set()
+        job.stop_event.set()
         
-        # 发送已停止状态
-        socketio.emit('ai_response', {
-            'status': 'stopped',
-            'content': '生成已停止'
-        }, room=sid)
+        # 发送已停止状态（经任务通道发出，重连续传时也能补到）
+        job.flow.offer(StreamEvent('stopped', content='生成已停止'))
         
-        print(f"已停止用户 {sid} 的生成任务")
+        print(f"已停止用户 {sid} 的生成任务 {job.job_id}")
     else:
         print(f"未找到用户 {sid} 的生成任务")
 
+@socketio.on('resync_stream')
+def handle_resync_stream(data=None):
+    """v2 客户端发现偏移/校验漂移时请求整段快照"""
+    sid = request.sid
+    job = active_jobs.get(sid) or watching_jobs.get(sid)
+    if job is None:
+        return
+    sent = job.resync(sid)
+    print(f"Debug - 重同步: sid {sid}, 快照帧 {sent} 个")
+
+@socketio.on('stream_ack')
+def handle_stream_ack(data=None):
+    """v2 客户端回报已收到的最大 seq，用于背压统计"""
+    job = active_jobs.get(request.sid)
+    if job is not None and isinstance(data, dict):
+        job.flow.ack(data.get('seq'))
+
+@socketio.on('resume_generation')
+def handle_resume_generation(data=None):
+    """换网重连后按 job_id + last_seq 重新挂上生成任务，只补发错过的帧"""
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    job = generation_jobs.get(data.get('job_id'))
+    if job is None:
+        socketio.emit('ai_response', {'status': 'error', 'error': '生成任务已结束或已过期，请重新解题'}, room=sid)
+        return
+    last_seq = data.get('last_seq')
+    if not isinstance(last_seq, int):
+        last_seq = 0
+    # 同一任务若还挂在别的连接上（旧 sid 未及断开），让旧连接放手
+    if job.sid is not None and job.sid != sid:
+        active_jobs.pop(job.sid, None)
+    active_jobs[sid] = job
+    sent = job.attach(sid, last_seq)
+    print(f"Debug - 续传: job {job.job_id} → sid {sid}, last_seq {last_seq}, 补发 {sent} 帧")
+
+@socketio.on('watch_generation')
+def handle_watch_generation(data=None):
+    """其他设备旁观同一次生成：加入任务房间收广播，不再重复调用模型"""
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    job = generation_jobs.get(data.get('job_id'))
+    if job is None or not job.shareable or job.sid == sid:
+        print(f"Debug - 旁观失败: sid {sid}, job {data.get('job_id')}")
+        return
+    last_seq = data.get('last_seq')
+    if not isinstance(last_seq, int):
+        last_seq = 0
+    previous = watching_jobs.pop(sid, None)
+    if previous is not None and previous is not job:
+        previous.unwatch(sid)
+    watching_jobs[sid] = job
+    sent = job.watch(sid, last_seq)
+    print(f"Debug - 旁观: job {job.job_id} ← sid {sid}, 补发 {sent} 帧, 旁观数 {len(job.viewers)}")
+
+@socketio.on('unwatch_generation')
+def handle_unwatch_generation(data=None):
+    job = watching_jobs.pop(request.sid, None)
+    if job is not None:
+        job.unwatch(request.sid)
+
+def _transport_backlog(sid, namespace='/'):
+    """engine.io 层该连接待发的包数（轮询下是客户端还没取走的包，websocket 下是写线程还没发出的包）"""
+    if sid is None:
+        return 0
+    server = socketio.server
+    eio_sid = server.manager.eio_sid_from_sid(sid, namespace)
+    return server.eio.sockets[eio_sid].queue.qsize()
+
+# 大块二进制（截图预览、原分辨率块）切块走 /blob 命名空间，不堵答案流
+blob_channel = BlobChannel(
+    lambda blob_sid, event, payload: socketio.emit(event, payload, room=blob_sid, namespace='/blob'),
+    backlog=lambda blob_sid: _transport_backlog(blob_sid, '/blob'),
+    spawn=socketio.start_background_task,
+    sleep=socketio.sleep,
+)
+
+@socketio.on('blob_bind', namespace='/blob')
+def handle_blob_bind(data=None):
+    """/blob 连接告知所属的主连接 sid"""
+    sid = data.get('sid') if isinstance(data, dict) else None
+    if isinstance(sid, str) and sid:
+        blob_channel.bind(sid, request.sid)
+
+@socketio.on('blob_ack', namespace='/blob')
+def handle_blob_ack(data=None):
+    if isinstance(data, dict):
+        blob_channel.ack(request.sid, data.get('blob_id'), data.get('index'))
+
+@socketio.on('disconnect', namespace='/blob')
+def handle_blob_disconnect():
+    blob_channel.unbind(blob_sid=request.sid)
+
+# 实时画面：所有订阅连接共用一个采集循环，帧率上限可用环境变量调整
+live_view = LiveView(
+    lambda reset: capture_service.live_sample(LIVE_MAX_EDGE, LIVE_TILE, reset),
+    lambda sid, payload: socketio.emit('live_frame', payload, room=sid),
+    backlog=_transport_backlog,
+    spawn=socketio.start_background_task,
+    fps=float(os.environ.get('SNAPSOLVER_LIVE_FPS', LIVE_FPS)),
+)
+
+# 空闲预取：手机停在首页时备好一帧截图，点截屏时校验画面未变即直接用
+prefetcher = None
+if os.environ.get('SNAPSOLVER_PREFETCH', '1') != '0':
+    prefetcher = Prefetcher(capture_service.fingerprint, capture_service.capture,
+                            spawn=socketio.start_background_task, sleep=socketio.sleep)
+
+def _join_job_room(sid, room):
+    socketio.server.enter_room(sid, room, namespace='/')
+
+def _leave_job_room(sid, room):
+    socketio.server.leave_room(sid, room, namespace='/')
+
+def _new_job(sid, protocol):
+    """登记一次生成任务，顺带清掉已过保留期的旧任务"""
+    now = time.monotonic()
+    for job_id, job in list(generation_jobs.items()):
+        if job.expired(now):
+            del generation_jobs[job_id]
+    # 同一连接改发新题：旧任务（可能还在收尾）不再往这个连接推帧
+    previous = active_jobs.pop(sid, None)
+    if previous is not None:
+        previous.detach(sid)
+    previous = watching_jobs.pop(sid, None)
+    if previous is not None:
+        previous.unwatch(sid)
+    job = GenerationJob(
+        uuid.uuid4().hex,
+        sid,
+        negotiate_protocol(protocol),
+        # 发往房间时按帧编码一次，再分发给房间内每个连接
+        lambda frame, target, skip=None: socketio.emit('ai_response', frame, room=target, skip_sid=skip),
+        backlog=_transport_backlog,
+        join=_join_job_room,
+        leave=_leave_job_room,
+    )
+    generation_jobs[job.job_id] = job
+    active_jobs[sid] = job
+    return job
+
 @socketio.on('analyze_image')
 def handle_analyze_image(data):
-    """事件处理器只做校验与建模，生成循环放后台任务——
+    _start_analysis(request.sid, data)
+
+def _start_analysis(sid, data):
+    """校验与建模，生成循环放后台任务（手动解题与监视模式自动解题共用）——
     threading 模式下处理器占用的是该 WebSocket 连接的服务线程，
     分钟级的生成循环若留在这里会堵死事件下发。"""
-    sid = request.sid
     try:
+        # 新客户端只回传 screenshot_id + crop_rect，由服务端从原图裁剪；
+        # 直接上传图片的（本地图片 / 老客户端）是二进制附件或 base64 字符串，模型层两者都收
         image_data = data.get('image')
+        screenshot_id = data.get('screenshot_id')
+        crop_rect = data.get('crop_rect')
         settings = data.get('settings', {})
 
         reasoning_tier = settings.get('reasoningTier', 'deep')
@@ -222,8 +412,17 @@ def handle_analyze_image(data):
         print(f"Debug - 图像分析请求, 模型: {model_id}, 推理档位: {reasoning_tier}, sid: {sid}")
 
         if not image_data:
-            socketio.emit('ai_response', {'status': 'error', 'error': '图像数据不能为空'}, room=sid)
-            return
+            if not screenshot_id:
+                socketio.emit('ai_response', {'status': 'error', 'error': '图像数据不能为空'}, room=sid)
+                return
+            if screenshot_store.get(screenshot_id) is None:
+                socketio.emit('ai_response', {'status': 'error', 'error': '截图已过期，请重新截图'}, room=sid)
+                return
+
+        if image_data:
+            _record_upload(data.get('upload'), image_data, model_id)
+            # 之后整条链路只传这一个对象：原始字节不复制，各家要的 base64 / data URL 按需生成并缓存
+            image_data = ImageInput(image_data)
 
         # 同题追问历史（可选）：纯文本轮次列表，只取最近 20 条防滥用
         history = data.get('history')
@@ -247,73 +446,306 @@ def handle_analyze_image(data):
                 'https': f"http://{settings.get('proxyHost')}:{settings.get('proxyPort')}"
             }
 
-        # 创建用于停止生成的事件（同 sid 新请求会顶替旧的停止句柄）
-        stop_event = Event()
-        generation_tasks[sid] = stop_event
+        # 登记生成任务（同 sid 新请求会顶替旧任务的停止句柄）；
+        # 下发协议：v2 增量帧 / v1 累计全文（老客户端不带 protocol 字段）
+        job = _new_job(sid, data.get('protocol'))
+        # 先告知 job_id，断线重连后凭它续传
+        socketio.emit('generation_job', {'job_id': job.job_id}, room=sid)
+        # 通知其他已连接设备可以同看（仅 v2 任务，旁观依赖 seq 补发）
+        if job.shareable:
+            socketio.emit('generation_available', {'job_id': job.job_id, 'model': model_id}, skip_sid=sid)
 
-        socketio.start_background_task(_run_image_analysis, model_instance, image_data, proxies, sid, stop_event, history)
+        # 送模型前裁掉空白边距与边缘界面栏（请求带 trim: false 时跳过），再按模型的图片约束缩放编码
+        trim = data.get('trim', True) is not False
+        socketio.start_background_task(
+            _run_image_analysis, model_instance, image_data, proxies, job, history, (screenshot_id, crop_rect), trim,
+            ModelFactory.get_image_constraints(model_id)
+        )
 
     except Exception as e:
         print(f"Error in analyze_image: {str(e)}")
         traceback.print_exc()
         socketio.emit('ai_response', {'status': 'error', 'error': f'分析图像时出错: {str(e)}'}, room=sid)
 
-def _run_image_analysis(model_instance, image_data, proxies, sid, stop_event, history=None):
-    """后台任务：消费模型流式生成器并逐事件下发"""
+def _record_upload(report, image_data, model_id):
+    """记一次上传：客户端报告的编码结果（只收标量字段）与服务端实收大小"""
+    report = report if isinstance(report, dict) else {}
+    entry = {k: report[k] for k in _UPLOAD_REPORT_KEYS if isinstance(report.get(k), (int, float, str, bool))}
+    entry.update({
+        'model': model_id,
+        'received_bytes': len(image_data),
+        'base64': isinstance(image_data, str),
+        'time': time.time(),
+    })
+    recent_uploads.append(entry)
+    print(f"Debug - 上传图片 {entry['received_bytes']} 字节, 客户端编码 {entry.get('mime', '未报告')} "
+          f"{entry.get('encode_ms', '-')} ms{'（Worker）' if entry.get('worker') else ''}")
+
+def _prepare_image(image_data, crop, trim, constraints):
+    """得到送模型的图片：image_data（上传的 ImageInput）为空时按 crop = (screenshot_id, crop_rect)
+    从服务端截图裁剪；trim 时检测题目区域、裁掉空白，再按模型的图片约束缩放编码（截图的这一步在截屏进程里做）。
+    返回 (ImageInput, TrimResult 或 None)，截图过期抛 KeyError"""
+    if image_data:
+        raw = image_data.tobytes()
+        try:
+            data, result, encoded = prepare_encoded(raw, trim, constraints)
+        except OSError as e:
+            # PIL 认不出的格式原样交给模型层，由接口决定收不收
+            print(f"Debug - 图片预处理跳过: {e}")
+            return image_data, None
+        if data is raw:
+            # 没裁也没超约束：沿用原对象（老客户端的 base64 已缓存在上面）
+            return image_data, result
+    else:
+        data, result, encoded = screenshot_store.prepare(*crop, trim, constraints)
+        print(f"Debug - 服务端裁剪: {crop[1]}")
+    if encoded is not None:
+        print(f"Debug - 按模型约束编码 {constraints}: {encoded.stats()}")
+    return ImageInput(data), result
+
+def _run_image_analysis(model_instance, image_data, proxies, job, history=None, crop=None, trim=True, constraints=None):
+    """后台任务：消费模型流式生成器并逐事件下发（经任务通道，断线期间进重放缓冲）"""
+    flow, stop_event = job.flow, job.stop_event
     try:
+        try:
+            image_data, trimmed = _prepare_image(image_data, crop, trim, constraints or {})
+        except KeyError:
+            flow.offer(StreamEvent('error', error='截图已过期，请重新截图'))
+            return
+        if trimmed is not None:
+            stats = trimmed.stats()
+            print(f"Debug - 题目区域检测: {stats}")
+            if job.sid is not None:
+                socketio.emit('image_trimmed', {'job_id': job.job_id, **stats}, room=job.sid)
         sent = 0
         last_status = None
-        for response in model_instance.analyze_image(image_data, proxies=proxies, history=history):
+        events = model_instance.analyze_image(image_data, proxies=proxies, history=history)
+        # 各家只吐原始增量，统一在这里按帧预算合帧
+        for response in coalesce(events, FRAME_INTERVAL, FRAME_MAX_DELAY, stop_event):
             # 检查是否收到停止信号
             if stop_event.is_set():
-                print(f"分析图像生成被用户 {sid} 停止")
+                print(f"分析图像生成任务 {job.job_id} 被停止")
                 break
 
             # 思考事件命名归一后再发出
-            status = response.get('status')
-            if status in _STATUS_ALIASES:
-                response['status'] = _STATUS_ALIASES[status]
-            socketio.emit('ai_response', response, room=sid)
+            if response.status in _STATUS_ALIASES:
+                response.status = _STATUS_ALIASES[response.status]
+            # 经背压通道下发：客户端跟不上时中间增量会被合并暂扣
+            sent += flow.offer(response)
             socketio.sleep(0)  # 让出调度，保证写线程及时刷出
-            sent += 1
-            last_status = response.get('status')
-        print(f"Debug - 图像分析结束: 发送 {sent} 个事件, 末状态 {last_status}")
+            last_status = response.status
+        print(f"Debug - 图像分析结束: job {job.job_id}, 发送 {sent} 个事件, 末状态 {last_status}, 背压 {flow.stats()}")
     except Exception as e:
         print(f"Error in image analysis task: {str(e)}")
         traceback.print_exc()
-        socketio.emit('ai_response', {'status': 'error', 'error': f'分析图像时出错: {str(e)}'}, room=sid)
+        flow.offer(StreamEvent('error', error=f'分析图像时出错: {str(e)}'))
     finally:
-        # 清理任务（仅当仍是本次的停止句柄时）
-        if generation_tasks.get(sid) is stop_event:
-            del generation_tasks[sid]
+        # 任务保留 JOB_TTL 供重连续传，过期后在下次登记任务时清理
+        job.finish()
 
-@socketio.on('capture_screenshot')
-def handle_capture_screenshot(data):
+def capture_screenshot(monitor=None, region=None):
+    """截取第 monitor 个显示器（缺省主屏）或其中记住的区域（在编码池线程里调用，实际截屏与预览编码在截屏进程），
+    原始像素存入截图存储（工作进程下为共享内存映射，淘汰时归还槽位）。
+    有与当前画面一致的预取帧时直接用。
+    返回 (screenshot_id, 原图尺寸, 预览 EncodedImage, 截图在该显示器内的左上角)"""
+    start = time.perf_counter()
+    frame = prefetcher.take(monitor, region) if prefetcher is not None else None
+    source = '预取' if frame is not None else '现截'
+    if frame is None:
+        frame = capture_service.capture(monitor, region)
+    size = frame.image.size
+    screenshot_id = screenshot_store.put(frame)
+    print(f"DEBUG: 截图完成（{source}，{(time.perf_counter() - start) * 1000:.0f} ms）"
+          f"{capture_service.backend_name} 截屏 {frame.capture_ms:.0f} ms, 显示器 {monitor or 1} "
+          f"区域 {frame.origin}+{size}, dhash {frame.dhash:016x}, 预览 {frame.preview.stats()}")
+    return screenshot_id, size, frame.preview, frame.origin
+
+def _emit_screenshot(sid, future):
+    """编码池任务完成回调：预览原始字节直接作为 Socket.IO 二进制附件下发，
+    附原图尺寸与切块边长，客户端放大时再按 request_tiles 取原分辨率块"""
     try:
-        # 添加调试信息
-        print("DEBUG: 执行capture_screenshot截图")
-        
-        # Capture the screen
-        screenshot = pyautogui.screenshot()
-        
-        # Convert the image to base64 string
-        buffered = BytesIO()
-        screenshot.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-        
-        # Emit the screenshot back to the client，不打印base64数据
-        print("DEBUG: 完成capture_screenshot截图，图片大小: {} KB".format(len(img_str) // 1024))
-        socketio.emit('screenshot_complete', {
+        screenshot_id, (width, height), preview, (left, top) = future.result()
+        socketio.emit('screenshot_complete', blob_channel.attach(sid, {
             'success': True,
-            'image': img_str
-        }, room=request.sid)
+            'screenshot_id': screenshot_id,
+            'mime': preview.mime,
+            'width': width,
+            'height': height,
+            'tile_size': TILE_SIZE,
+            'origin': {'x': left, 'y': top},
+            'encode': preview.stats()
+        }, preview.data), room=sid)
     except Exception as e:
         error_msg = f"Screenshot error: {str(e)}"
         print(f"Error capturing screenshot: {error_msg}")
         socketio.emit('screenshot_complete', {
             'success': False,
             'error': error_msg
-        }, room=request.sid)
+        }, room=sid)
+
+def _capture_target(data):
+    """客户端截屏范围 {monitor, region} → (显示器序号或 None, 区域 dict 或 None)"""
+    data = data if isinstance(data, dict) else {}
+    monitor = data.get('monitor')
+    monitor = monitor if isinstance(monitor, int) and monitor > 0 else None
+    region = data.get('region') if isinstance(data.get('region'), dict) else None
+    return monitor, region
+
+@socketio.on('capture_screenshot')
+def handle_capture_screenshot(data):
+    # 截屏与编码都交给编码池，处理器线程立即返回
+    # data 可带 monitor（显示器序号，见 /api/monitors）与 region（该显示器内的 {x, y, width, height}）
+    sid = request.sid
+    monitor, region = _capture_target(data)
+    print("DEBUG: 执行capture_screenshot截图")
+    future = submit_encode(capture_screenshot, monitor, region)
+    future.add_done_callback(lambda f: _emit_screenshot(sid, f))
+
+@socketio.on('capture_and_solve')
+def handle_capture_and_solve(data=None):
+    """一键解题：截屏 → 按手机记住的裁剪框（截图像素坐标）裁剪 → 预处理 → 解题，图片不经手机。
+    data: {capture: {monitor, region}, crop_rect, settings, trim, protocol}"""
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    monitor, region = _capture_target(data.get('capture'))
+    crop_rect = data.get('crop_rect') if isinstance(data.get('crop_rect'), dict) else None
+
+    def run():
+        try:
+            screenshot_id, (width, height), _, _ = capture_screenshot(monitor, region)
+        except Exception as e:
+            print(f"Error capturing screenshot: {e}")
+            socketio.emit('ai_response', {'status': 'error', 'error': f'截图失败: {str(e)}'}, room=sid)
+            return
+        # 只回引用与尺寸，重解 / 追问凭它从同一张截图裁剪
+        socketio.emit('capture_and_solve_started', {
+            'screenshot_id': screenshot_id,
+            'crop_rect': crop_rect,
+            'width': width,
+            'height': height,
+        }, room=sid)
+        _start_analysis(sid, {
+            'settings': data.get('settings') or {},
+            'protocol': data.get('protocol'),
+            'trim': data.get('trim', True),
+            'screenshot_id': screenshot_id,
+            'crop_rect': crop_rect,
+        })
+
+    print(f"DEBUG: 一键解题, 显示器 {monitor or 1}, 区域 {region}, 裁剪框 {crop_rect}")
+    submit_encode(run)
+
+def _send_tiles(sid, screenshot_id, tiles):
+    """编码池任务：逐块编码（截屏进程里做，按块缓存）并下发原分辨率块"""
+    for col, row in tiles:
+        try:
+            result = screenshot_store.tile(screenshot_id, col, row, TILE_SIZE)
+        except KeyError:
+            socketio.emit('screenshot_tile', {'screenshot_id': screenshot_id, 'error': '截图已过期'}, room=sid)
+            return
+        if result is None:
+            continue
+        (left, top, right, bottom), encoded = result
+        socketio.emit('screenshot_tile', blob_channel.attach(sid, {
+            'screenshot_id': screenshot_id,
+            'col': col,
+            'row': row,
+            'x': left,
+            'y': top,
+            'width': right - left,
+            'height': bottom - top,
+            'mime': encoded.mime
+        }, encoded.data), room=sid)
+
+@socketio.on('live_start')
+def handle_live_start(data=None):
+    """开启实时画面：共享采集循环按块比对，只下发变化的块（首帧为全量）"""
+    live_view.subscribe(request.sid)
+    print(f"Debug - 实时画面订阅: {request.sid}, {live_view.stats()['fps']} fps")
+
+@socketio.on('live_stop')
+def handle_live_stop(data=None):
+    live_view.unsubscribe(request.sid)
+
+@socketio.on('prefetch_start')
+def handle_prefetch_start(data=None):
+    """手机回到首页（空闲）：按 data 的截屏范围 {monitor, region} 预取"""
+    if prefetcher is not None:
+        prefetcher.subscribe(request.sid, *_capture_target(data))
+
+@socketio.on('prefetch_stop')
+def handle_prefetch_stop(data=None):
+    if prefetcher is not None:
+        prefetcher.unsubscribe(request.sid)
+
+@socketio.on('screen_watch_start')
+def handle_screen_watch_start(data=None):
+    """开启监视模式：画面实质变化且稳定后自动截图，按开启时带来的设置发起解题。
+    data: {settings, capture: {monitor, region}, trim, protocol, budget, min_gap}"""
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    monitor, region = _capture_target(data.get('capture'))
+    request_data = {
+        'settings': data.get('settings') or {},
+        'protocol': data.get('protocol'),
+        'trim': data.get('trim', True),
+    }
+
+    def trigger():
+        screenshot_id, (width, height), preview, (left, top) = capture_screenshot(monitor, region)
+        # 先把预览发给手机当题目缩略图，再发起解题（随后照常收到 generation_job / ai_response）
+        socketio.emit('screen_watch_triggered', blob_channel.attach(sid, {
+            'screenshot_id': screenshot_id,
+            'mime': preview.mime,
+            'width': width,
+            'height': height,
+            'tile_size': TILE_SIZE,
+            'origin': {'x': left, 'y': top},
+        }, preview.data), room=sid)
+        _start_analysis(sid, dict(request_data, screenshot_id=screenshot_id))
+
+    def busy():
+        job = active_jobs.get(sid)
+        return job is not None and not job.finished
+
+    previous = screen_watches.pop(sid, None)
+    if previous is not None:
+        previous.stop()
+    try:
+        budget = int(data.get('budget') or WATCH_BUDGET)
+        min_gap = float(data.get('min_gap') or WATCH_MIN_GAP)
+    except (TypeError, ValueError):
+        budget, min_gap = WATCH_BUDGET, WATCH_MIN_GAP
+    watch = ScreenWatch(
+        lambda: capture_service.fingerprint(monitor, region),
+        trigger,
+        busy,
+        lambda status: socketio.emit('screen_watch_status', status, room=sid),
+        spawn=socketio.start_background_task,
+        sleep=socketio.sleep,
+        budget=budget,
+        min_gap=min_gap,
+    )
+    screen_watches[sid] = watch
+    watch.start()
+    print(f"Debug - 监视模式开启: {sid}, 显示器 {monitor or 1}, 区域 {region}, 预算 {watch.budget} 题")
+
+@socketio.on('screen_watch_stop')
+def handle_screen_watch_stop(data=None):
+    watch = screen_watches.pop(request.sid, None)
+    if watch is not None:
+        watch.stop()
+
+@socketio.on('request_tiles')
+def handle_request_tiles(data=None):
+    """客户端放大/框选到预览不够清晰的区域时，按 [[col, row], ...] 取原分辨率块"""
+    data = data if isinstance(data, dict) else {}
+    tiles = []
+    for tile in (data.get('tiles') or [])[:MAX_TILES_PER_REQUEST]:
+        if isinstance(tile, (list, tuple)) and len(tile) == 2 and all(isinstance(v, int) for v in tile):
+            tiles.append(tuple(tile))
+    if tiles:
+        submit_encode(_send_tiles, request.sid, data.get('screenshot_id'), tiles)
 
 def load_model_config():
     """加载模型配置信息"""
@@ -487,6 +919,52 @@ def compare_versions(version1, version2):
         # 如果解析出错，默认不更新
         return False
 
+@app.route('/api/stream-stats', methods=['GET'])
+def get_stream_stats():
+    """各生成任务的下发队列深度（在途帧/字节、engine.io 待发包、暂存增量、旁观端落后次数）"""
+    return jsonify({
+        job_id: {'sid': job.sid, 'finished': job.finished, 'viewers': len(job.viewers),
+                 'viewer_stalls': job.viewer_stalls, **job.flow.stats()}
+        for job_id, job in list(generation_jobs.items())
+    })
+
+@app.route('/api/upload-stats', methods=['GET'])
+def get_upload_stats():
+    """手机端上传图片的体积与编码耗时（最近若干次及均值）"""
+    uploads = list(recent_uploads)
+    timed = [u['encode_ms'] for u in uploads if isinstance(u.get('encode_ms'), (int, float))]
+    return jsonify({
+        'count': len(uploads),
+        'avg_bytes': round(sum(u['received_bytes'] for u in uploads) / len(uploads)) if uploads else 0,
+        'avg_encode_ms': round(sum(timed) / len(timed), 1) if timed else None,
+        'recent': uploads[-20:],
+    })
+
+@app.route('/api/blob-stats', methods=['GET'])
+def get_blob_stats():
+    """分块传输：已发完 / 超时放弃的数量与各连接排队中的传输"""
+    return jsonify(blob_channel.stats())
+
+@app.route('/api/http-stats', methods=['GET'])
+def get_http_stats():
+    """模型服务的共享连接：直连 HTTP 的连接池占用，与缓存的 OpenAI 兼容客户端"""
+    return jsonify({**http_session.stats(), **openai_compat.stats()})
+
+@app.route('/api/prefetch-stats', methods=['GET'])
+def get_prefetch_stats():
+    """空闲预取的命中 / 未命中次数与各截屏范围的备帧状态"""
+    return jsonify(prefetcher.stats() if prefetcher is not None else {'enabled': False})
+
+@app.route('/api/monitors', methods=['GET'])
+def api_monitors():
+    """主机各显示器的几何，供手机端选择截哪块屏幕"""
+    try:
+        # 在编码池线程里查询：进程内截屏时 mss 的显示连接按线程建立，池线程常驻可复用
+        monitors = submit_encode(capture_service.monitors).result(timeout=10)
+        return jsonify({'backend': capture_service.backend_name, 'monitors': monitors})
+    except Exception as e:
+        return jsonify({'error': f'获取显示器信息失败: {str(e)}'}), 500
+
 @app.route('/api/check-update', methods=['GET'])
 def api_check_update():
     """检查更新的API端点"""
@@ -643,7 +1121,9 @@ def api_models():
                 'version': model_info.get('version', 'latest'),
                 'reasoning_tiers': model_info.get('reasoningTiers', ['fast', 'deep', 'max'] if is_reasoning else ['fast']),
                 'default_tier': model_info.get('defaultTier', 'deep' if is_reasoning else 'fast'),
-                'provider': model_info.get('provider', '')
+                'provider': model_info.get('provider', ''),
+                # 手机端据此缩放、编码要上传的裁剪图
+                'image_constraints': ModelFactory.get_image_constraints(model_id)
             })
         
         # 返回模型列表
@@ -0,0 +1,174 @@
+"""流式累积微基准：全文缓冲用 += 还是 StreamAccumulator
+
+合成一条 100k token 的推理流（前 30% 思考、后 70% 正文，token 2~6 字符、中英混排），统计 CPU 时间与 tracemalloc 峰值。
+第一组按各家 provider 生成器的形状跑，由消费端逐个取走事件：
+  “旧（事件持有全文）”复现合帧改造前的写法：事件里带着累计全文，在途事件引用着缓冲区，
+  CPython 的原地 += 优化失效，每片都整段拷贝；合帧改造后事件只带增量，局部变量 += 重新可以原地拼接。
+第二组是下发端挂在对象上的流状态（streaming._StreamState）：属性上的 += 永远享受不到原地拼接。
+
+用法：
+  python benchmarks/bench_accumulator.py
+  python benchmarks/bench_accumulator.py --tokens 200000 --repeat 5
+"""
+import argparse
+import collections
+import importlib.util
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+# 不执行 models/__init__（会连带导入各家 SDK，基准用不到）：登记一个只带路径的空包，
+# base.py 的相对导入（.image）照常解析
+_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+_package = types.ModuleType('models')
+_package.__path__ = [_MODELS_DIR]
+sys.modules.setdefault('models', _package)
+base = importlib.import_module('models.base')
+StreamAccumulator, StreamEvent = base.StreamAccumulator, base.StreamEvent
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz 的是了在和有求解设因此所以'
+
+
+def build_tokens(n: int) -> list:
+    rng = random.Random(3)
+    return [''.join(rng.choice(ALPHABET) for _ in range(rng.randint(2, 6))) for _ in range(n)]
+
+
+def legacy_stream(tokens, split):
+    thinking_buffer = ""
+    response_buffer = ""
+    yield {"status": "started"}
+    for i, token in enumerate(tokens):
+        if i < split:
+            thinking_buffer += token
+            yield {"status": "thinking", "delta": token}
+        else:
+            response_buffer += token
+            yield {"status": "streaming", "delta": token}
+    yield {"status": "thinking_complete", "content": thinking_buffer}
+    yield {"status": "completed", "content": response_buffer}
+
+
+def legacy_snapshot_stream(tokens, split):
+    thinking_buffer = ""
+    response_buffer = ""
+    yield {"status": "started"}
+    for i, token in enumerate(tokens):
+        if i < split:
+            thinking_buffer += token
+            yield {"status": "thinking", "content": thinking_buffer}
+        else:
+            response_buffer += token
+            yield {"status": "streaming", "content": response_buffer}
+    yield {"status": "thinking_complete", "content": thinking_buffer}
+    yield {"status": "completed", "content": response_buffer}
+
+
+def local_event_stream(tokens, split):
+    thinking_buffer = ""
+    response_buffer = ""
+    yield StreamEvent("started")
+    for i, token in enumerate(tokens):
+        if i < split:
+            thinking_buffer += token
+            yield StreamEvent("thinking", token)
+        else:
+            response_buffer += token
+            yield StreamEvent("streaming", token)
+    yield StreamEvent("thinking_complete", None, thinking_buffer)
+    yield StreamEvent("completed", None, response_buffer)
+
+
+def accumulator_stream(tokens, split):
+    thinking = StreamAccumulator()
+    answer = StreamAccumulator()
+    yield StreamEvent("started")
+    for i, token in enumerate(tokens):
+        if i < split:
+            yield thinking.push("thinking", token)
+        else:
+            yield answer.push("streaming", token)
+    yield thinking.complete("thinking_complete")
+    yield answer.complete("completed")
+
+
+class AttrState:
+    __slots__ = ('text',)
+
+    def __init__(self):
+        self.text = ''
+
+    def append(self, delta):
+        self.text += delta
+
+
+class AccumulatorState:
+    __slots__ = ('_text',)
+
+    def __init__(self):
+        self._text = StreamAccumulator()
+
+    def append(self, delta):
+        self._text.append(delta)
+
+
+def state_feed(cls):
+    def feed(tokens, split):
+        state = cls()
+        for token in tokens:
+            state.append(token)
+        return ()
+    return feed
+
+
+def consume(stream, inflight: int):
+    """消费端：保留最近 inflight 个事件，模拟合帧队列/写队列里的在途事件"""
+    window = collections.deque(maxlen=inflight)
+    for event in stream:
+        window.append(event)
+    return window
+
+
+def run(fn, tokens, split, inflight, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        consume(fn(tokens, split), inflight)
+        best = min(best, time.process_time() - start)
+    tracemalloc.start()
+    consume(fn(tokens, split), inflight)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, default=100_000, help='token 数')
+    parser.add_argument('--inflight', type=int, default=8, help='消费端在途事件数')
+    parser.add_argument('--repeat', type=int, default=3, help='CPU 计时重复次数，取最快')
+    args = parser.parse_args()
+
+    tokens = build_tokens(args.tokens)
+    split = int(len(tokens) * 0.3)
+    chars = sum(map(len, tokens))
+    print(f"合成流 {len(tokens)} token / {chars} 字符, 在途事件 {args.inflight}")
+    print(f"  {'写法':<28}{'CPU(ms)':>10}{'峰值内存(KB)':>16}")
+    cases = [
+        ('provider：+= + dict', legacy_stream),
+        ('provider（事件持有全文）', legacy_snapshot_stream),
+        ('provider：+= + StreamEvent', local_event_stream),
+        ('provider：StreamAccumulator', accumulator_stream),
+        ('流状态：属性 +=', state_feed(AttrState)),
+        ('流状态：StreamAccumulator', state_feed(AccumulatorState)),
+    ]
+    for name, fn in cases:
+        cpu, peak = run(fn, tokens, split, args.inflight, args.repeat)
+        print(f"  {name:<28}{cpu * 1000:>10.1f}{peak / 1024:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
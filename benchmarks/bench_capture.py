@@ -0,0 +1,86 @@
+"""截图后端对比：每个后端的截屏耗时与编码耗时
+
+逐个后端截 n 帧（先丢弃 warmup 帧，排除首次建立显示连接的开销），
+截屏按墙钟计时（X11 / GDI 取图大部分时间不在本进程 CPU 上）；
+编码同时列出 RGB PNG 默认参数（旧路径）与 encode.encode_image 按内容选格式（新路径）。
+无显示环境下只有 synthetic 可用，可用 SNAPSOLVER_SYNTHETIC_SIZE 调整合成画面尺寸。
+
+用法：
+  python benchmarks/bench_capture.py                      # 当前环境下所有可用后端
+  python benchmarks/bench_capture.py --backend mss -n 50
+  DISPLAY= python benchmarks/bench_capture.py             # 无头：只跑 synthetic
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capture import BACKENDS, available_backends  # noqa: E402
+from encode import encode_image  # noqa: E402
+
+
+def encode_png(img) -> bytes:
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run(name, n, warmup):
+    backend = BACKENDS[name]()
+    try:
+        for _ in range(warmup):
+            backend.grab()
+        capture_ms, encode_ms, sizes, adaptive_ms, adaptive_sizes = [], [], [], [], []
+        img = encoded = None
+        for _ in range(n):
+            start = time.perf_counter()
+            img = backend.grab()
+            capture_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            png = encode_png(img)
+            encode_ms.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(png))
+            encoded = encode_image(img)
+            adaptive_ms.append(encoded.encode_ms)
+            adaptive_sizes.append(len(encoded.data))
+        return img.size, capture_ms, encode_ms, sizes, adaptive_ms, adaptive_sizes, encoded.format
+    finally:
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', choices=sorted(BACKENDS), help='只测指定后端，可重复')
+    parser.add_argument('-n', type=int, default=20, help='每个后端的计时帧数')
+    parser.add_argument('--warmup', type=int, default=2, help='丢弃的预热帧数')
+    args = parser.parse_args()
+
+    names = args.backend or available_backends()
+    print(f"可用后端: {', '.join(available_backends()) or '无'}；每个后端 {args.n} 帧")
+    print(f"  {'后端':<12}{'尺寸':>12}{'截屏 p50/p95(ms)':>20}{'PNG p50/p95(ms)':>20}{'PNG(KB)':>10}"
+          f"{'自适应格式':>12}{'p50/p95(ms)':>16}{'KB':>8}")
+    for name in names:
+        try:
+            size, capture_ms, encode_ms, sizes, adaptive_ms, adaptive_sizes, fmt = run(name, args.n, args.warmup)
+        except Exception as e:
+            print(f"  {name:<12}失败: {e}")
+            continue
+        print(f"  {name:<12}{'%dx%d' % size:>12}"
+              f"{statistics.median(capture_ms):>12.1f} / {percentile(capture_ms, 0.95):<6.1f}"
+              f"{statistics.median(encode_ms):>12.1f} / {percentile(encode_ms, 0.95):<6.1f}"
+              f"{statistics.mean(sizes) / 1024:>10.0f}"
+              f"{fmt:>12}{statistics.median(adaptive_ms):>9.1f} / {percentile(adaptive_ms, 0.95):<6.1f}"
+              f"{statistics.mean(adaptive_sizes) / 1024:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""模型请求的首字节时间：每次新建连接（旧的 requests.post）vs 共享 keep-alive Session
+
+连续发若干次 POST，记录从发起到收到响应头（首字节）的耗时：
+  - cold：模块级 requests.post，每次新建 Session，重新握 TCP（+ TLS）
+  - warm：models/session.py 的共享 Session，第一次建连之后复用
+默认在本地起一个 HTTP 服务，接受每个新连接前先等 --rtt 毫秒，模拟跨境线路的握手开销；
+也可以用 --url 直接打真实地址（例如中转服务的 /v1/models，返回什么状态码都不影响计时）。
+
+用法：
+  python benchmarks/bench_http_ttfb.py
+  python benchmarks/bench_http_ttfb.py --rtt 150 --requests 20
+  python benchmarks/bench_http_ttfb.py --url https://api.anthropic.com/v1/messages
+"""
+import argparse
+import http.server
+import importlib.util
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+# 直接按路径加载：models/__init__ 会连带导入各家 SDK，基准用不到
+_SESSION_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'session.py')
+_spec = importlib.util.spec_from_file_location('session', _SESSION_PATH)
+session = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(session)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'     # 支持 keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _local_server(rtt_ms: float) -> str:
+    class Server(http.server.ThreadingHTTPServer):
+        daemon_threads = True
+
+        def get_request(self):
+            conn = super().get_request()
+            time.sleep(rtt_ms / 1000)    # 新连接的握手开销；复用连接不再付
+            return conn
+
+    server = Server(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}/v1/messages'
+
+
+def _ttfb(post, url: str) -> float:
+    start = time.perf_counter()
+    response = post(url, json={'model': 'bench', 'max_tokens': 1}, stream=True, timeout=session.TIMEOUT)
+    elapsed = time.perf_counter() - start
+    response.content    # 读完响应体，连接才回到池里（直接 close 会丢弃连接）
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='真实的请求地址（不填则用本地模拟服务）')
+    parser.add_argument('--rtt', type=float, default=80, help='本地服务每个新连接的握手延迟（毫秒）')
+    parser.add_argument('--requests', type=int, default=10, help='每种方式的请求次数')
+    args = parser.parse_args()
+
+    url = args.url or _local_server(args.rtt)
+    print(f"目标 {url}，每种方式 {args.requests} 次" + ('' if args.url else f"，新连接握手 {args.rtt:g} ms"))
+    print(f"  {'方式':<8}{'首次 ms':>10}{'之后中位 ms':>14}{'之后 p90 ms':>14}")
+    for name, post in (('cold', requests.post), ('warm', session.post)):
+        samples = [_ttfb(post, url) for _ in range(args.requests)]
+        rest = sorted(samples[1:]) or samples
+        p90 = rest[min(len(rest) - 1, int(len(rest) * 0.9))]
+        print(f"  {name:<8}{samples[0]:>10.1f}{statistics.median(rest):>14.1f}{p90:>14.1f}")
+    session.reset()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""送模型请求体的内存峰值：旧的 base64 文本 + json= 整体序列化 vs ImageInput + JsonBody 流式发送
+
+模拟一次带图请求从收到图片到请求体写完的过程（写到丢弃一切的假连接，按 http.client 的
+8 KB blocksize 读取），每种路径在独立子进程里跑，记录：
+  - 峰值 RSS 抬升（ru_maxrss 在请求前后的差；准备测试数据时的峰值已计入“前”，故偏保守）
+  - Python 分配峰值（tracemalloc）
+  - 耗时
+旧路径按改动前的实现复刻：老客户端传 base64 文本 → data URL f-string → json.dumps → encode；
+二进制上传的旧路径多一步 b64encode。
+
+用法：
+  python benchmarks/bench_image_payload.py
+  python benchmarks/bench_image_payload.py --size-mb 8 --kind data_url
+"""
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# 直接按路径加载：models/__init__ 会连带导入各家 SDK，基准用不到
+_IMAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'image.py')
+_spec = importlib.util.spec_from_file_location('image', _IMAGE_PATH)
+image = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(image)
+
+BLOCKSIZE = 8192
+
+
+def _peak_kb() -> int:
+    try:
+        import resource
+    except ImportError:    # Windows 没有 ru_maxrss，只看 tracemalloc
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _payload(part, kind: str) -> dict:
+    source = {'type': 'base64', 'media_type': 'image/png', 'data': part} if kind == 'base64' else None
+    content = {'type': 'image', 'source': source} if source else {'type': 'image_url', 'image_url': {'url': part}}
+    return {
+        'model': 'bench', 'stream': True, 'max_tokens': 8192,
+        'messages': [{'role': 'user', 'content': [content, {'type': 'text', 'text': '请分析这个问题'}]}],
+    }
+
+
+def legacy(raw, kind: str, binary: bool) -> int:
+    b64 = base64.b64encode(raw).decode('ascii') if binary else raw
+    part = b64 if kind == 'base64' else f'data:image/png;base64,{b64}'
+    body = json.dumps(_payload(part, kind)).encode('utf-8')
+    sent = 0
+    for i in range(0, len(body), BLOCKSIZE):
+        sent += len(body[i:i + BLOCKSIZE])
+    return sent
+
+
+def streaming(raw, kind: str, binary: bool) -> int:
+    img = image.ImageInput(raw)
+    part = img.base64_part() if kind == 'base64' else img.data_url_part()
+    body = image.JsonBody(_payload(part, kind))
+    sent = 0
+    while True:
+        block = body.read(BLOCKSIZE)
+        if not block:
+            break
+        sent += len(block)
+    return sent
+
+
+def child(args) -> None:
+    raw = os.urandom(int(args.size_mb * 1024 * 1024))
+    if not args.binary:
+        raw = base64.b64encode(raw).decode('ascii')   # 老客户端：socket 收到的就是 base64 文本
+    fn = legacy if args.variant == 'legacy' else streaming
+    before = _peak_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    sent = fn(raw, args.kind, args.binary)
+    elapsed = time.perf_counter() - start
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({'sent': sent, 'rss_kb': _peak_kb() - before, 'traced_kb': traced // 1024, 'ms': elapsed * 1000}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=4, help='原始图片大小（MB）')
+    parser.add_argument('--kind', choices=('base64', 'data_url'), default='base64',
+                        help='图片字段形式：Anthropic 风格 base64 / OpenAI 风格 data URL')
+    parser.add_argument('--variant', choices=('legacy', 'streaming'), help=argparse.SUPPRESS)
+    parser.add_argument('--binary', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.variant:
+        child(args)
+        return
+
+    print(f"图片 {args.size_mb:g} MB, 字段 {args.kind}, 请求体按 {BLOCKSIZE} 字节块写出")
+    print(f"  {'上传形式':<10}{'路径':<12}{'请求体 KB':>12}{'峰值 RSS 抬升 KB':>18}{'Python 峰值 KB':>16}{'耗时 ms':>10}")
+    for binary in (False, True):
+        for variant in ('legacy', 'streaming'):
+            cmd = [sys.executable, __file__, '--variant', variant, '--size-mb', str(args.size_mb), '--kind', args.kind]
+            if binary:
+                cmd.append('--binary')
+            result = json.loads(subprocess.check_output(cmd))
+            print(f"  {'二进制' if binary else 'base64':<10}{variant:<12}{result['sent'] // 1024:>12}"
+                  f"{result['rss_kb']:>18}{result['traced_kb']:>16}{result['ms']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
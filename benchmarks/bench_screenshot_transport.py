@@ -0,0 +1,116 @@
+"""截图回传开销对比：base64 字符串（旧） vs Socket.IO 二进制附件（新）
+
+统计每次截图在线上的字节数与服务端 CPU 时间（PNG 编码之后的部分单独列出）。
+线上字节按 Socket.IO v5 / Engine.IO v4 的分帧规则计算：
+  旧：42["screenshot_complete",{...,"image":"<base64>"}]  一条文本包
+  新：451-["screenshot_complete",{...,"image":{"_placeholder":true,"num":0}}] + 一个二进制附件
+      websocket 下附件是原始字节帧；长轮询下 Engine.IO 仍会把附件转成 "b" + base64 文本。
+
+用法：
+  python benchmarks/bench_screenshot_transport.py             # 合成 2560x1440 截图
+  python benchmarks/bench_screenshot_transport.py --live      # 用 pyautogui 截真屏
+  python benchmarks/bench_screenshot_transport.py -n 20 --size 1920x1080
+"""
+import argparse
+import base64
+import json
+import random
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+
+def synthetic_screen(width: int, height: int) -> Image.Image:
+    """近似题目截图：白底 + 若干行深色“文字块” + 少量色块"""
+    rng = random.Random(42)
+    img = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, width, 48), fill=(32, 33, 36))
+    y = 96
+    while y < height - 40:
+        x = 80
+        while x < width - 200:
+            w = rng.randint(12, 90)
+            draw.rectangle((x, y, x + w, y + 18), fill=(rng.randint(0, 60),) * 3)
+            x += w + rng.randint(6, 14)
+        y += rng.randint(30, 44)
+    for _ in range(6):
+        x, y = rng.randint(0, width - 300), rng.randint(60, height - 200)
+        draw.rectangle((x, y, x + 280, y + 160), fill=tuple(rng.randint(80, 230) for _ in range(3)))
+    return img
+
+
+def capture(args) -> Image.Image:
+    if args.live:
+        import pyautogui
+        return pyautogui.screenshot()
+    return synthetic_screen(*args.size)
+
+
+def encode_png(img: Image.Image) -> bytes:
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def legacy_path(png: bytes):
+    """旧路径：base64 → str → 整包 JSON 序列化；返回 (websocket 字节, 轮询字节)"""
+    img_str = base64.b64encode(png).decode()
+    packet = '42' + json.dumps(['screenshot_complete', {'success': True, 'image': img_str}])
+    size = len(packet.encode('utf-8'))
+    return size, size
+
+
+def binary_path(png: bytes):
+    """新路径：小 JSON 头 + 原始字节附件；返回 (websocket 字节, 轮询字节)"""
+    header = '451-' + json.dumps(['screenshot_complete', {
+        'success': True, 'image': {'_placeholder': True, 'num': 0}, 'mime': 'image/png'}])
+    header_size = len(header.encode('utf-8'))
+    ws = header_size + len(png)
+    # 长轮询：附件由 Engine.IO 编为 "b" + base64，记录间以 \x1e 分隔
+    polling = header_size + 1 + 1 + len(base64.b64encode(png))
+    return ws, polling
+
+
+def timed(fn, *a):
+    start = time.process_time()
+    result = fn(*a)
+    return result, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=10, help='截图次数')
+    parser.add_argument('--live', action='store_true', help='用 pyautogui 截真屏')
+    parser.add_argument('--size', default='2560x1440', help='合成截图尺寸，WxH')
+    args = parser.parse_args()
+    args.size = tuple(int(v) for v in args.size.lower().split('x'))
+
+    capture_cpu = png_cpu = 0.0
+    totals = {'legacy': [0.0, 0, 0], 'binary': [0.0, 0, 0]}  # cpu, ws 字节, 轮询字节
+    png_bytes = 0
+    for _ in range(args.n):
+        img, t = timed(capture, args)
+        capture_cpu += t
+        png, t = timed(encode_png, img)
+        png_cpu += t
+        png_bytes += len(png)
+        for name, fn in (('legacy', legacy_path), ('binary', binary_path)):
+            (ws, polling), t = timed(fn, png)
+            totals[name][0] += t
+            totals[name][1] += ws
+            totals[name][2] += polling
+
+    n = args.n
+    print(f"截图 {n} 次, 源: {'实屏' if args.live else '合成 %dx%d' % args.size}")
+    print(f"  截屏 CPU {capture_cpu / n * 1000:.1f} ms/次, PNG 编码 {png_cpu / n * 1000:.1f} ms/次, PNG {png_bytes / n / 1024:.0f} KB")
+    print(f"  {'路径':<8}{'打包 CPU(ms)':>14}{'websocket(KB)':>16}{'长轮询(KB)':>14}")
+    for name, (cpu, ws, polling) in totals.items():
+        print(f"  {name:<8}{cpu / n * 1000:>14.2f}{ws / n / 1024:>16.0f}{polling / n / 1024:>14.0f}")
+    legacy_ws = totals['legacy'][1]
+    print(f"  websocket 下二进制附件节省 {(1 - totals['binary'][1] / legacy_ws) * 100:.1f}% 线上字节")
+
+
+if __name__ == '__main__':
+    main()
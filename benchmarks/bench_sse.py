@@ -0,0 +1,119 @@
+"""SSE 解析微基准：旧的 iter_lines 手工解析 vs models/sse.py 增量解码器
+
+构造一段 Messages API 风格的事件流（中英混排 delta，含 event: 行与 ping 注释），
+按不同读块大小切开后分别解析到 dict，统计每秒事件数。
+旧路径按 requests.Response.iter_lines 的实现复刻（512 字节读块 + splitlines 拼接）。
+
+用法：
+  python benchmarks/bench_sse.py
+  python benchmarks/bench_sse.py -n 50000 --repeat 5
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import time
+
+# 直接按路径加载：models/__init__ 会连带导入各家 SDK，基准用不到
+_SSE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'sse.py')
+_spec = importlib.util.spec_from_file_location('sse', _SSE_PATH)
+sse = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sse)
+
+WORDS = ['the', 'integral', '求导', '因此', 'x²', 'matrix', '答案是', '∑', 'step', '化简得']
+
+
+def build_stream(n: int) -> bytes:
+    rng = random.Random(7)
+    parts = []
+    for i in range(n):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+        data = json.dumps({'type': 'content_block_delta', 'index': 0,
+                           'delta': {'type': 'text_delta', 'text': text}}, ensure_ascii=False)
+        parts.append(f'event: content_block_delta\ndata: {data}\n\n')
+        if i % 50 == 0:
+            parts.append('event: ping\ndata: {"type": "ping"}\n\n')
+    parts.append('event: message_stop\ndata: {"type": "message_stop"}\n\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def chunks(payload: bytes, size: int):
+    for i in range(0, len(payload), size):
+        yield payload[i:i + size]
+
+
+def iter_lines(stream):
+    """requests.Response.iter_lines 的等价实现"""
+    pending = None
+    for chunk in stream:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+
+def legacy_parse(payload: bytes, size: int) -> int:
+    count = 0
+    for line in iter_lines(chunks(payload, size)):
+        if not line:
+            continue
+        line = line.decode('utf-8')
+        if not line.startswith('data: '):
+            continue
+        json.loads(line[6:])
+        count += 1
+    return count
+
+
+def decoder_parse(payload: bytes, size: int) -> int:
+    count = 0
+    decoder = sse.SSEDecoder()
+    for chunk in chunks(payload, size):
+        for event in decoder.feed(chunk):
+            event.json()
+            count += 1
+    for event in decoder.flush():
+        event.json()
+        count += 1
+    return count
+
+
+def bench(fn, payload, size, repeat):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = fn(payload, size)
+        best = min(best, time.perf_counter() - start)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', type=int, default=20000, help='delta 事件数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复次数，取最快')
+    args = parser.parse_args()
+
+    payload = build_stream(args.n)
+    print(f"事件流 {len(payload) / 1024:.0f} KB, delta 事件 {args.n}")
+    print(f"  {'解析器':<22}{'读块':>8}{'事件数':>10}{'事件/秒':>14}")
+    cases = [
+        ('iter_lines (旧)', legacy_parse, 512),
+        ('SSEDecoder', decoder_parse, 512),
+        ('SSEDecoder', decoder_parse, 16 * 1024),
+        ('SSEDecoder', decoder_parse, sse.READ_CHUNK_SIZE),
+    ]
+    for name, fn, size in cases:
+        count, elapsed = bench(fn, payload, size, args.repeat)
+        print(f"  {name:<22}{size:>8}{count:>10}{count / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
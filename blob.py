@@ -0,0 +1,196 @@
+"""大块二进制的分块下发：截图预览、原分辨率块走 /blob 命名空间，按确认窗口逐块发送
+
+一张数 MB 的预览若作为单个 Socket.IO 包发出，会和 ai_response 挤在同一条 engine.io 连接上：
+轮询下整包要随一次 HTTP 响应取完，其后排队的答案帧都得等它。现在：
+- 超过 BLOB_MIN 的载荷切成 CHUNK_SIZE 的块，在 /blob 命名空间下发，事件本身只带 blob_id；
+- 每个连接最多 WINDOW 块未确认（客户端逐块回 blob_ack），engine.io 待发包数超过
+  BACKLOG_LIMIT（答案帧还没取走）时先不发，文字帧总能插在两块之间送达；
+- 同一连接的传输按先后排队，一次只发一个；BLOB_TIMEOUT 秒收不到确认即放弃（发 blob_abort）。
+/blob 命名空间的 sid 与主命名空间不同：客户端连上后用 blob_bind 告知主 sid。
+没有绑定（老客户端）时照旧整包内联。
+"""
+import collections
+import itertools
+import threading
+import time
+
+# 走分块通道的最小载荷、块大小（字节）与未确认块数上限
+BLOB_MIN = 64 * 1024
+CHUNK_SIZE = 32 * 1024
+WINDOW = 4
+# engine.io 待发包数超过此值时暂停发块，让文字帧先走
+BACKLOG_LIMIT = 8
+# 等确认 / 等积压回落的轮询间隔与放弃时限（秒）
+POLL_INTERVAL = 0.02
+BLOB_TIMEOUT = 20
+
+
+class _Transfer:
+    __slots__ = ('blob_id', 'data', 'chunks', 'sent', 'acked', 'last_ack')
+
+    def __init__(self, blob_id: str, data: bytes, chunk_size: int, now: float):
+        self.blob_id = blob_id
+        self.data = data
+        self.chunks = max(1, -(-len(data) // chunk_size))
+        self.sent = 0
+        self.acked = 0
+        self.last_ack = now
+
+
+class _Channel:
+    __slots__ = ('blob_sid', 'queue', 'running', 'closed')
+
+    def __init__(self, blob_sid):
+        self.blob_sid = blob_sid
+        self.queue = collections.deque()
+        self.running = False
+        self.closed = False
+
+
+class BlobChannel:
+    """按连接排队的分块发送器。
+    emit(blob_sid, event, payload) 在 /blob 命名空间下发；backlog(blob_sid) 返回连接待发包数；
+    spawn(fn) 启动后台线程，sleep(seconds) 让出调度，clock() 取单调时间"""
+
+    def __init__(self, emit, backlog=None, spawn=None, sleep=time.sleep, clock=time.monotonic, chunk_size: int = CHUNK_SIZE,
+                 window: int = WINDOW, backlog_limit: int = BACKLOG_LIMIT, timeout: float = BLOB_TIMEOUT):
+        self.emit = emit
+        self.backlog = backlog
+        self.spawn = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.sleep = sleep
+        self.clock = clock
+        self.chunk_size = chunk_size
+        self.window = window
+        self.backlog_limit = backlog_limit
+        self.timeout = timeout
+        self.sent_blobs = 0
+        self.aborted = 0
+        self._ids = itertools.count(1)
+        self._channels = {}     # 主 sid → _Channel
+        self._owners = {}       # blob sid → 主 sid
+        self._cond = threading.Condition()
+
+    def bind(self, sid, blob_sid) -> None:
+        """/blob 命名空间连上后与主连接关联（重连换了 sid 时重新关联）"""
+        with self._cond:
+            self._close(self._channels.pop(sid, None))
+            self._close(self._channels.pop(self._owners.pop(blob_sid, None), None))
+            self._channels[sid] = _Channel(blob_sid)
+            self._owners[blob_sid] = sid
+
+    def unbind(self, sid=None, blob_sid=None) -> None:
+        """主连接或 /blob 连接断开：未发完的传输作废"""
+        with self._cond:
+            sid = sid if sid is not None else self._owners.get(blob_sid)
+            channel = self._channels.pop(sid, None)
+            if channel is not None:
+                self._owners.pop(channel.blob_sid, None)
+            self._close(channel)
+            self._cond.notify_all()
+
+    def available(self, sid) -> bool:
+        with self._cond:
+            return sid in self._channels
+
+    def attach(self, sid, payload: dict, data: bytes, key: str = 'image') -> dict:
+        """载荷够大且连接有分块通道时，payload[key] 换成 blob 引用并排队发送；否则内联"""
+        blob_id = self.send(sid, data) if len(data) >= BLOB_MIN else None
+        if blob_id is None:
+            payload[key] = data
+        else:
+            payload['blob'] = blob_id
+            payload['blob_size'] = len(data)
+        return payload
+
+    def send(self, sid, data: bytes):
+        """排队发送 data，返回 blob_id；连接没有分块通道时返回 None"""
+        with self._cond:
+            channel = self._channels.get(sid)
+            if channel is None:
+                return None
+            transfer = _Transfer(f'b{next(self._ids)}', bytes(data), self.chunk_size, self.clock())
+            channel.queue.append(transfer)
+            start = not channel.running
+            channel.running = True
+        if start:
+            self.spawn(lambda: self._pump(channel))
+        return transfer.blob_id
+
+    def ack(self, blob_sid, blob_id, index) -> None:
+        with self._cond:
+            channel = self._channels.get(self._owners.get(blob_sid))
+            if channel is None or not channel.queue or channel.queue[0].blob_id != blob_id:
+                return
+            transfer = channel.queue[0]
+            if isinstance(index, int) and transfer.acked <= index < transfer.sent:
+                transfer.acked = index + 1
+                transfer.last_ack = self.clock()
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'sent': self.sent_blobs,
+                'aborted': self.aborted,
+                'channels': {
+                    sid: [{'blob_id': t.blob_id, 'chunks': t.chunks, 'sent': t.sent, 'acked': t.acked} for t in c.queue]
+                    for sid, c in self._channels.items()
+                },
+            }
+
+    def _close(self, channel) -> None:
+        if channel is not None:
+            channel.closed = True
+            channel.queue.clear()
+
+    def _pump(self, channel: _Channel) -> None:
+        while True:
+            with self._cond:
+                if channel.closed or not channel.queue:
+                    channel.running = False
+                    return
+                transfer = channel.queue[0]
+                if transfer.acked >= transfer.chunks:
+                    channel.queue.popleft()
+                    self.sent_blobs += 1
+                    continue
+                # 超时只从发出第一块算起（发第一块时重置 last_ack），排队等前面的传输不算
+                if transfer.sent > 0 and self.clock() - transfer.last_ack > self.timeout:
+                    channel.queue.popleft()
+                    self.aborted += 1
+                    abort = transfer
+                else:
+                    abort = None
+                    ready = transfer.sent < transfer.chunks and transfer.sent - transfer.acked < self.window
+                    if not ready:
+                        # 窗口已满或已发完：等确认
+                        self._cond.wait(POLL_INTERVAL * 5)
+                        continue
+            if abort is not None:
+                print(f"分块传输超时放弃: {abort.blob_id} ({abort.acked}/{abort.chunks})")
+                self.emit(channel.blob_sid, 'blob_abort', {'blob_id': abort.blob_id})
+                continue
+            if self.backlog is not None:
+                try:
+                    if self.backlog(channel.blob_sid) > self.backlog_limit:
+                        self.sleep(POLL_INTERVAL)
+                        continue
+                except Exception:
+                    pass
+            self._send_chunk(channel, transfer)
+
+    def _send_chunk(self, channel: _Channel, transfer: _Transfer) -> None:
+        # 先记为已发再下发：确认可能比 emit 返回还早到，ack() 只认 sent 以内的块
+        with self._cond:
+            index = transfer.sent
+            transfer.sent = index + 1
+            if index == 0:
+                transfer.last_ack = self.clock()
+        start = index * self.chunk_size
+        self.emit(channel.blob_sid, 'blob_chunk', {
+            'blob_id': transfer.blob_id,
+            'index': index,
+            'chunks': transfer.chunks,
+            'size': len(transfer.data),
+            'data': transfer.data[start:start + self.chunk_size],
+        })
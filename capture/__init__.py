@@ -0,0 +1,21 @@
+from .base import CaptureBackend
+from .backends import (
+    BACKENDS,
+    ImageGrabBackend,
+    MSSBackend,
+    PyAutoGUIBackend,
+    SyntheticBackend,
+    available_backends,
+    select_backend,
+)
+
+__all__ = [
+    'CaptureBackend',
+    'BACKENDS',
+    'ImageGrabBackend',
+    'MSSBackend',
+    'PyAutoGUIBackend',
+    'SyntheticBackend',
+    'available_backends',
+    'select_backend',
+]
@@ -0,0 +1,213 @@
+import os
+import random
+import sys
+import threading
+import time
+
+from .base import CaptureBackend, _monitor
+
+# 环境变量：强制指定后端名；未设置时按 AUTO_ORDER 逐个试截一帧，取第一个成功的
+BACKEND_ENV = 'SNAPSOLVER_CAPTURE_BACKEND'
+# 合成后端的画面尺寸，如 1920x1080
+SYNTHETIC_SIZE_ENV = 'SNAPSOLVER_SYNTHETIC_SIZE'
+
+
+def _has_display() -> bool:
+    """Linux 下没有 X 显示时各真实后端都会失败（Wayland 需经 XWayland）"""
+    if not sys.platform.startswith('linux'):
+        return True
+    return bool(os.environ.get('DISPLAY'))
+
+
+class MSSBackend(CaptureBackend):
+    """mss：直接走 XGetImage / GDI BitBlt / CGWindowListCreateImage，
+    不经子进程也不经 PIL 的截图路径，默认只截主显示器，也可只截指定区域。
+    mss 实例绑定创建它的线程（X 连接不可跨线程），故每线程一个。"""
+    name = 'mss'
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @classmethod
+    def probe(cls) -> bool:
+        try:
+            import mss  # noqa: F401
+        except ImportError:
+            return False
+        return _has_display()
+
+    def _sct(self):
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            import mss
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    def monitors(self) -> list:
+        # monitors[0] 是所有显示器拼成的虚拟屏，[1:] 才是各显示器，[1] 为主显示器
+        screens = self._sct().monitors
+        return [
+            _monitor(i, m['left'], m['top'], m['width'], m['height'])
+            for i, m in enumerate(screens[1:] or screens[:1], start=1)
+        ]
+
+    def grab(self, region=None):
+        from PIL import Image
+        sct = self._sct()
+        if region is None:
+            monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+        else:
+            left, top, width, height = region
+            monitor = {'left': left, 'top': top, 'width': width, 'height': height}
+        # 只有 region 内的像素会被读出，多屏时不再拷贝整个虚拟桌面
+        shot = sct.grab(monitor)
+        # BGRA 原始缓冲直接按 BGRX 解码，省一次 mss 自带的 .rgb 转换
+        return Image.frombuffer('RGB', shot.size, shot.bgra, 'raw', 'BGRX', 0, 1)
+
+    def close(self) -> None:
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class ImageGrabBackend(CaptureBackend):
+    """PIL.ImageGrab：Windows/macOS 原生，Linux 需 Pillow 带 XCB 支持（不 shell out）"""
+    name = 'imagegrab'
+
+    @classmethod
+    def probe(cls) -> bool:
+        try:
+            from PIL import ImageGrab, features
+        except ImportError:
+            return False
+        if sys.platform.startswith('linux'):
+            return _has_display() and features.check_feature('xcb')
+        return True
+
+    def grab(self, region=None):
+        from PIL import ImageGrab
+        if region is None:
+            return ImageGrab.grab().convert('RGB')
+        left, top, width, height = region
+        # all_screens 让 Windows 上的 bbox 按虚拟桌面坐标解释，副屏区域也能截
+        return ImageGrab.grab(bbox=(left, top, left + width, top + height), all_screens=True).convert('RGB')
+
+
+class PyAutoGUIBackend(CaptureBackend):
+    """原有路径：pyautogui.screenshot()，Linux 上可能经 scrot 子进程，较慢，作兜底"""
+    name = 'pyautogui'
+
+    @classmethod
+    def probe(cls) -> bool:
+        try:
+            import pyautogui  # noqa: F401
+        except Exception:
+            return False
+        return _has_display()
+
+    def monitors(self) -> list:
+        import pyautogui
+        width, height = pyautogui.size()
+        return [_monitor(1, 0, 0, width, height)]
+
+    def grab(self, region=None):
+        import pyautogui
+        return pyautogui.screenshot(region=region).convert('RGB')
+
+
+class SyntheticBackend(CaptureBackend):
+    """合成“题目截图”：白底 + 若干行深色文字块 + 少量色块。
+    无显示环境的基准与联调用，只在显式指定时启用，不参与自动选择。"""
+    name = 'synthetic'
+
+    def __init__(self, width: int = None, height: int = None, seed: int = 42):
+        if width is None or height is None:
+            width, height = self._env_size()
+        self.size = (width, height)
+        self.seed = seed
+        self._base = None
+
+    @staticmethod
+    def _env_size():
+        try:
+            width, height = os.environ.get(SYNTHETIC_SIZE_ENV, '2560x1440').lower().split('x')
+            return int(width), int(height)
+        except ValueError:
+            return 2560, 1440
+
+    @classmethod
+    def probe(cls) -> bool:
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _render(self):
+        from PIL import Image, ImageDraw
+        width, height = self.size
+        rng = random.Random(self.seed)
+        img = Image.new('RGB', (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, width, 48), fill=(32, 33, 36))
+        y = 96
+        while y < height - 40:
+            x = 80
+            while x < width - 200:
+                w = rng.randint(12, 90)
+                draw.rectangle((x, y, x + w, y + 18), fill=(rng.randint(0, 60),) * 3)
+                x += w + rng.randint(6, 14)
+            y += rng.randint(30, 44)
+        for _ in range(6):
+            x, y = rng.randint(0, max(1, width - 300)), rng.randint(60, max(61, height - 200))
+            draw.rectangle((x, y, x + 280, y + 160), fill=tuple(rng.randint(80, 230) for _ in range(3)))
+        return img
+
+    def monitors(self) -> list:
+        return [_monitor(1, 0, 0, *self.size)]
+
+    def grab(self, region=None):
+        # 底图只画一次，之后每帧复制，模拟真实后端“每次拿到一张新图”
+        if self._base is None:
+            self._base = self._render()
+        if region is None:
+            return self._base.copy()
+        left, top, width, height = region
+        return self._base.crop((left, top, left + width, top + height))
+
+
+BACKENDS = {cls.name: cls for cls in (MSSBackend, ImageGrabBackend, PyAutoGUIBackend, SyntheticBackend)}
+# 自动选择顺序：快的在前，pyautogui 兜底；合成后端不参与
+AUTO_ORDER = ('mss', 'imagegrab', 'pyautogui')
+
+
+def available_backends() -> list:
+    """当前环境下 probe 通过的后端名（含合成后端）"""
+    return [name for name, cls in BACKENDS.items() if cls.probe()]
+
+
+def select_backend(name: str = None) -> CaptureBackend:
+    """按名字或环境变量选后端；都没指定时逐个试截一帧，取第一个成功的。
+    一个都截不成时仍返回 pyautogui，让错误在实际截图时照常上报。"""
+    name = (name or os.environ.get(BACKEND_ENV) or '').strip().lower()
+    if name and name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"未知截图后端: {name}，可选 {', '.join(BACKENDS)}")
+        return BACKENDS[name]()
+
+    for candidate in AUTO_ORDER:
+        cls = BACKENDS[candidate]
+        if not cls.probe():
+            continue
+        backend = cls()
+        try:
+            start = time.perf_counter()
+            backend.grab()
+            print(f"截图后端: {candidate}（试截 {(time.perf_counter() - start) * 1000:.0f} ms）")
+            return backend
+        except Exception as e:
+            print(f"截图后端 {candidate} 不可用: {e}")
+            backend.close()
+    print("截图后端: 无可用后端，回落 pyautogui")
+    return PyAutoGUIBackend()
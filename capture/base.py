@@ -0,0 +1,68 @@
+from abc import ABC, abstractmethod
+
+
+class CaptureBackend(ABC):
+    """截屏后端：grab() 返回主机屏幕的 RGB PIL.Image。
+    各后端的第三方依赖都在 probe()/grab() 里按需导入，缺依赖只影响自身是否可用。
+    坐标均为虚拟桌面坐标（多显示器拼接后的整体坐标系，副屏可能为负）。"""
+
+    # 后端名，SNAPSOLVER_CAPTURE_BACKEND 按它选择
+    name = ''
+
+    @classmethod
+    def probe(cls) -> bool:
+        """依赖与显示环境是否就绪（不截图，只做廉价检查）"""
+        return True
+
+    @abstractmethod
+    def grab(self, region=None):
+        """截取 region=(left, top, width, height)，缺省为主屏，返回 RGB 模式的 PIL.Image"""
+
+    def monitors(self) -> list:
+        """各显示器几何 [{index, left, top, width, height, primary}]，index 从 1 起、1 为主屏。
+        拿不到显示器布局的后端按主屏截图尺寸给出单个显示器（只截一次，结果缓存）"""
+        cached = getattr(self, '_monitors', None)
+        if cached is None:
+            width, height = self.grab().size
+            cached = self._monitors = [_monitor(1, 0, 0, width, height)]
+        return cached
+
+    def resolve(self, monitor=None, region=None) -> tuple:
+        """把“第几个显示器 + 显示器内区域”换算为虚拟桌面上的 (left, top, width, height)。
+        region 为 {x, y, width, height}（相对该显示器），越界部分裁掉；
+        显示器不存在或区域为空时抛 ValueError"""
+        screens = self.monitors()
+        index = 1 if monitor is None else monitor
+        screen = next((m for m in screens if m['index'] == index), None)
+        if screen is None:
+            raise ValueError(f"显示器 {index} 不存在，共 {len(screens)} 个")
+        left, top, width, height = screen['left'], screen['top'], screen['width'], screen['height']
+        if not region:
+            return left, top, width, height
+        try:
+            x = max(0, int(region.get('x', 0)))
+            y = max(0, int(region.get('y', 0)))
+            right = min(width, x + int(region.get('width', width)))
+            bottom = min(height, y + int(region.get('height', height)))
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError(f"无效的截屏区域: {region!r}")
+        if right <= x or bottom <= y:
+            raise ValueError(f"截屏区域不在显示器 {index} 内: {region!r}")
+        return left + x, top + y, right - x, bottom - y
+
+    def close(self) -> None:
+        """释放后端持有的显示连接等资源"""
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+
+def _monitor(index, left, top, width, height, primary=None) -> dict:
+    return {
+        'index': index,
+        'left': left,
+        'top': top,
+        'width': width,
+        'height': height,
+        'primary': index == 1 if primary is None else primary,
+    }
@@ -0,0 +1,208 @@
+"""实时画面：按块比对主机屏幕，只下发变化的块
+
+一个采集循环服务所有订阅连接：按 fps 上限截屏 → 缩到长边 LIVE_MAX_EDGE →
+与上一帧整帧做 NumPy 向量化比较，逐块归约出变化网格 → 只编码变化的块（每块只编码一次）。
+截屏到编码这一段（LiveSampler）在截屏进程里跑，Web 进程只收到变化块的编码结果。
+每个订阅者各记一份“待发块”集合：新加入时为全部块（关键帧），
+连接积压（engine.io 待发包数超过 backlog_limit）时跳过发送、继续累积，
+追上后一次发出各块的最新版本，慢连接不拖累采集也不会看到错乱的画面。
+"""
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+# 采集帧率上限（帧/秒）与可设置的最大值
+LIVE_FPS = 2
+LIVE_MAX_FPS = 5
+# 实时画面长边（像素）与块边长：手机上看，不需要原分辨率
+LIVE_MAX_EDGE = 1280
+LIVE_TILE = 128
+# 订阅连接待发包数超过此值时本帧跳过
+LIVE_BACKLOG = 4
+
+
+class TileDiff:
+    """与上一帧比较，返回 rows × cols 的变化网格（bool）"""
+
+    def __init__(self, tile_size: int = LIVE_TILE):
+        self.tile_size = tile_size
+        self.prev = None
+
+    def grid_shape(self, height: int, width: int) -> tuple:
+        t = self.tile_size
+        return -(-height // t), -(-width // t)
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        rows, cols = self.grid_shape(height, width)
+        prev, self.prev = self.prev, frame
+        if prev is None or prev.shape != frame.shape:
+            return np.ones((rows, cols), dtype=bool)
+        changed = (frame != prev).any(axis=2)
+        t = self.tile_size
+        if changed.shape != (rows * t, cols * t):
+            padded = np.zeros((rows * t, cols * t), dtype=bool)
+            padded[:height, :width] = changed
+            changed = padded
+        # (rows, t, cols, t) 上按块归约：一次向量化调用得出所有块是否变化
+        return changed.reshape(rows, t, cols, t).any(axis=(1, 3))
+
+
+class LiveSampler:
+    """采一帧：grab() 截屏 → 缩到长边 max_edge → 与上一帧按块比对 → encode(PIL.Image) 只编码变化的块。
+    返回 (画面尺寸, {(col, row): (box, 编码结果)})；reset 时忘掉上一帧，返回全部块"""
+
+    def __init__(self, grab, encode, max_edge: int = LIVE_MAX_EDGE, tile_size: int = LIVE_TILE):
+        self.grab = grab
+        self.encode = encode
+        self.max_edge = max_edge
+        self.differ = TileDiff(tile_size)
+
+    def sample(self, reset: bool = False):
+        if reset:
+            self.differ.prev = None
+        image = self.grab()
+        scale = self.max_edge / max(image.size)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        grid = self.differ.update(np.asarray(image))
+        tiles = {}
+        t = self.differ.tile_size
+        width, height = image.size
+        for row, col in zip(*np.nonzero(grid)):
+            col, row = int(col), int(row)
+            box = (col * t, row * t, min(width, (col + 1) * t), min(height, (row + 1) * t))
+            tiles[(col, row)] = (box, self.encode(image.crop(box)))
+        return image.size, tiles
+
+
+class _Subscriber:
+    __slots__ = ('sid', 'pending', 'frames', 'skipped')
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.pending = None     # None 表示需要关键帧
+        self.frames = 0
+        self.skipped = 0
+
+
+class LiveView:
+    """共享的实时画面采集循环。
+    sample(reset) 同 LiveSampler.sample，变化块的 encoded 带 data / mime；
+    emit(sid, payload) 负责下发；backlog(sid) 返回连接待发包数；spawn(fn) 启动后台线程。"""
+
+    def __init__(self, sample, emit, backlog=None, spawn=None, fps: float = LIVE_FPS,
+                 backlog_limit: int = LIVE_BACKLOG):
+        self.sample = sample
+        self.emit = emit
+        self.backlog = backlog
+        self.spawn = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.fps = max(0.2, min(float(fps), LIVE_MAX_FPS))
+        self.backlog_limit = backlog_limit
+        self.frame = 0
+        self._subscribers = {}
+        self._tiles = {}            # (col, row) → 该块最新的 (box, encoded)
+        self._size = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def subscribe(self, sid) -> None:
+        """加入（或重新加入）实时画面：下一帧发全量"""
+        with self._lock:
+            self._subscribers[sid] = _Subscriber(sid)
+            start = not self._running
+            self._running = True
+        if start:
+            self.spawn(self._loop)
+
+    def unsubscribe(self, sid) -> None:
+        with self._lock:
+            self._subscribers.pop(sid, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'running': self._running,
+                'frame': self.frame,
+                'fps': self.fps,
+                'subscribers': {
+                    sub.sid: {'frames': sub.frames, 'skipped': sub.skipped}
+                    for sub in self._subscribers.values()
+                },
+            }
+
+    def _loop(self) -> None:
+        # 每轮循环开始时让采样端忘掉上一帧：_tiles 可能已与它错开
+        reset = True
+        interval = 1.0 / self.fps
+        while True:
+            # 最后一个订阅者离开时在锁内收尾，与 subscribe 的“是否需要启动”判断互斥
+            with self._lock:
+                if not self._subscribers:
+                    self._running = False
+                    return
+            started = time.monotonic()
+            try:
+                self._step(reset)
+                reset = False
+            except Exception as e:
+                print(f"实时画面采集出错: {e}")
+                reset = True
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def _step(self, reset: bool) -> None:
+        size, tiles = self.sample(reset)
+        if size != self._size:
+            # 分辨率变了：旧块全部作废，所有订阅者改发关键帧（分辨率变化时采样端返回的是全部块）
+            self._size = size
+            self._tiles.clear()
+            with self._lock:
+                for sub in self._subscribers.values():
+                    sub.pending = None
+
+        self._tiles.update(tiles)
+        changed = set(tiles)
+        self.frame += 1
+
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for sub in subscribers:
+            key = sub.pending is None
+            sub.pending = set(self._tiles) if key else sub.pending | changed
+            if not sub.pending:
+                continue
+            if self.backlog is not None and not key:
+                try:
+                    if self.backlog(sub.sid) > self.backlog_limit:
+                        sub.skipped += 1
+                        continue
+                except Exception:
+                    pass
+            self._send(sub, key)
+
+    def _send(self, sub: _Subscriber, key: bool) -> None:
+        tiles = []
+        for coord in sub.pending:
+            box, encoded = self._tiles[coord]
+            tiles.append({
+                'x': box[0],
+                'y': box[1],
+                'image': encoded.data,
+                'mime': encoded.mime,
+            })
+        sub.pending = set()
+        sub.frames += 1
+        width, height = self._size
+        self.emit(sub.sid, {
+            'frame': self.frame,
+            'key': key,
+            'width': width,
+            'height': height,
+            'tiles': tiles,
+        })
@@ -1,5 +1,7 @@
-from .base import BaseModel
+from .base import BaseModel, StreamAccumulator, StreamEvent
+from .image import ImageInput, JsonBody
 from .anthropic import AnthropicModel
+from .openai_compat import OpenAICompatModel
 from .openai import OpenAIModel
 from .deepseek import DeepSeekModel
 from .alibaba import AlibabaModel
@@ -9,7 +11,12 @@ from .factory import ModelFactory
 
 __all__ = [
     'BaseModel',
+    'StreamAccumulator',
+    'StreamEvent',
+    'ImageInput',
+    'JsonBody',
     'AnthropicModel',
+    'OpenAICompatModel',
     'OpenAIModel',
     'DeepSeekModel',
     'AlibabaModel',
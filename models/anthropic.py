@@ -1,7 +1,9 @@
 import json
-import requests
 from typing import Generator, Optional
-from .base import BaseModel
+from .base import BaseModel, StreamEvent
+from .image import ImageInput, JsonBody
+from . import session
+from .sse import iter_sse
 
 class AnthropicModel(BaseModel):
     def __init__(self, api_key, temperature=0.7, system_prompt=None, language=None, api_base_url=None, model_identifier=None, reasoning_tier="deep"):
@@ -48,10 +50,10 @@ class AnthropicModel(BaseModel):
     def get_model_identifier(self) -> str:
         return self.model_identifier
 
-    def analyze_text(self, text: str, proxies: Optional[dict] = None) -> Generator[dict, None, None]:
+    def analyze_text(self, text: str, proxies: Optional[dict] = None) -> Generator[StreamEvent, None, None]:
         """Stream Claude's response for text analysis"""
         try:
-            yield {"status": "started"}
+            yield StreamEvent("started")
             
             api_key = self.api_key
             if api_key.startswith('Bearer '):
@@ -93,13 +95,12 @@ class AnthropicModel(BaseModel):
             # 使用配置的API基础URL
             api_endpoint = f"{self.api_base_url}/messages"
             
-            response = requests.post(
+            response = session.post(
                 api_endpoint,
                 headers=headers,
                 json=payload,
                 stream=True,
-                proxies=proxies,
-                timeout=60
+                proxies=proxies
             )
 
             if response.status_code != 200:
@@ -110,91 +111,17 @@ class AnthropicModel(BaseModel):
                         error_msg += f" - {error_data['error']['message']}"
                 except:
                     error_msg += f" - {response.text}"
-                yield {"status": "error", "error": error_msg}
+                yield StreamEvent("error", error=error_msg)
                 return
 
-            thinking_content = ""
-            response_buffer = ""
-            
-            for chunk in response.iter_lines():
-                if not chunk:
-                    continue
-
-                try:
-                    chunk_str = chunk.decode('utf-8')
-                    if not chunk_str.startswith('data: '):
-                        continue
-
-                    chunk_str = chunk_str[6:]
-                    data = json.loads(chunk_str)
-
-                    if data.get('type') == 'content_block_delta':
-                        if 'delta' in data:
-                            if 'text' in data['delta']:
-                                text_chunk = data['delta']['text']
-                                response_buffer += text_chunk
-                                # 只在每累积一定数量的字符后才发送，减少UI跳变
-                                if len(text_chunk) >= 10 or text_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                                    yield {
-                                        "status": "streaming",
-                                        "content": response_buffer
-                                    }
-                                
-                            elif 'thinking' in data['delta']:
-                                thinking_chunk = data['delta']['thinking']
-                                thinking_content += thinking_chunk
-                                # 只在每累积一定数量的字符后才发送，减少UI跳变
-                                if len(thinking_chunk) >= 20 or thinking_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                                    yield {
-                                        "status": "thinking",
-                                        "content": thinking_content
-                                    }
-                    
-                    # 处理新的extended_thinking格式
-                    elif data.get('type') == 'extended_thinking_delta':
-                        if 'delta' in data and 'text' in data['delta']:
-                            thinking_chunk = data['delta']['text']
-                            thinking_content += thinking_chunk
-                            # 只在每累积一定数量的字符后才发送，减少UI跳变
-                            if len(thinking_chunk) >= 20 or thinking_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                                yield {
-                                    "status": "thinking",
-                                    "content": thinking_content
-                                }
-
-                    elif data.get('type') == 'message_stop':
-                        # 确保发送完整的思考内容
-                        if thinking_content:
-                            yield {
-                                "status": "thinking_complete",
-                                "content": thinking_content
-                            }
-                        # 确保发送完整的响应内容
-                        yield {
-                            "status": "completed",
-                            "content": response_buffer
-                        }
-
-                    elif data.get('type') == 'error':
-                        error_msg = data.get('error', {}).get('message', 'Unknown error')
-                        yield {
-                            "status": "error",
-                            "error": error_msg
-                        }
-                        break
-
-                except json.JSONDecodeError as e:
-                    print(f"JSON decode error: {str(e)}")
-                    continue
+            yield from self._stream_events(response)
 
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"Streaming error: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"Streaming error: {str(e)}")
 
     def analyze_image(self, image_data, proxies: Optional[dict] = None, history: Optional[list] = None):
-        yield {"status": "started"}
+        yield StreamEvent("started")
+        image = ImageInput.coerce(image_data)
         
         api_key = self.api_key
         if api_key.startswith('Bearer '):
@@ -226,8 +153,9 @@ class AnthropicModel(BaseModel):
                         'type': 'image',
                         'source': {
                             'type': 'base64',
-                            'media_type': 'image/png',
-                            'data': image_data
+                            'media_type': image.mime,
+                            # 发送时按块现编 base64，请求体不整体成形
+                            'data': image.base64_part()
                         }
                     },
                     {
@@ -250,13 +178,12 @@ class AnthropicModel(BaseModel):
         # 使用配置的API基础URL
         api_endpoint = f"{self.api_base_url}/messages"
         
-        response = requests.post(
+        response = session.post(
             api_endpoint,
             headers=headers,
-            json=payload,
+            data=JsonBody(payload),
             stream=True,
-            proxies=proxies,
-            timeout=60
+            proxies=proxies
         )
 
         if response.status_code != 200:
@@ -267,81 +194,52 @@ class AnthropicModel(BaseModel):
                     error_msg += f" - {error_data['error']['message']}"
             except:
                 error_msg += f" - {response.text}"
-            yield {"status": "error", "error": error_msg}
+            yield StreamEvent("error", error=error_msg)
             return
 
-        thinking_content = ""
-        response_buffer = ""
-        
-        for chunk in response.iter_lines():
-            if not chunk:
-                continue
-
-            try:
-                chunk_str = chunk.decode('utf-8')
-                if not chunk_str.startswith('data: '):
-                    continue
+        try:
+            yield from self._stream_events(response)
+        except Exception as e:
+            yield StreamEvent("error", error=f"Error processing response: {str(e)}")
 
-                chunk_str = chunk_str[6:]
-                data = json.loads(chunk_str)
+    def _stream_events(self, response):
+        """把 Messages API 的 SSE 流翻译为统一事件：思考/正文逐片增量，结束时补全文"""
+        # 局部变量上的 += 由 CPython 原地拼接（事件只带增量，不引用缓冲区）
+        thinking = ""
+        answer = ""
 
-                if data.get('type') == 'content_block_delta':
-                    if 'delta' in data:
-                        if 'text' in data['delta']:
-                            text_chunk = data['delta']['text']
-                            response_buffer += text_chunk
-                            # 只在每累积一定数量的字符后才发送，减少UI跳变
-                            if len(text_chunk) >= 10 or text_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                                yield {
-                                    "status": "streaming",
-                                    "content": response_buffer
-                                }
-                            
-                        elif 'thinking' in data['delta']:
-                            thinking_chunk = data['delta']['thinking']
-                            thinking_content += thinking_chunk
-                            # 只在每累积一定数量的字符后才发送，减少UI跳变
-                            if len(thinking_chunk) >= 20 or thinking_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                                yield {
-                                    "status": "thinking",
-                                    "content": thinking_content
-                                }
-                
-                # 处理新的extended_thinking格式
-                elif data.get('type') == 'extended_thinking_delta':
-                    if 'delta' in data and 'text' in data['delta']:
-                        thinking_chunk = data['delta']['text']
-                        thinking_content += thinking_chunk
-                        # 只在每累积一定数量的字符后才发送，减少UI跳变
-                        if len(thinking_chunk) >= 20 or thinking_chunk.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                            yield {
-                                "status": "thinking",
-                                "content": thinking_content
-                            }
+        for event in iter_sse(response):
+            try:
+                data = event.json()
+            except json.JSONDecodeError as e:
+                print(f"JSON decode error: {str(e)}")
+                continue
 
-                elif data.get('type') == 'message_stop':
-                    # 确保发送完整的思考内容
-                    if thinking_content:
-                        yield {
-                            "status": "thinking_complete",
-                            "content": thinking_content
-                        }
-                    # 确保发送完整的响应内容
-                    yield {
-                        "status": "completed",
-                        "content": response_buffer
-                    }
-                    
-                elif data.get('type') == 'error':
-                    error_message = data.get('error', {}).get('message', 'Unknown error')
-                    yield {
-                        "status": "error",
-                        "error": error_message
-                    }
-                    
-            except Exception as e:
-                yield {
-                    "status": "error",
-                    "error": f"Error processing response: {str(e)}"
-                }
+            event_type = data.get('type')
+            if event_type == 'content_block_delta':
+                delta = data.get('delta', {})
+                if 'text' in delta:
+                    answer += delta['text']
+                    yield StreamEvent("streaming", delta['text'])
+                elif 'thinking' in delta:
+                    thinking += delta['thinking']
+                    yield StreamEvent("thinking", delta['thinking'])
+
+            # 处理新的extended_thinking格式
+            elif event_type == 'extended_thinking_delta':
+                delta = data.get('delta', {})
+                if 'text' in delta:
+                    thinking += delta['text']
+                    yield StreamEvent("thinking", delta['text'])
+
+            elif event_type == 'message_stop':
+                # 确保发送完整的思考内容
+                if thinking:
+                    yield StreamEvent("thinking_complete", content=thinking)
+                # 确保发送完整的响应内容
+                yield StreamEvent("completed", content=answer)
+
+            elif event_type == 'error':
+                error_msg = data.get('error', {}).get('message', 'Unknown error')
+                yield StreamEvent("error", error=error_msg)
                 break
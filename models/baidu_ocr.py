@@ -1,10 +1,7 @@
-import base64
-import json
 import time
-import urllib.request
-import urllib.parse
-from typing import Generator, Dict, Any
-from .base import BaseModel
+from typing import Generator
+from .base import BaseModel, StreamEvent
+from . import session
 
 class BaiduOCRModel(BaseModel):
     """
@@ -57,14 +54,10 @@ class BaiduOCRModel(BaseModel):
             'client_secret': self.secret_key
         }
         
-        data = urllib.parse.urlencode(params).encode('utf-8')
-        request = urllib.request.Request(self.token_url, data=data)
-        request.add_header('Content-Type', 'application/x-www-form-urlencoded')
-        
         try:
-            with urllib.request.urlopen(request) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                
+            # 表单编码由 requests 完成；走共享连接池，带连接 / 读超时
+            result = session.post(self.token_url, data=params).json()
+
             if 'access_token' in result:
                 self._access_token = result['access_token']
                 # 设置过期时间（默认30天，但我们提前刷新）
@@ -81,7 +74,7 @@ class BaiduOCRModel(BaseModel):
         对图像进行OCR识别
         
         Args:
-            image_data: Base64编码的图像数据
+            image_data: 原始图像字节或Base64编码的图像数据
             
         Returns:
             str: 识别出的文字内容
@@ -90,22 +83,15 @@ class BaiduOCRModel(BaseModel):
         
         # 准备请求数据
         params = {
-            'image': image_data,
+            'image': self._image_base64(image_data),
             'language_type': 'auto_detect',  # 自动检测语言
             'detect_direction': 'true',      # 检测图像朝向
             'probability': 'false'           # 不返回置信度（减少响应大小）
         }
         
-        data = urllib.parse.urlencode(params).encode('utf-8')
-        url = f"{self.ocr_url}?access_token={access_token}"
-        
-        request = urllib.request.Request(url, data=data)
-        request.add_header('Content-Type', 'application/x-www-form-urlencoded')
-        
         try:
-            with urllib.request.urlopen(request) as response:
-                result = json.loads(response.read().decode('utf-8'))
-                
+            result = session.post(self.ocr_url, params={'access_token': access_token}, data=params).json()
+
             if 'error_code' in result:
                 raise Exception(f"百度OCR API错误: {result.get('error_msg', '未知错误')}")
             
@@ -123,39 +109,31 @@ class BaiduOCRModel(BaseModel):
         提取图像中的完整文本（与Mathpix兼容的接口）
         
         Args:
-            image_data: Base64编码的图像数据
+            image_data: 原始图像字节或Base64编码的图像数据
             
         Returns:
             str: 提取的文本内容
         """
         return self.ocr_image(image_data)
     
-    def analyze_image(self, image_data: str, proxies: dict = None) -> Generator[Dict[str, Any], None, None]:
+    def analyze_image(self, image_data: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """
         分析图像并返回OCR结果（流式输出以保持接口一致性）
         
         Args:
-            image_data: Base64编码的图像数据
+            image_data: 原始图像字节或Base64编码的图像数据
             proxies: 代理配置（未使用）
             
         Yields:
-            dict: 包含OCR结果的响应
+            StreamEvent: 包含OCR结果的响应
         """
         try:
             text = self.ocr_image(image_data)
-            yield {
-                'status': 'completed',
-                'content': text,
-                'model': 'baidu-ocr'
-            }
+            yield StreamEvent('completed', content=text)
         except Exception as e:
-            yield {
-                'status': 'error',
-                'content': f'OCR识别失败: {str(e)}',
-                'model': 'baidu-ocr'
-            }
+            yield StreamEvent('error', error=f'OCR识别失败: {str(e)}')
     
-    def analyze_text(self, text: str, proxies: dict = None) -> Generator[Dict[str, Any], None, None]:
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """
         分析文本（OCR模型不支持文本分析）
         
@@ -164,13 +142,9 @@ class BaiduOCRModel(BaseModel):
             proxies: 代理配置（未使用）
             
         Yields:
-            dict: 错误响应
+            StreamEvent: 错误响应
         """
-        yield {
-            'status': 'error',
-            'content': 'OCR模型不支持文本分析功能',
-            'model': 'baidu-ocr'
-        }
+        yield StreamEvent('error', error='OCR模型不支持文本分析功能')
     
     def get_model_identifier(self) -> str:
         """返回模型标识符"""
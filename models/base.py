@@ -1,10 +1,88 @@
 from abc import ABC, abstractmethod
 from typing import Generator, Any
 
+from .image import ImageInput
+
 # 统一推理档位：所有模型对外只暴露这三档，各子类内部映射到自家原生参数
 REASONING_TIERS = ("fast", "deep", "max")
 
 
+class StreamEvent:
+    """模型生成器吐出的统一事件。
+    流式事件（thinking/reasoning/streaming）只带增量 delta，结束事件带全文 content，
+    出错带 error；用 __slots__ 代替每次 yield 新建的 dict。"""
+    __slots__ = ('status', 'delta', 'content', 'error')
+
+    def __init__(self, status: str, delta: str = None, content: str = None, error: str = None):
+        self.status = status
+        self.delta = delta
+        self.content = content
+        self.error = error
+
+    def to_dict(self) -> dict:
+        """下发用的 dict，省略为 None 的字段"""
+        data = {'status': self.status}
+        if self.delta is not None:
+            data['delta'] = self.delta
+        if self.content is not None:
+            data['content'] = self.content
+        if self.error is not None:
+            data['error'] = self.error
+        return data
+
+    def __repr__(self):
+        return f"StreamEvent({self.to_dict()!r})"
+
+
+class StreamAccumulator:
+    """单条流（思考 / 正文）的增量累积：片段只追加进列表，
+    每攒满 COMPACT_EVERY 片就地合成一块（小 str 对象随即释放），
+    全文按需 join 一次并缓存。用于挂在对象上的长期缓冲（如下发端的流状态）：
+    属性上的 += 享受不到 CPython 对局部变量的原地拼接优化，逐片都会整段拷贝。
+    生成器里的局部缓冲直接 += 即可，更快。"""
+    __slots__ = ('_parts', '_tail')
+
+    COMPACT_EVERY = 256
+
+    def __init__(self):
+        self._parts = []    # 已合并的块
+        self._tail = []     # 尚未合并的小片段
+
+    def append(self, chunk: str) -> None:
+        if chunk:
+            tail = self._tail
+            tail.append(chunk)
+            if len(tail) >= self.COMPACT_EVERY:
+                self._parts.append(''.join(tail))
+                tail.clear()
+
+    def push(self, status: str, chunk: str) -> StreamEvent:
+        """累积一片并返回对应的增量事件"""
+        self.append(chunk)
+        return StreamEvent(status, chunk)
+
+    def complete(self, status: str) -> StreamEvent:
+        """返回携带全文的结束事件"""
+        return StreamEvent(status, None, self.text)
+
+    @property
+    def text(self) -> str:
+        parts = self._parts
+        if self._tail:
+            parts.append(''.join(self._tail))
+            self._tail.clear()
+        if len(parts) > 1:
+            # 合并成一块缓存下来，下次只需接上新片段
+            parts[:] = [''.join(parts)]
+        return parts[0] if parts else ''
+
+    def __bool__(self):
+        return bool(self._parts or self._tail)
+
+    def __str__(self):
+        return self.text
+
+
 class BaseModel(ABC):
     def __init__(self, api_key: str, temperature: float = 0.7, system_prompt: str = None, language: str = None, api_base_url: str = None, reasoning_tier: str = "deep"):
         self.api_key = api_key
@@ -16,22 +94,46 @@ class BaseModel(ABC):
         self.reasoning_tier = reasoning_tier if reasoning_tier in REASONING_TIERS else "deep"
 
     @abstractmethod
-    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[dict, None, None]:
+    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[StreamEvent, None, None]:
         """
         Analyze the given image and yield response chunks.
 
         Args:
-            image_data: Base64 encoded image data
+            image_data: ImageInput (raw bytes with cached encodings); raw
+                bytes or base64 / data URL (legacy clients) are accepted too
             proxies: Optional proxy configuration
             history: Optional follow-up turns appended after the image message,
                 each {'role': 'user'|'assistant', 'content': str}; the last
                 entry is the new user question (同题追问)
 
         Yields:
-            dict: Response chunks with status and content
+            StreamEvent: started → thinking/reasoning/streaming deltas →
+                thinking_complete/completed with full content, or error
         """
         pass
 
+    @staticmethod
+    def _image_base64(image_data) -> str:
+        """图像的 base64 文本：ImageInput 上缓存，同一张图整条链路只编码一次；
+        原始字节 / 老客户端的 base64 / data URL 也收"""
+        return ImageInput.coerce(image_data).base64
+
+    @staticmethod
+    def _image_bytes(image_data) -> bytes:
+        """图像的原始字节（SDK 直接收字节的场景，免一次编解码往返）"""
+        return ImageInput.coerce(image_data).tobytes()
+
+    @staticmethod
+    def _image_mime(image_data) -> str:
+        """按文件头判断图像的真实类型（截图可能是 PNG / WebP / JPEG，裁剪图由前端决定），
+        data URL 以声明的类型为准；认不出时回落 image/png"""
+        return ImageInput.coerce(image_data).mime
+
+    @staticmethod
+    def _image_data_url(image_data) -> str:
+        """data URL（OpenAI 兼容接口的 image_url），类型按真实格式填写"""
+        return ImageInput.coerce(image_data).data_url
+
     @staticmethod
     def _text_history(history) -> list:
         """清洗追问历史：只保留 user/assistant 的非空纯文本轮次，其余丢弃。
@@ -47,7 +149,7 @@ class BaseModel(ABC):
         return turns
 
     @abstractmethod
-    def analyze_text(self, text: str, proxies: dict = None) -> Generator[dict, None, None]:
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """
         Analyze the given text and yield response chunks.
 
@@ -56,7 +158,7 @@ class BaseModel(ABC):
             proxies: Optional proxy configuration
 
         Yields:
-            dict: Response chunks with status and content
+            StreamEvent: same contract as analyze_image
         """
         pass
 
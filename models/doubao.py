@@ -1,9 +1,9 @@
 import json
-import os
-import base64
-from typing import Generator, Dict, Any, Optional
-import requests
-from .base import BaseModel
+from typing import Generator
+from .base import BaseModel, StreamEvent
+from .image import ImageInput, JsonBody
+from . import session
+from .sse import iter_sse
 
 class DoubaoModel(BaseModel):
     """
@@ -55,320 +55,184 @@ class DoubaoModel(BaseModel):
             return self.model_name
         return "doubao-seed-1-6-250615"
     
-    def analyze_text(self, text: str, proxies: dict = None) -> Generator[dict, None, None]:
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """流式生成文本响应"""
         try:
-            yield {"status": "started"}
+            yield StreamEvent("started")
             
-            # 设置环境变量代理（如果提供）
-            original_proxies = None
-            if proxies:
-                original_proxies = {
-                    'http_proxy': os.environ.get('http_proxy'),
-                    'https_proxy': os.environ.get('https_proxy')
-                }
-                if 'http' in proxies:
-                    os.environ['http_proxy'] = proxies['http']
-                if 'https' in proxies:
-                    os.environ['https_proxy'] = proxies['https']
+            # 构建请求头
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
             
-            try:
-                # 构建请求头
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # 构建消息 - 添加系统提示词
-                messages = []
-                
-                # 添加系统提示词
-                if self.system_prompt:
-                    messages.append({
-                        "role": "system",
-                        "content": self.system_prompt
-                    })
-                
-                # 添加用户查询
-                user_content = text
-                if self.language and self.language != 'auto':
-                    user_content = f"请使用{self.language}回答以下问题: {text}"
-                
+            # 构建消息 - 添加系统提示词
+            messages = []
+            
+            # 添加系统提示词
+            if self.system_prompt:
                 messages.append({
-                    "role": "user",
-                    "content": user_content
+                    "role": "system",
+                    "content": self.system_prompt
                 })
+            
+            # 添加用户查询
+            user_content = text
+            if self.language and self.language != 'auto':
+                user_content = f"请使用{self.language}回答以下问题: {text}"
+            
+            messages.append({
+                "role": "user",
+                "content": user_content
+            })
 
-                # 按统一推理档位映射 thinking 参数
-                thinking = self._reasoning_thinking()
-
-                # 构建请求数据（temperature 为 None 时不发送，避免 Ark 收到 null 报 400）
-                data = {
-                    "model": self.get_actual_model_name(),
-                    "messages": messages,
-                    "thinking": thinking,
-                    "max_tokens": self.max_tokens,
-                    "stream": True
-                }
-                if self.temperature is not None:
-                    data["temperature"] = self.temperature
-                
-                # 发送流式请求
-                response = requests.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    stream=True,
-                    proxies=proxies if proxies else None,
-                    timeout=60
-                )
-                
-                if response.status_code != 200:
-                    error_text = response.text
-                    raise Exception(f"HTTP {response.status_code}: {error_text}")
-                
-                response.raise_for_status()
-                
-                # 初始化响应缓冲区（思考流 + 正文流分开累积，按累计字符节流）
-                response_buffer = ""
-                reasoning_buffer = ""
-                reasoning_sent = 0
-                answer_sent = 0
-                is_answering = False
-
-                # 处理流式响应
-                for line in response.iter_lines():
-                    if not line:
-                        continue
-                    
-                    line = line.decode('utf-8')
-                    if not line.startswith('data: '):
-                        continue
-                    
-                    line = line[6:]  # 移除 'data: ' 前缀
-                    
-                    if line == '[DONE]':
-                        break
-                    
-                    try:
-                        chunk_data = json.loads(line)
-                        choices = chunk_data.get('choices', [])
-                        
-                        if choices and len(choices) > 0:
-                            delta = choices[0].get('delta', {})
-                            reasoning = delta.get('reasoning_content')
-                            content = delta.get('content', '')
+            # 按统一推理档位映射 thinking 参数
+            thinking = self._reasoning_thinking()
 
-                            if reasoning:
-                                reasoning_buffer += reasoning
-                                if len(reasoning_buffer) - reasoning_sent >= 48:
-                                    reasoning_sent = len(reasoning_buffer)
-                                    yield {"status": "reasoning", "content": reasoning_buffer, "is_reasoning": True}
-                            elif content:
-                                if not is_answering:
-                                    is_answering = True
-                                    if reasoning_buffer:
-                                        yield {"status": "reasoning_complete", "content": reasoning_buffer, "is_reasoning": True}
-                                response_buffer += content
-                                if len(response_buffer) - answer_sent >= 24:
-                                    answer_sent = len(response_buffer)
-                                    yield {
-                                        "status": "streaming",
-                                        "content": response_buffer
-                                    }
-                    
-                    except json.JSONDecodeError:
-                        continue
-                
-                # 确保发送完整的最终内容
-                yield {
-                    "status": "completed",
-                    "content": response_buffer
-                }
+            # 构建请求数据（temperature 为 None 时不发送，避免 Ark 收到 null 报 400）
+            data = {
+                "model": self.get_actual_model_name(),
+                "messages": messages,
+                "thinking": thinking,
+                "max_tokens": self.max_tokens,
+                "stream": True
+            }
+            if self.temperature is not None:
+                data["temperature"] = self.temperature
             
-            finally:
-                # 恢复原始代理设置
-                if original_proxies:
-                    for key, value in original_proxies.items():
-                        if value is None:
-                            if key in os.environ:
-                                del os.environ[key]
-                        else:
-                            os.environ[key] = value
-                
+            # 发送流式请求
+            response = session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=data,
+                stream=True,
+                proxies=proxies if proxies else None
+            )
+            
+            if response.status_code != 200:
+                error_text = response.text
+                raise Exception(f"HTTP {response.status_code}: {error_text}")
+            
+            response.raise_for_status()
+            
+            yield from self._stream_events(response)
+
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"豆包API错误: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"豆包API错误: {str(e)}")
     
-    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[dict, None, None]:
+    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[StreamEvent, None, None]:
         """分析图像并流式生成响应"""
         try:
-            yield {"status": "started"}
+            yield StreamEvent("started")
             
-            # 设置环境变量代理（如果提供）
-            original_proxies = None
-            if proxies:
-                original_proxies = {
-                    'http_proxy': os.environ.get('http_proxy'),
-                    'https_proxy': os.environ.get('https_proxy')
-                }
-                if 'http' in proxies:
-                    os.environ['http_proxy'] = proxies['http']
-                if 'https' in proxies:
-                    os.environ['https_proxy'] = proxies['https']
+            # 构建请求头
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
             
-            try:
-                # 构建请求头
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # 处理图像数据
-                if image_data.startswith('data:image'):
-                    # 如果是data URI，提取base64部分
-                    image_data = image_data.split(',', 1)[1]
-                
-                # 构建用户消息 - 使用豆包API官方示例格式
-                # 首先检查图像数据的格式，确保是有效的图像
-                image_format = "jpeg"  # 默认使用jpeg
-                if image_data.startswith('/9j/'):  # JPEG magic number in base64
-                    image_format = "jpeg"
-                elif image_data.startswith('iVBORw0KGgo'):  # PNG magic number in base64
-                    image_format = "png"
-                
-                # 构建消息
-                messages = []
-                
-                # 添加系统提示词
-                if self.system_prompt:
-                    messages.append({
-                        "role": "system",
-                        "content": self.system_prompt
-                    })
-                
-                user_content = [
-                    {
-                        "type": "text",
-                        "text": f"请使用{self.language}分析这张图片并提供详细解答。" if self.language and self.language != 'auto' else "请分析这张图片并提供详细解答?"
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/{image_format};base64,{image_data}"
-                        }
-                    }
-                ]
-
+            # 图片 data URL 在发送时按块现编（类型按文件头判断），请求体不整体成形
+            image_url = ImageInput.coerce(image_data).data_url_part()
+            
+            # 构建消息
+            messages = []
+            
+            # 添加系统提示词
+            if self.system_prompt:
                 messages.append({
-                    "role": "user",
-                    "content": user_content
+                    "role": "system",
+                    "content": self.system_prompt
                 })
+            
+            user_content = [
+                {
+                    "type": "text",
+                    "text": f"请使用{self.language}分析这张图片并提供详细解答。" if self.language and self.language != 'auto' else "请分析这张图片并提供详细解答?"
+                },
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_url
+                    }
+                }
+            ]
 
-                # 同题追问：既往问答与新追问追加在带图首轮之后
-                messages.extend(self._text_history(history))
+            messages.append({
+                "role": "user",
+                "content": user_content
+            })
 
-                # 按统一推理档位映射 thinking 参数
-                thinking = self._reasoning_thinking()
+            # 同题追问：既往问答与新追问追加在带图首轮之后
+            messages.extend(self._text_history(history))
 
-                # 构建请求数据（temperature 为 None 时不发送，避免 Ark 收到 null 报 400）
-                data = {
-                    "model": self.get_actual_model_name(),
-                    "messages": messages,
-                    "thinking": thinking,
-                    "max_tokens": self.max_tokens,
-                    "stream": True
-                }
-                if self.temperature is not None:
-                    data["temperature"] = self.temperature
-                
-                # 发送流式请求
-                response = requests.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=data,
-                    stream=True,
-                    proxies=proxies if proxies else None,
-                    timeout=60
-                )
-                
-                if response.status_code != 200:
-                    error_text = response.text
-                    raise Exception(f"HTTP {response.status_code}: {error_text}")
-                
-                response.raise_for_status()
-                
-                # 初始化响应缓冲区（思考流 + 正文流分开累积，按累计字符节流）
-                response_buffer = ""
-                reasoning_buffer = ""
-                reasoning_sent = 0
-                answer_sent = 0
-                is_answering = False
+            # 按统一推理档位映射 thinking 参数
+            thinking = self._reasoning_thinking()
 
-                # 处理流式响应
-                for line in response.iter_lines():
-                    if not line:
-                        continue
-                    
-                    line = line.decode('utf-8')
-                    if not line.startswith('data: '):
-                        continue
-                    
-                    line = line[6:]  # 移除 'data: ' 前缀
-                    
-                    if line == '[DONE]':
-                        break
-                    
-                    try:
-                        chunk_data = json.loads(line)
-                        choices = chunk_data.get('choices', [])
-                        
-                        if choices and len(choices) > 0:
-                            delta = choices[0].get('delta', {})
-                            reasoning = delta.get('reasoning_content')
-                            content = delta.get('content', '')
-
-                            if reasoning:
-                                reasoning_buffer += reasoning
-                                if len(reasoning_buffer) - reasoning_sent >= 48:
-                                    reasoning_sent = len(reasoning_buffer)
-                                    yield {"status": "reasoning", "content": reasoning_buffer, "is_reasoning": True}
-                            elif content:
-                                if not is_answering:
-                                    is_answering = True
-                                    if reasoning_buffer:
-                                        yield {"status": "reasoning_complete", "content": reasoning_buffer, "is_reasoning": True}
-                                response_buffer += content
-                                if len(response_buffer) - answer_sent >= 24:
-                                    answer_sent = len(response_buffer)
-                                    yield {
-                                        "status": "streaming",
-                                        "content": response_buffer
-                                    }
-                    
-                    except json.JSONDecodeError:
-                        continue
-                
-                # 确保发送完整的最终内容
-                yield {
-                    "status": "completed",
-                    "content": response_buffer
-                }
+            # 构建请求数据（temperature 为 None 时不发送，避免 Ark 收到 null 报 400）
+            data = {
+                "model": self.get_actual_model_name(),
+                "messages": messages,
+                "thinking": thinking,
+                "max_tokens": self.max_tokens,
+                "stream": True
+            }
+            if self.temperature is not None:
+                data["temperature"] = self.temperature
+            
+            # 发送流式请求
+            response = session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                data=JsonBody(data),
+                stream=True,
+                proxies=proxies if proxies else None
+            )
+            
+            if response.status_code != 200:
+                error_text = response.text
+                raise Exception(f"HTTP {response.status_code}: {error_text}")
             
-            finally:
-                # 恢复原始代理设置
-                if original_proxies:
-                    for key, value in original_proxies.items():
-                        if value is None:
-                            if key in os.environ:
-                                del os.environ[key]
-                        else:
-                            os.environ[key] = value
-                
+            response.raise_for_status()
+            
+            yield from self._stream_events(response)
+
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"豆包图像分析错误: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"豆包图像分析错误: {str(e)}")
+
+    def _stream_events(self, response):
+        """把方舟 chat/completions 的 SSE 流翻译为统一事件
+        （思考流 + 正文流分开累积，逐片增量下发，合帧在服务端统一做）"""
+        answer = ""
+        thinking = ""
+        is_answering = False
+
+        for event in iter_sse(response):
+            if event.data == '[DONE]':
+                break
+
+            try:
+                chunk_data = event.json()
+            except json.JSONDecodeError:
+                continue
+
+            choices = chunk_data.get('choices', [])
+            if not choices:
+                continue
+
+            delta = choices[0].get('delta', {})
+            reasoning = delta.get('reasoning_content')
+            content = delta.get('content', '')
+
+            if reasoning:
+                thinking += reasoning
+                yield StreamEvent("reasoning", reasoning)
+            elif content:
+                if not is_answering:
+                    is_answering = True
+                    if thinking:
+                        yield StreamEvent("reasoning_complete", content=thinking)
+                answer += content
+                yield StreamEvent("streaming", content)
+
+        # 确保发送完整的最终内容
+        yield StreamEvent("completed", content=answer)
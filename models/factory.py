@@ -6,6 +6,30 @@ from .base import BaseModel
 from .mathpix import MathpixModel  # MathpixModel需要直接导入，因为它是特殊OCR工具
 from .baidu_ocr import BaiduOCRModel  # 百度OCR也是特殊OCR工具，直接导入
 
+# models.json 里 imageConstraints 的键 → 内部键；提供商级为默认值，模型级逐项覆盖
+_IMAGE_CONSTRAINT_KEYS = {
+    'maxEdge': 'max_edge',
+    'maxPixels': 'max_pixels',
+    'maxBytes': 'max_bytes',
+    'format': 'format',
+    # 手机端上传裁剪图时的编码提示（webp / jpeg / png、0~1 质量）与是否转灰度
+    'uploadFormat': 'upload_format',
+    'uploadQuality': 'upload_quality',
+    'grayscale': 'grayscale',
+}
+
+# 百度 OCR：base64 后不超过 10 MB，最长边不超过 8192
+_BAIDU_OCR_CONSTRAINTS = {'max_edge': 8192, 'max_bytes': 7 * 1024 * 1024, 'format': 'png'}
+
+
+def _image_constraints(*sources) -> Dict[str, Any]:
+    constraints = {}
+    for source in sources:
+        for key, value in (source or {}).items():
+            if key in _IMAGE_CONSTRAINT_KEYS and value is not None:
+                constraints[_IMAGE_CONSTRAINT_KEYS[key]] = value
+    return constraints
+
 class ModelFactory:
     # 模型基本信息，包含类型和特性
     _models: Dict[str, Dict[str, Any]] = {}
@@ -40,7 +64,10 @@ class ModelFactory:
                         'display_name': model_info.get('name', model_id),
                         'description': model_info.get('description', ''),
                         'reasoning_tiers': model_info.get('reasoningTiers', ['fast', 'deep', 'max'] if model_info.get('isReasoning') else ['fast']),
-                        'default_tier': model_info.get('defaultTier', 'deep' if model_info.get('isReasoning') else 'fast')
+                        'default_tier': model_info.get('defaultTier', 'deep' if model_info.get('isReasoning') else 'fast'),
+                        'image_constraints': _image_constraints(
+                            providers[provider_id].get('imageConstraints'), model_info.get('imageConstraints')
+                        )
                     }
             
             # 添加特殊OCR工具模型（不在配置文件中定义）
@@ -62,7 +89,8 @@ class ModelFactory:
                 'is_reasoning': False,
                 'display_name': '百度OCR',
                 'description': '通用文字识别工具，支持中文识别',
-                'is_ocr_only': True
+                'is_ocr_only': True,
+                'image_constraints': _BAIDU_OCR_CONSTRAINTS
             }
             
             print(f"已从配置加载 {len(cls._models)} 个模型")
@@ -104,7 +132,8 @@ class ModelFactory:
                 'is_reasoning': False,
                 'display_name': '百度OCR',
                 'description': '通用文字识别工具，支持中文识别',
-                'is_ocr_only': True
+                'is_ocr_only': True,
+                'image_constraints': _BAIDU_OCR_CONSTRAINTS
             }
         except Exception as e:
             print(f"无法加载百度OCR工具: {str(e)}")
@@ -273,6 +302,12 @@ class ModelFactory:
         """判断模型是否为推理模型"""
         return cls._models.get(model_name, {}).get('is_reasoning', False)
     
+    @classmethod
+    def get_image_constraints(cls, model_name: str) -> Dict[str, Any]:
+        """模型的图片输入约束：max_edge / max_pixels / max_bytes / format（及上传提示
+        upload_format / upload_quality / grayscale），未配置的项不出现"""
+        return dict(cls._models.get(model_name, {}).get('image_constraints') or {})
+
     @classmethod
     def get_model_display_name(cls, model_name: str) -> str:
         """获取模型的显示名称"""
@@ -1,9 +1,8 @@
 import json
 import os
-import base64
 from typing import Generator, Dict, Any, Optional, List
 import google.generativeai as genai
-from .base import BaseModel
+from .base import BaseModel, StreamEvent
 
 class GoogleModel(BaseModel):
     """
@@ -69,10 +68,10 @@ class GoogleModel(BaseModel):
             budget_map = {'fast': 2048, 'deep': 8192, 'max': -1}
             generation_config['thinking_config'] = {'thinking_budget': budget_map.get(tier, 8192)}
     
-    def analyze_text(self, text: str, proxies: dict = None) -> Generator[dict, None, None]:
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """流式生成文本响应"""
         try:
-            yield {"status": "started"}
+            yield StreamEvent("started")
             
             # 设置环境变量代理（如果提供）
             original_proxies = None
@@ -131,21 +130,12 @@ class GoogleModel(BaseModel):
                     if not chunk.text:
                         continue
                     
-                    # 累积响应文本
+                    # 发送响应增量（合帧节流在服务端统一做）
                     response_buffer += chunk.text
-                    
-                    # 发送响应进度
-                    if len(chunk.text) >= 10 or chunk.text.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                        yield {
-                            "status": "streaming",
-                            "content": response_buffer
-                        }
+                    yield StreamEvent("streaming", chunk.text)
                 
                 # 确保发送完整的最终内容
-                yield {
-                    "status": "completed",
-                    "content": response_buffer
-                }
+                yield StreamEvent("completed", content=response_buffer)
             
             finally:
                 # 恢复原始代理设置
@@ -158,15 +148,12 @@ class GoogleModel(BaseModel):
                             os.environ[key] = value
                 
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"Gemini API错误: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"Gemini API错误: {str(e)}")
     
-    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[dict, None, None]:
+    def analyze_image(self, image_data: str, proxies: dict = None, history: list = None) -> Generator[StreamEvent, None, None]:
         """分析图像并流式生成响应"""
         try:
-            yield {"status": "started"}
+            yield StreamEvent("started")
             
             # 设置环境变量代理（如果提供）
             original_proxies = None
@@ -211,15 +198,10 @@ class GoogleModel(BaseModel):
                 else:
                     prompt_parts.append("请分析这张图片并提供详细解答。")
                 
-                # 处理图像数据
-                if image_data.startswith('data:image'):
-                    # 如果是data URI，提取base64部分
-                    image_data = image_data.split(',', 1)[1]
-                
-                # 使用genai的特定方法处理图像
+                # 使用genai的特定方法处理图像（SDK 直接收原始字节）
                 image_part = {
-                    "mime_type": "image/jpeg",
-                    "data": base64.b64decode(image_data)
+                    "mime_type": self._image_mime(image_data),
+                    "data": self._image_bytes(image_data)
                 }
                 prompt_parts.append(image_part)
 
@@ -249,21 +231,12 @@ class GoogleModel(BaseModel):
                     if not chunk.text:
                         continue
                     
-                    # 累积响应文本
+                    # 发送响应增量（合帧节流在服务端统一做）
                     response_buffer += chunk.text
-                    
-                    # 发送响应进度
-                    if len(chunk.text) >= 10 or chunk.text.endswith(('.', '!', '?', '。', '！', '？', '\n')):
-                        yield {
-                            "status": "streaming",
-                            "content": response_buffer
-                        }
+                    yield StreamEvent("streaming", chunk.text)
                 
                 # 确保发送完整的最终内容
-                yield {
-                    "status": "completed",
-                    "content": response_buffer
-                }
+                yield StreamEvent("completed", content=response_buffer)
             
             finally:
                 # 恢复原始代理设置
@@ -276,7 +249,4 @@ class GoogleModel(BaseModel):
                             os.environ[key] = value
                 
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"Gemini图像分析错误: {str(e)}"
-            } 
\ No newline at end of file
+            yield StreamEvent("error", error=f"Gemini图像分析错误: {str(e)}") 
\ No newline at end of file
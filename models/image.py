@@ -0,0 +1,208 @@
+"""送模型的图片：一份原始字节贯穿整条解题链路，各家需要的编码按需生成并缓存
+
+以前同一张图在链路上有好几份：socket 收到的 base64 文本、Google 解码回的字节、
+OpenAI / Mathpix 拼的 data URL，最后 requests 的 json= 再把整个请求体序列化成一份。
+ImageInput 只持有原始字节（memoryview 引用，不复制），base64 / data URL 第一次用到时
+生成并缓存；老客户端传来的 base64 文本原样留作缓存，需要字节时才解码。
+
+直接走 requests 的模型用 JsonBody 发请求体：图片位置放 image.base64_part() /
+image.data_url_part() 占位，其余字段照常 json 序列化，图片的 base64 在发送时按块现编，
+整个请求体不在内存里成形；长度预先算好，照常带 Content-Length（不走 chunked）。
+"""
+import base64
+import binascii
+import json
+import uuid
+from typing import Iterator, Optional, Union
+
+# 图像文件头 → 媒体类型（WebP 需同时看 RIFF 与 WEBP 两段，单独判断）
+_IMAGE_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+# 请求体按块编码的原始字节数（3 的倍数，块间 base64 无填充可直接拼接）
+BODY_CHUNK = 48 * 1024
+
+
+def sniff_mime(head: bytes) -> str:
+    """按文件头判断图像类型，认不出时回落 image/png"""
+    for magic, mime in _IMAGE_MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/png'
+
+
+class ImageInput:
+    """一张图片的原始字节与按需缓存的编码。
+    可由原始字节（bytes / bytearray / memoryview）、base64 文本或 data URL 构造"""
+    __slots__ = ('_data', '_base64', '_mime', '_data_url')
+
+    def __init__(self, source: Union[bytes, bytearray, memoryview, str]):
+        self._data = None
+        self._base64 = None
+        self._mime = None
+        self._data_url = None
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._data = memoryview(source).cast('B') if not isinstance(source, bytes) else source
+        elif isinstance(source, str):
+            if source.startswith('data:'):
+                header, _, source = source.partition(',')
+                self._mime = header[5:].split(';', 1)[0] or None
+            self._base64 = source
+        else:
+            raise TypeError(f'不支持的图片数据类型: {type(source).__name__}')
+
+    @classmethod
+    def coerce(cls, value) -> 'ImageInput':
+        return value if isinstance(value, cls) else cls(value)
+
+    @property
+    def data(self):
+        """原始字节（bytes 或 memoryview，均支持缓冲区协议，不复制）"""
+        if self._data is None:
+            self._data = base64.b64decode(self._base64)
+        return self._data
+
+    def tobytes(self) -> bytes:
+        data = self.data
+        return data if isinstance(data, bytes) else bytes(data)
+
+    @property
+    def mime(self) -> str:
+        if self._mime is None:
+            if self._data is not None:
+                head = bytes(self._data[:12])
+            else:
+                try:
+                    head = base64.b64decode(self._base64[:16])
+                except (ValueError, binascii.Error):
+                    head = b''
+            self._mime = sniff_mime(head)
+        return self._mime
+
+    @property
+    def base64(self) -> str:
+        """base64 文本（第一次用到时编码并缓存；SDK 只收整串时用）"""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self._data).decode('ascii')
+        return self._base64
+
+    @property
+    def data_url(self) -> str:
+        if self._data_url is None:
+            self._data_url = f'data:{self.mime};base64,{self.base64}'
+        return self._data_url
+
+    def __len__(self) -> int:
+        """原始字节数"""
+        if self._data is not None:
+            return self._data.nbytes if isinstance(self._data, memoryview) else len(self._data)
+        b64 = self._base64.rstrip('=')
+        return len(b64) * 3 // 4
+
+    def base64_length(self) -> int:
+        if self._base64 is not None:
+            return len(self._base64)
+        return 4 * -(-len(self) // 3)
+
+    def iter_base64(self, chunk: int = BODY_CHUNK) -> Iterator[bytes]:
+        """按块产出 base64 的 ASCII 字节：已有缓存直接切片，否则逐块现编（不生成整串）"""
+        if self._base64 is not None:
+            text = self._base64
+            step = chunk * 4 // 3
+            for i in range(0, len(text), step):
+                yield text[i:i + step].encode('ascii')
+            return
+        view = memoryview(self._data)
+        for i in range(0, len(view), chunk):
+            yield base64.b64encode(view[i:i + chunk])
+
+    def base64_part(self) -> '_ImagePart':
+        """JsonBody 里的 base64 字段占位"""
+        return _ImagePart(self, b'')
+
+    def data_url_part(self) -> '_ImagePart':
+        """JsonBody 里的 data URL 字段占位"""
+        return _ImagePart(self, f'data:{self.mime};base64,'.encode('ascii'))
+
+    def __repr__(self):
+        return f'ImageInput({self.mime}, {len(self)} bytes)'
+
+
+class _ImagePart:
+    __slots__ = ('image', 'prefix')
+
+    def __init__(self, image: ImageInput, prefix: bytes):
+        self.image = image
+        self.prefix = prefix
+
+    def __len__(self) -> int:
+        return len(self.prefix) + self.image.base64_length()
+
+    def chunks(self) -> Iterator[bytes]:
+        if self.prefix:
+            yield self.prefix
+        yield from self.image.iter_base64()
+
+
+class JsonBody:
+    """流式 JSON 请求体：requests.post(data=JsonBody(payload)) 按块读取发送。
+    payload 里的 _ImagePart 占位在发送时展开为图片的 base64，其余部分照常序列化（都很小）"""
+
+    def __init__(self, payload):
+        parts = []
+        token = uuid.uuid4().hex
+
+        def default(value):
+            if isinstance(value, _ImagePart):
+                parts.append(value)
+                return f'{token}:{len(parts) - 1}'
+            raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+        text = json.dumps(payload, ensure_ascii=False, default=default)
+        # 占位串两侧的引号保留，中间换成图片内容（base64 / data URL 都不含需转义的字符）
+        self._pieces = []
+        rest = text
+        for index, part in enumerate(parts):
+            before, rest = rest.split(f'{token}:{index}', 1)
+            self._pieces.append(before.encode('utf-8'))
+            self._pieces.append(part)
+        self._pieces.append(rest.encode('utf-8'))
+        self._length = sum(len(piece) for piece in self._pieces)
+        self._iter = None
+        self._buffer = b''
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        for piece in self._pieces:
+            if isinstance(piece, _ImagePart):
+                yield from piece.chunks()
+            elif piece:
+                yield piece
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """file-like 读取（http.client 按 blocksize 调用）"""
+        if self._iter is None:
+            self._iter = iter(self)
+        if size is None or size < 0:
+            data = self._buffer + b''.join(self._iter)
+            self._buffer = b''
+            return data
+        while len(self._buffer) < size:
+            chunk = next(self._iter, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def getvalue(self) -> bytes:
+        """整个请求体（调试 / 测量用）"""
+        return b''.join(iter(self))
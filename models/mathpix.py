@@ -1,7 +1,9 @@
 from typing import Generator, Dict, Any
 import json
 import requests
-from .base import BaseModel
+from .base import BaseModel, StreamEvent
+from .image import ImageInput, JsonBody
+from . import session
 
 class MathpixModel(BaseModel):
     """
@@ -95,19 +97,19 @@ class MathpixModel(BaseModel):
         self.current_preset = "math"
 
     def analyze_image(self, image_data: str, proxies: dict = None, content_type: str = None, 
-                     confidence_threshold: float = 0.8, max_retries: int = 3) -> Generator[dict, None, None]:
+                     confidence_threshold: float = 0.8, max_retries: int = 3) -> Generator[StreamEvent, None, None]:
         """
         Analyze an image using Mathpix OCR API.
         
         Args:
-            image_data: Base64 encoded image data
+            image_data: Raw image bytes or base64 encoded image data
             proxies: Optional proxy configuration
             content_type: Type of content to analyze ('math', 'text', or 'table')
             confidence_threshold: Minimum confidence score to accept (0.0 to 1.0)
             max_retries: Maximum number of retry attempts for failed requests
             
         Yields:
-            dict: Response chunks with status and content
+            StreamEvent: Response chunks with status and content
         """
         if content_type and content_type in self.presets:
             self.current_preset = content_type
@@ -117,7 +119,7 @@ class MathpixModel(BaseModel):
         try:
             # Prepare request payload
             payload = {
-                "src": f"data:image/jpeg;base64,{image_data}",
+                "src": ImageInput.coerce(image_data).data_url_part(),
                 "formats": preset["formats"],
                 "data_options": preset["data_options"],
                 "ocr_options": preset["ocr_options"]
@@ -129,12 +131,12 @@ class MathpixModel(BaseModel):
             while retry_count < max_retries:
                 try:
                     # Send request to Mathpix API with timeout
-                    response = requests.post(
+                    response = session.post(
                         self.api_url,
                         headers=self.headers,
-                        json=payload,
+                        data=JsonBody(payload),  # 每次重试新建：请求体按块读，读过即耗尽
                         proxies=proxies,
-                        timeout=25  # 25 second timeout
+                        timeout=(session.CONNECT_TIMEOUT, 25)  # 25 second read timeout
                     )
                     
                     # Handle specific API error codes
@@ -150,10 +152,7 @@ class MathpixModel(BaseModel):
                     
                     # Check confidence threshold
                     if 'confidence' in result and result['confidence'] < confidence_threshold:
-                        yield {
-                            "status": "warning",
-                            "content": f"Low confidence score: {result['confidence']:.2%}"
-                        }
+                        yield StreamEvent("warning", content=f"Low confidence score: {result['confidence']:.2%}")
                     
                     break  # Success, exit retry loop
                     
@@ -167,37 +166,21 @@ class MathpixModel(BaseModel):
             formatted_response = self._format_response(result)
             
             # Yield initial status
-            yield {
-                "status": "started",
-                "content": ""
-            }
+            yield StreamEvent("started")
             
             # Yield the formatted response
-            yield {
-                "status": "completed",
-                "content": formatted_response,
-                "model": self.get_model_identifier()
-            }
+            yield StreamEvent("completed", content=formatted_response)
             
         except requests.exceptions.RequestException as e:
-            yield {
-                "status": "error",
-                "error": f"Mathpix API error: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"Mathpix API error: {str(e)}")
         except Exception as e:
-            yield {
-                "status": "error",
-                "error": f"Error processing image: {str(e)}"
-            }
+            yield StreamEvent("error", error=f"Error processing image: {str(e)}")
 
-    def analyze_text(self, text: str, proxies: dict = None) -> Generator[dict, None, None]:
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
         """
         Not implemented for Mathpix model as it only processes images.
         """
-        yield {
-            "status": "error",
-            "error": "Text analysis is not supported by Mathpix model"
-        }
+        yield StreamEvent("error", error="Text analysis is not supported by Mathpix model")
 
     def get_default_system_prompt(self) -> str:
         """
@@ -293,7 +276,7 @@ class MathpixModel(BaseModel):
         专门用于提取图像中的全部文本内容，忽略数学公式和表格等其他元素。
         
         Args:
-            image_data: Base64编码的图像数据
+            image_data: 原始图像字节或Base64编码的图像数据
             proxies: 可选的代理配置
             max_retries: 请求失败时的最大重试次数
             
@@ -303,7 +286,7 @@ class MathpixModel(BaseModel):
         try:
             # 准备请求负载，使用专为全文提取配置的参数
             payload = {
-                "src": f"data:image/jpeg;base64,{image_data}",
+                "src": ImageInput.coerce(image_data).data_url_part(),
                 "formats": ["text"],
                 "data_options": {
                     "include_latex": False,
@@ -325,12 +308,12 @@ class MathpixModel(BaseModel):
             while retry_count < max_retries:
                 try:
                     # 发送请求到Mathpix API
-                    response = requests.post(
+                    response = session.post(
                         self.api_url,
                         headers=self.headers,
-                        json=payload,
+                        data=JsonBody(payload),  # 每次重试新建：请求体按块读，读过即耗尽
                         proxies=proxies,
-                        timeout=30  # 30秒超时
+                        timeout=(session.CONNECT_TIMEOUT, 30)  # 30秒读超时
                     )
                     
                     # 处理特定API错误代码
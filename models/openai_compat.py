@@ -0,0 +1,163 @@
+"""OpenAI 兼容接口（OpenAI / DeepSeek / 通义 DashScope / Kimi）共用的流式引擎
+
+以前这几家每次 analyze_* 都新建一个 OpenAI 客户端：底层 httpx 连接池随之丢弃，
+每题重新握手；代理靠临时改 os.environ，并发解题时互相串；逐 chunk 的处理抄了四份。
+现在：
+- 客户端按 (api_key, base_url, 代理) 在进程内缓存复用，keep-alive 连接留在池里；
+  代理直接挂在客户端的 transport 上，不再改环境变量；
+- 流式增量（reasoning_content 思考过程 / content 正文）在 OpenAICompatModel 里统一处理，
+  各家子类只给出参数映射：服务地址、请求参数、消息内容形状、思考事件名。
+"""
+import collections
+import threading
+from typing import Generator
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+from .base import BaseModel, StreamEvent
+from . import session
+
+# 最多缓存的客户端数（每个 key / 中转地址 / 代理组合一个）
+MAX_CLIENTS = 16
+
+_clients = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _proxy_key(proxies) -> tuple:
+    return tuple(sorted((proxies or {}).items()))
+
+
+def _http_client(proxies: dict):
+    """带代理的 httpx 客户端：按 scheme 挂代理 transport（SDK 缺省超时 / 重定向设置不变）"""
+    limits = httpx.Limits(max_keepalive_connections=session.POOL_MAXSIZE)
+    mounts = {
+        f'{scheme}://': httpx.HTTPTransport(proxy=url, limits=limits)
+        for scheme, url in proxies.items() if scheme in ('http', 'https') and url
+    }
+    return DefaultHttpxClient(mounts=mounts) if mounts else None
+
+
+def client_for(api_key: str, base_url: str = None, proxies: dict = None) -> OpenAI:
+    """(api_key, base_url, 代理) 对应的共享客户端；OpenAI 客户端线程安全，可并发流式"""
+    key = (api_key, base_url or None, _proxy_key(proxies))
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        http_client = _http_client(proxies) if proxies else None
+        client = OpenAI(api_key=api_key, base_url=base_url or None, http_client=http_client)
+        _clients[key] = client
+        # 淘汰的客户端不主动 close：可能还有流在读，引用释放后由 SDK 回收连接
+        while len(_clients) > MAX_CLIENTS:
+            _clients.popitem(last=False)
+        return client
+
+
+def stats() -> dict:
+    """缓存中的客户端（不含密钥，调试用）"""
+    with _lock:
+        keys = list(_clients.keys())
+    return {'clients': [{'base_url': base_url, 'proxy': bool(proxies)} for _, base_url, proxies in keys]}
+
+
+class OpenAICompatModel(BaseModel):
+    """OpenAI 兼容接口的公共实现，子类按需覆盖：
+    - default_base_url：未配置中转时的服务地址（None 即 SDK 缺省 / OPENAI_BASE_URL）
+    - thinking_status：reasoning_content 增量的事件名，None 表示不取思考过程
+    - image_prompt：带图首轮的提问
+    - _request_params()：max_tokens / temperature / 推理档位等请求参数
+    - _text_content() / _image_content()：消息内容形状
+    - _error_message()：出错时给用户的提示"""
+    default_base_url = None
+    thinking_status = None
+    image_prompt = "请分析这个图片并提供详细的解答。"
+
+    def _base_url(self) -> str:
+        return self.api_base_url or self.default_base_url
+
+    def _has_thinking(self) -> bool:
+        """本次请求是否会产生思考过程（推理档位可关闭思考的子类覆盖）"""
+        return self.thinking_status is not None
+
+    def _request_params(self) -> dict:
+        return {}
+
+    def _text_content(self, text: str):
+        return text
+
+    def _image_content(self, image_data):
+        return [
+            {"type": "image_url", "image_url": {"url": self._image_data_url(image_data)}},
+            {"type": "text", "text": self.image_prompt}
+        ]
+
+    def _error_message(self, error: Exception) -> str:
+        return str(error)
+
+    def analyze_text(self, text: str, proxies: dict = None) -> Generator[StreamEvent, None, None]:
+        messages = [
+            {"role": "system", "content": self._text_content(self.system_prompt)},
+            {"role": "user", "content": self._text_content(text)}
+        ]
+        yield from self._stream(messages, proxies)
+
+    def analyze_image(self, image_data, proxies: dict = None, history: list = None) -> Generator[StreamEvent, None, None]:
+        messages = [
+            {"role": "system", "content": self._text_content(self.system_prompt)},
+            {"role": "user", "content": self._image_content(image_data)}
+        ]
+        # 同题追问：既往问答与新追问追加在带图首轮之后（纯文本轮次用字符串 content）
+        messages.extend(self._text_history(history))
+        yield from self._stream(messages, proxies)
+
+    def _stream(self, messages: list, proxies: dict = None) -> Generator[StreamEvent, None, None]:
+        try:
+            yield StreamEvent("started")
+            client = client_for(self.api_key, self._base_url(), proxies)
+            response = client.chat.completions.create(
+                model=self.get_model_identifier(),
+                messages=messages,
+                stream=True,
+                **self._request_params()
+            )
+            try:
+                yield from self._iter_events(response)
+            finally:
+                # 停止生成时生成器被关闭，及时释放连接
+                response.close()
+        except Exception as e:
+            yield StreamEvent("error", error=self._error_message(e))
+
+    def _iter_events(self, response) -> Generator[StreamEvent, None, None]:
+        """chunk → 事件：思考增量 → 思考结束（正文开始时）→ 正文增量 → completed。
+        逐 chunk 吐增量，合帧节流在服务端统一做"""
+        thinking_status = self.thinking_status if self._has_thinking() else None
+        thinking = ""
+        answer = ""
+        answering = False
+        for chunk in response:
+            choices = chunk.choices
+            if not choices:
+                continue
+            delta = choices[0].delta
+            if thinking_status is not None:
+                reasoning = getattr(delta, 'reasoning_content', None)
+                if reasoning:
+                    thinking += reasoning
+                    yield StreamEvent(thinking_status, reasoning)
+            content = delta.content
+            if content:
+                if not answering:
+                    answering = True
+                    if thinking:
+                        yield StreamEvent(f"{thinking_status}_complete", content=thinking)
+                answer += content
+                yield StreamEvent("streaming", content)
+
+        if not answering and thinking:
+            yield StreamEvent(f"{thinking_status}_complete", content=thinking)
+        # 正文为空时以思考过程兜底，总以一条 completed 结束本次生成
+        yield StreamEvent("completed", content=answer or thinking)
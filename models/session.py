@@ -0,0 +1,93 @@
+"""直接走 requests 的模型共用的 HTTP 连接池
+
+以前每次解题都调模块级 requests.post：每个请求新建一个 Session，用完即关，
+到模型服务商或中转地址都要重新握一次 TCP + TLS（跨境线路上常常几百毫秒）。
+现在按 (服务地址的 scheme://host:port, 代理) 在进程内复用 Session：
+- 同一目标的连接保持 keep-alive，下一题直接复用，省掉握手；
+- 每个 Session 的连接池有上限（POOL_MAXSIZE），超出的并发请求临时建连、用完即关；
+- Session 数有上限（MAX_SESSIONS），最久未用的移出缓存；不主动 close（别的线程可能
+  还在读它上面的流），引用释放后连接随之回收；
+- 超时统一为 (连接, 读)：读超时是两次收到数据之间的最长间隔，流式输出不受总时长限制。
+流式响应没读完就放弃时（停止生成）要 close()，连接才会被丢弃而不是卡在池里。
+"""
+import collections
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 连接超时 / 读超时（秒）
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+# 每个 Session 保留的主机池数与每个主机池的空闲连接数；最多保留的 Session 数
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+MAX_SESSIONS = 16
+
+_sessions = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f'{parts.scheme}://{parts.hostname}:{port}'
+
+
+def _proxy_key(proxies) -> tuple:
+    return tuple(sorted((proxies or {}).items()))
+
+
+def session_for(url: str, proxies: dict = None) -> requests.Session:
+    """url 所在服务（经 proxies 代理时另算）的共享 Session"""
+    key = (_origin(url), _proxy_key(proxies))
+    with _lock:
+        session = _sessions.get(key)
+        if session is not None:
+            _sessions.move_to_end(key)
+            return session
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        if proxies:
+            session.proxies.update(proxies)
+        _sessions[key] = session
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+        return session
+
+
+def post(url: str, proxies: dict = None, timeout=TIMEOUT, **kwargs) -> requests.Response:
+    """requests.post 的替代：走共享 Session，缺省 (连接, 读) 超时"""
+    return session_for(url, proxies).post(url, proxies=proxies, timeout=timeout, **kwargs)
+
+
+def reset() -> None:
+    """清空缓存（同样不 close，进行中的流不受影响）"""
+    with _lock:
+        _sessions.clear()
+
+
+def stats() -> dict:
+    """各 Session 的目标与连接池占用（调试用）"""
+    with _lock:
+        items = list(_sessions.items())
+    result = []
+    for (origin, proxies), session in items:
+        pools = []
+        for adapter in set(session.adapters.values()):
+            managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+            for pool in filter(None, [m.pools.get(k) for m in managers for k in list(m.pools.keys())]):
+                # 池队列里 None 是尚未建立的空位，只数真连接
+                idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+                pools.append({
+                    'host': f'{pool.scheme}://{pool.host}:{pool.port}',
+                    'idle': idle,
+                    'connections': pool.num_connections,
+                    'requests': pool.num_requests,
+                })
+        result.append({'origin': origin, 'proxy': bool(proxies), 'pools': pools})
+    return {'sessions': result}
@@ -0,0 +1,135 @@
+"""增量 SSE（text/event-stream）解码，供直接走 requests 的模型共用
+
+按字节流喂入，任意切块都可：行边界只在 \\n / \\r 上切，UTF-8 多字节序列
+被拆在两次读之间也不会解坏；支持多行 data:、event: / id: / retry: 字段与注释行。
+"""
+import json
+from typing import Iterator, List, Optional
+
+# chunked 响应按 HTTP 块交付，大块读不会攒满才返回
+READ_CHUNK_SIZE = 64 * 1024
+# 非 chunked 响应的读会阻塞到凑满为止，只能小块读保证时延
+READ_CHUNK_SIZE_UNCHUNKED = 1024
+
+
+class SSEEvent:
+    """一条已分派的事件；event 缺省为 message。
+    data 按需解码：调用方多半只 json() 一下，直接喂字节省一次中间 str"""
+    __slots__ = ('event', 'id', 'retry', '_raw', '_data')
+
+    def __init__(self, event: str = 'message', raw: bytes = b'', id: Optional[str] = None, retry: Optional[int] = None):
+        self.event = event
+        self.id = id
+        self.retry = retry
+        self._raw = raw
+        self._data = None
+
+    @property
+    def data(self) -> str:
+        if self._data is None:
+            self._data = self._raw.decode('utf-8')
+        return self._data
+
+    def json(self):
+        """data 按 JSON 解析（失败抛 json.JSONDecodeError）"""
+        return json.loads(self._raw)
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data!r})"
+
+
+class SSEDecoder:
+    """流式解码器：feed() 喂入字节块，返回本块凑齐的事件"""
+
+    def __init__(self):
+        self._buf = b''
+        self._event = b''
+        self._data = []
+        self._id = None
+        self._retry = None
+        self._names = {}    # 事件名字节 → str，同名事件反复出现不重复解码
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        buf = self._buf + chunk if self._buf else chunk
+        # 末尾的 \r 可能是被拆开的 \r\n，留到下一块再判
+        end = len(buf) - 1 if buf.endswith(b'\r') else len(buf)
+        cut = max(buf.rfind(b'\n', 0, end), buf.rfind(b'\r', 0, end))
+        if cut < 0:
+            self._buf = buf
+            return []
+        self._buf = buf[cut + 1:]
+        events = []
+        # 状态放局部变量，逐行循环里不碰属性
+        data, event, names = self._data, self._event, self._names
+        for line in buf[:cut + 1].splitlines():
+            # 绝大多数行是 data: / event: / 空行，走快路径
+            if line.startswith(b'data:'):
+                data.append(line[6:] if line[5:6] == b' ' else line[5:])
+            elif not line:
+                # 空行分派；与 _dispatch 相同，内联以省每条事件一次方法调用
+                if data:
+                    name = names.get(event)
+                    if name is None:
+                        name = names[event] = event.decode('utf-8') if event else 'message'
+                    events.append(SSEEvent(name, data[0] if len(data) == 1 else b'\n'.join(data), self._id, self._retry))
+                    data = []
+                event = b''
+            elif line.startswith(b'event:'):
+                event = line[7:] if line[6:7] == b' ' else line[6:]
+            else:
+                self._data, self._event = data, event
+                self._field(line)
+                data, event = self._data, self._event
+        self._data, self._event = data, event
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """流结束：处理残留半行，并分派缺少结尾空行的最后一条事件"""
+        events = []
+        if self._buf:
+            # 残留可能是留着待判的 \r（即一个行结束 / 空行），喂回去时分派出的事件一并返回
+            line, self._buf = self._buf.rstrip(b'\r'), b''
+            events = self.feed(line + b'\n')
+        if self._data:
+            events.append(self._dispatch())
+        return events
+
+    def _field(self, line: bytes) -> None:
+        if line[0] == 0x3a:  # ':' 注释 / 心跳
+            return
+        field, sep, value = line.partition(b':')
+        if sep and value[:1] == b' ':
+            value = value[1:]
+        if field == b'data':
+            self._data.append(value)
+        elif field == b'event':
+            self._event = value
+        elif field == b'id':
+            if b'\0' not in value:
+                self._id = value.decode('utf-8')
+        elif field == b'retry':
+            if value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self) -> SSEEvent:
+        data, event = self._data, self._event
+        self._data, self._event = [], b''
+        raw = data[0] if len(data) == 1 else b'\n'.join(data)
+        name = self._names.get(event)
+        if name is None:
+            name = self._names[event] = event.decode('utf-8') if event else 'message'
+        return SSEEvent(name, raw, self._id, self._retry)
+
+
+def iter_sse(response, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[SSEEvent]:
+    """逐条产出 requests 流式响应（stream=True）里的 SSE 事件"""
+    if not getattr(response.raw, 'chunked', False):
+        chunk_size = min(chunk_size, READ_CHUNK_SIZE_UNCHUNKED)
+    decoder = SSEDecoder()
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            yield from decoder.feed(chunk)
+        yield from decoder.flush()
+    finally:
+        # 读完时连接已回池；中途放弃（停止生成）时关掉，免得占着池里的连接
+        response.close()
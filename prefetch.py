@@ -0,0 +1,148 @@
+"""空闲预取：手机停在首页时，按它的截屏范围在后台备好一帧截好、编好预览的截图
+
+点“截屏解题”后原本要等 截屏 → 预览编码 → 传输 一整轮才出框选界面，其中编码最慢。
+有订阅者时按 PREFETCH_INTERVAL 轮询画面的细粒度 dHash（PREFETCH_HASH 边长，像素不出截屏进程），
+只在画面变了且稳定（相邻两次相差不超过 PREFETCH_BITS 位）后才重截一帧，画面不动时不重复编码。
+capture_screenshot 取用前再取一次指纹与备好的帧比对，一致才直接用，否则照常现截，
+所以预取的帧不会比点按时的屏幕旧。指纹在截图之前取：截图途中画面变了，
+帧比指纹新，校验只会失败而不会误用旧帧。帧被取走后下一轮立即补一帧（方便重截）。
+同一截屏范围的订阅者共用一个预取；SNAPSOLVER_PREFETCH=0 关闭。
+"""
+import threading
+import time
+
+from watch import hamming
+
+# 轮询间隔（秒）、指纹边长（PREFETCH_HASH² 位）与视为同一画面的最大差异位数
+PREFETCH_INTERVAL = 0.5
+PREFETCH_HASH = 16
+PREFETCH_BITS = 4
+MAX_ERRORS = 3
+
+
+def target_key(monitor=None, region=None) -> tuple:
+    """截屏范围的键：(显示器, 区域)，区域按 x, y, width, height 取整"""
+    if region:
+        region = tuple(int(region.get(k) or 0) for k in ('x', 'y', 'width', 'height'))
+    return monitor or 1, region or None
+
+
+class _Target:
+    __slots__ = ('monitor', 'region', 'sids', 'frame', 'hash', 'running')
+
+    def __init__(self, monitor, region):
+        self.monitor = monitor
+        self.region = region
+        self.sids = set()
+        self.frame = None       # 备好的 Frame
+        self.hash = None        # 截这帧之前取的指纹
+        self.running = False
+
+
+class Prefetcher:
+    """按截屏范围共享的预取循环。
+    fingerprint(monitor, region, size) 返回画面 dHash；capture(monitor, region) 返回 Frame；
+    spawn(fn) 启动后台线程，sleep(seconds) 让出调度"""
+
+    def __init__(self, fingerprint, capture, spawn=None, sleep=time.sleep, interval: float = PREFETCH_INTERVAL):
+        self.fingerprint = fingerprint
+        self.capture = capture
+        self.spawn = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.sleep = sleep
+        self.interval = interval
+        self.hits = 0
+        self.misses = 0
+        self._targets = {}
+        self._sids = {}         # sid → 订阅的截屏范围键
+        self._lock = threading.Lock()
+
+    def subscribe(self, sid, monitor=None, region=None) -> None:
+        """sid 进入空闲状态，按它的截屏范围预取（换范围时重新订阅即可）"""
+        key = target_key(monitor, region)
+        self.unsubscribe(sid)
+        with self._lock:
+            target = self._targets.get(key)
+            if target is None:
+                target = self._targets[key] = _Target(monitor, region)
+            target.sids.add(sid)
+            self._sids[sid] = key
+            start = not target.running
+            target.running = True
+        if start:
+            self.spawn(lambda: self._loop(key, target))
+
+    def unsubscribe(self, sid) -> None:
+        with self._lock:
+            key = self._sids.pop(sid, None)
+            target = self._targets.get(key)
+            if target is not None:
+                target.sids.discard(sid)
+
+    def take(self, monitor=None, region=None):
+        """取出与当前画面一致的预取帧；没有或已过时返回 None（过时的帧随即释放）"""
+        with self._lock:
+            target = self._targets.get(target_key(monitor, region))
+            if target is None or target.frame is None:
+                return None
+            frame, expected = target.frame, target.hash
+            target.frame = target.hash = None
+        try:
+            current = self.fingerprint(monitor, region, PREFETCH_HASH)
+        except Exception as e:
+            print(f"预取校验失败: {e}")
+            current = None
+        if current is None or hamming(current, expected) > PREFETCH_BITS:
+            self.misses += 1
+            frame.release()
+            return None
+        self.hits += 1
+        return frame
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'targets': [
+                    {'monitor': t.monitor, 'region': t.region, 'subscribers': len(t.sids), 'ready': t.frame is not None}
+                    for t in self._targets.values()
+                ],
+            }
+
+    def _loop(self, key, target: _Target) -> None:
+        previous = None
+        errors = 0
+        while True:
+            # 最后一个订阅者离开时在锁内收尾，与 subscribe 的“是否需要启动”判断互斥
+            with self._lock:
+                if not target.sids:
+                    target.running = False
+                    self._targets.pop(key, None)
+                    stale, target.frame = target.frame, None
+                    break
+            try:
+                current = self.fingerprint(target.monitor, target.region, PREFETCH_HASH)
+                with self._lock:
+                    ready = target.frame is not None and hamming(current, target.hash) <= PREFETCH_BITS
+                # 没有备帧（刚开始或刚被取走）直接截；画面变了则等它稳定一轮再截
+                stable = previous is not None and hamming(current, previous) <= PREFETCH_BITS
+                if not ready and (stable or target.frame is None):
+                    self._refresh(target, current)
+                previous = current
+                errors = 0
+            except Exception as e:
+                errors += 1
+                print(f"预取截屏失败（{errors}/{MAX_ERRORS}）: {e}")
+                if errors >= MAX_ERRORS:
+                    errors = 0
+                    self.sleep(self.interval * 10)
+            self.sleep(self.interval)
+        if stale is not None:
+            stale.release()
+
+    def _refresh(self, target: _Target, expected: int) -> None:
+        frame = self.capture(target.monitor, target.region)
+        with self._lock:
+            stale, target.frame, target.hash = target.frame, frame, expected
+        if stale is not None:
+            stale.release()
@@ -0,0 +1,199 @@
+"""送模型前的图片预处理：题目区域检测（裁掉空白边距与边缘的界面栏）+ 按模型约束缩放编码
+
+视觉模型按像素计 token，延迟也随像素数增长，而框选的图常带大片空白和窗口栏。
+在缩略灰度图上做投影：横向相邻像素灰度跳变超过 INK_DELTA 处算“墨迹”，逐行 / 逐列计数。
+文字、公式笔画边缘密集，纯色的界面栏、背景色块只在两端有几处跳变，不会被当成内容；
+1. 去掉首尾没有墨迹的空白边距；
+2. 按超过 GAP_RATIO 的空白间隔把内容分段，从墨迹最多的段向两侧扩展到覆盖
+   DOMINANT_RATIO 的墨迹，视为题目主体；段外零星内容（标题栏、状态栏、页脚）裁去。
+先按行定上下边界，再只在这些行内按列定左右边界。结果四周留 PADDING 像素，
+省下不足 MIN_SAVING 时原样送出（不值得为此重新编码）。
+4K 截图先按整数步长取样到长边约 ANALYZE_EDGE 再分析，整个过程几毫秒。
+
+各家模型有各自的最佳输入尺寸与单图上限（config/models.json 的 imageConstraints，
+经 ModelFactory.get_image_constraints 取得）：超过 max_edge / max_pixels 的先缩小
+（HiDPI 主机的 2x 截图往往就是这种），再按 format 编码；仍超 max_bytes 时改用有损格式，
+再不够就逐步缩小。上传的图片既没裁也不超约束时原样送出，不重新编码。
+"""
+import math
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from encode import EncodedImage, encode_image
+
+# 分析用缩略图的长边（像素）
+ANALYZE_EDGE = 960
+# 相邻像素灰度跳变超过此值算墨迹；一行 / 一列至少这么多墨迹才算有内容（滤掉压缩噪点）
+INK_DELTA = 24
+MIN_INK = 2
+# 内容段之间的空白超过边长的此比例才断开；主体段至少覆盖的墨迹比例
+GAP_RATIO = 0.06
+DOMINANT_RATIO = 0.9
+# 裁剪框四周留白（原图像素）；省下的像素不足此比例时不裁
+PADDING = 16
+MIN_SAVING = 0.1
+# 超出 max_bytes 时每轮缩小的比例，以及缩到多小就放弃（交给接口报错）
+SHRINK_STEP = 0.8
+MIN_FIT_EDGE = 256
+
+
+class TrimResult:
+    """一次检测的结果与统计；box 为原图上的 (left, top, right, bottom)，不裁时为 None"""
+    __slots__ = ('box', 'original', 'size', 'elapsed_ms')
+
+    def __init__(self, box, original: tuple, elapsed_ms: float):
+        self.box = box
+        self.original = original
+        self.size = (box[2] - box[0], box[3] - box[1]) if box else original
+        self.elapsed_ms = elapsed_ms
+
+    @property
+    def saved_pixels(self) -> int:
+        return self.original[0] * self.original[1] - self.size[0] * self.size[1]
+
+    def stats(self) -> dict:
+        total = self.original[0] * self.original[1]
+        return {
+            'trimmed': self.box is not None,
+            'original': list(self.original),
+            'size': list(self.size),
+            'saved_pixels': self.saved_pixels,
+            'saved_ratio': round(self.saved_pixels / total, 3) if total else 0,
+            'elapsed_ms': round(self.elapsed_ms, 1),
+        }
+
+    def __repr__(self):
+        return f"TrimResult({self.stats()!r})"
+
+
+def _dominant_span(profile: np.ndarray, min_gap: int):
+    """profile 上题目主体的区间 [start, end)；没有墨迹返回 None"""
+    filled = np.flatnonzero(profile >= MIN_INK)
+    if filled.size == 0:
+        return None
+    # 相邻两处墨迹间隔超过 min_gap 的地方断开成段
+    breaks = np.flatnonzero(np.diff(filled) > min_gap)
+    starts = np.concatenate(([filled[0]], filled[breaks + 1]))
+    ends = np.concatenate((filled[breaks], [filled[-1]])) + 1
+    if starts.size == 1:
+        return int(starts[0]), int(ends[0])
+    mass = [int(profile[s:e].sum()) for s, e in zip(starts, ends)]
+    need = DOMINANT_RATIO * sum(mass)
+    lo = hi = int(np.argmax(mass))
+    covered = mass[lo]
+    # 从最重的段向墨迹更多的一侧逐段扩展，直到覆盖足够的墨迹
+    while covered < need:
+        left = mass[lo - 1] if lo > 0 else -1
+        right = mass[hi + 1] if hi < len(mass) - 1 else -1
+        if left >= right:
+            lo -= 1
+            covered += left
+        else:
+            hi += 1
+            covered += right
+    return int(starts[lo]), int(ends[hi])
+
+
+def find_question_box(img: Image.Image) -> TrimResult:
+    """检测题目主体区域，不改动原图"""
+    start = time.perf_counter()
+    width, height = img.size
+    factor = max(1, max(img.size) // ANALYZE_EDGE)
+    # 最近邻取样比 reduce 的盒式平均快数倍；一行文字有成百上千个笔画像素，取样后仍足够，
+    # 漏掉的单像素细线落在 PADDING 留白之内
+    if factor > 1:
+        img = img.resize((max(1, width // factor), max(1, height // factor)), Image.Resampling.NEAREST)
+    gray = np.asarray(img.convert('L'), dtype=np.int16)
+    ink = np.abs(np.diff(gray, axis=1)) > INK_DELTA
+
+    rows = _dominant_span(ink.sum(axis=1), max(2, int(ink.shape[0] * GAP_RATIO)))
+    if rows is None:
+        return TrimResult(None, (width, height), (time.perf_counter() - start) * 1000)
+    top, bottom = rows
+    cols = _dominant_span(ink[top:bottom].sum(axis=0), max(2, int(ink.shape[1] * GAP_RATIO)))
+    left, right = cols or (0, ink.shape[1])
+    right += 1  # diff 后第 i 列是第 i 与 i+1 列之间的跳变
+
+    box = (
+        max(0, left * factor - PADDING),
+        max(0, top * factor - PADDING),
+        min(width, right * factor + PADDING),
+        min(height, bottom * factor + PADDING),
+    )
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    if area > (1 - MIN_SAVING) * width * height:
+        box = None
+    return TrimResult(box, (width, height), (time.perf_counter() - start) * 1000)
+
+
+def trim_question(img: Image.Image):
+    """返回 (裁剪后的图, TrimResult)；不裁时原样返回原图"""
+    result = find_question_box(img)
+    return (img.crop(result.box) if result.box else img), result
+
+
+def _fit_scale(size: tuple, constraints: dict) -> float:
+    width, height = size
+    scale = 1.0
+    if constraints.get('max_edge'):
+        scale = min(scale, constraints['max_edge'] / max(width, height))
+    if constraints.get('max_pixels'):
+        scale = min(scale, math.sqrt(constraints['max_pixels'] / (width * height)))
+    return scale
+
+
+def _resize(img: Image.Image, scale: float) -> Image.Image:
+    size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+    # 送模型的图要保住细笔画：LANCZOS，reducing_gap 先盒式缩小大倍数部分
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def within_constraints(size: tuple, nbytes: int, constraints: dict) -> bool:
+    return _fit_scale(size, constraints) >= 1 and nbytes <= constraints.get('max_bytes', nbytes)
+
+
+def fit_constraints(img: Image.Image, constraints: dict) -> EncodedImage:
+    """按模型的图片约束缩放并编码"""
+    scale = _fit_scale(img.size, constraints)
+    if scale < 1:
+        img = _resize(img, scale)
+    if constraints.get('grayscale'):
+        # 与手机端上传时的灰度一致；灰度 RGB 的调色板 PNG 很小
+        img = img.convert('L').convert('RGB')
+    format = constraints.get('format')
+    format = format if format in ('png', 'palette', 'webp', 'jpeg') else None
+    encoded = encode_image(img, format)
+    max_bytes = constraints.get('max_bytes')
+    while max_bytes and len(encoded.data) > max_bytes:
+        if encoded.format in ('png', 'palette'):
+            # 无损放不下先换有损，分辨率不变
+            encoded = encode_image(img, 'webp' if format == 'webp' else 'jpeg')
+            continue
+        if max(img.size) * SHRINK_STEP < MIN_FIT_EDGE:
+            break
+        img = _resize(img, SHRINK_STEP)
+        encoded = encode_image(img, encoded.format)
+    return encoded
+
+
+def prepare_image(img: Image.Image, trim: bool = True, constraints: dict = None, data: bytes = None):
+    """送模型前的整条预处理：裁白 → 按模型约束缩放编码。
+    data 为 img 的原始编码字节（上传的图片），既没裁也不超约束时原样返回。
+    返回 (图片字节, TrimResult 或 None, EncodedImage 或 None)"""
+    constraints = constraints or {}
+    result = None
+    if trim:
+        img, result = trim_question(img)
+    if data is not None and (result is None or result.box is None) and within_constraints(img.size, len(data), constraints):
+        return data, result, None
+    encoded = fit_constraints(img, constraints)
+    return encoded.data, result, encoded
+
+
+def prepare_encoded(data: bytes, trim: bool = True, constraints: dict = None):
+    """对已编码的图片做 prepare_image"""
+    with Image.open(BytesIO(data)) as img:
+        return prepare_image(img, trim, constraints, data)
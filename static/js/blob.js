@@ -0,0 +1,85 @@
+/* ============================================================
+   BlobReceiver — /blob 命名空间的分块接收端
+   大块二进制（截图预览、原分辨率块）由服务端切块下发，事件本身只带 blob_id；
+   这里逐块收齐、逐块回 blob_ack（服务端按确认窗口续发，答案帧可插在块之间），
+   receive(blobId) 返回拼好的 ArrayBuffer。与主连接共用同一条 engine.io 连接，
+   主连接（重）连上后 bind() 告知主 sid。
+   对外契约：bind() / receive(blobId) / resolve(data)
+   本文件只定义，不自建实例；入口统一在 main.js。
+   ============================================================ */
+
+class BlobReceiver {
+    constructor(mainSocket) {
+        this.main = mainSocket;
+        this.socket = io('/blob');
+        this.blobs = new Map();     // blob_id → {parts, got, chunks, size, waiters}
+        this.socket.on('connect', () => this.bind());
+        this.socket.on('blob_chunk', data => this.onChunk(data));
+        this.socket.on('blob_abort', data => this.fail(data.blob_id, new Error('传输超时')));
+        // 断线后服务端丢弃未发完的传输：没收齐的一律失败，别让等待方挂着
+        this.socket.on('disconnect', () => {
+            this.blobs.forEach((e, blobId) => { if (!e.result && !e.error) this.fail(blobId, new Error('连接已断开')); });
+        });
+    }
+
+    bind() {
+        if (this.socket.connected && this.main.connected) this.socket.emit('blob_bind', { sid: this.main.id });
+    }
+
+    entry(blobId) {
+        let e = this.blobs.get(blobId);
+        if (!e) {
+            e = { parts: [], got: 0, chunks: null, size: 0, waiters: [] };
+            this.blobs.set(blobId, e);
+        }
+        return e;
+    }
+
+    onChunk(data) {
+        const e = this.entry(data.blob_id);
+        if (e.parts[data.index] === undefined) {
+            e.parts[data.index] = data.data;
+            e.got += 1;
+        }
+        e.chunks = data.chunks;
+        e.size = data.size;
+        this.socket.emit('blob_ack', { blob_id: data.blob_id, index: data.index });
+        if (e.got === e.chunks) this.finish(data.blob_id, e);
+    }
+
+    finish(blobId, e) {
+        const out = new Uint8Array(e.size);
+        let offset = 0;
+        e.parts.forEach(part => {
+            out.set(new Uint8Array(part), offset);
+            offset += part.byteLength;
+        });
+        e.result = out.buffer;
+        e.parts = [];
+        e.waiters.forEach(w => w.resolve(e.result));
+        e.waiters = [];
+        // 结果留给还没来得及 receive 的事件处理，稍后释放
+        setTimeout(() => this.blobs.delete(blobId), 30000);
+    }
+
+    fail(blobId, err) {
+        const e = this.blobs.get(blobId);
+        if (!e) return;
+        e.error = err;
+        e.waiters.forEach(w => w.reject(err));
+        e.waiters = [];
+        setTimeout(() => this.blobs.delete(blobId), 30000);
+    }
+
+    receive(blobId) {
+        const e = this.entry(blobId);
+        if (e.result) return Promise.resolve(e.result);
+        if (e.error) return Promise.reject(e.error);
+        return new Promise((resolve, reject) => e.waiters.push({ resolve, reject }));
+    }
+
+    // 事件里的图片：分块下发的等收齐，内联的（老服务端 / 小载荷）原样返回
+    async resolve(data) {
+        return data.blob ? this.receive(data.blob) : data.image;
+    }
+}
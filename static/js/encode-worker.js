@@ -0,0 +1,38 @@
+/* ============================================================
+   裁剪图编码 Worker：缩放、（可选）转灰度、按目标格式编码都在这里，
+   主线程只负责把裁剪结果转成 ImageBitmap 转交过来。
+   消息：{id, bitmap, width, height, type, quality, grayscale}
+   回复：{id, blob, ms} 或 {id, error}
+   ============================================================ */
+
+self.onmessage = async ({ data }) => {
+    const { id, bitmap, width, height, type, quality, grayscale } = data;
+    const start = performance.now();
+    try {
+        const canvas = new OffscreenCanvas(width, height);
+        const ctx = canvas.getContext('2d');
+        ctx.fillStyle = '#fff';
+        ctx.fillRect(0, 0, width, height);
+        ctx.imageSmoothingQuality = 'high';
+        ctx.drawImage(bitmap, 0, 0, width, height);
+        bitmap.close();
+        if (grayscale) toGrayscale(ctx, width, height);
+        let blob = await canvas.convertToBlob({ type, quality });
+        // 不支持的格式（如部分浏览器编不了 WebP）会静默回落 PNG：改用 JPEG
+        if (blob.type !== type && type !== 'image/png') blob = await canvas.convertToBlob({ type: 'image/jpeg', quality });
+        self.postMessage({ id, blob, ms: performance.now() - start });
+    } catch (e) {
+        self.postMessage({ id, error: e.message || String(e) });
+    }
+};
+
+// 按 BT.601 亮度就地转灰度（ctx.filter 在部分浏览器的 OffscreenCanvas 上不可用）
+function toGrayscale(ctx, width, height) {
+    const image = ctx.getImageData(0, 0, width, height);
+    const px = image.data;
+    for (let i = 0; i < px.length; i += 4) {
+        const y = (px[i] * 299 + px[i + 1] * 587 + px[i + 2] * 114) / 1000;
+        px[i] = px[i + 1] = px[i + 2] = y;
+    }
+    ctx.putImageData(image, 0, 0);
+}
@@ -0,0 +1,96 @@
+/* ============================================================
+   ImageEncoder — 裁剪图的上传编码
+   按服务端为所选模型公布的约束（/api/models 的 image_constraints：
+   max_edge / max_pixels / upload_format / upload_quality / grayscale）缩放并编码，
+   不再以 2560×1440 的 PNG 上传。有 OffscreenCanvas 时在 encode-worker.js 里做，
+   主线程只转一次 ImageBitmap；没有时回落主线程 canvas.toBlob。
+   对外契约：encode(canvas, constraints, limits) → {blob, width, height, type, bytes, ms, worker}
+   本文件只定义，不自建实例；入口统一在 main.js。
+   ============================================================ */
+
+// 服务端没公布上传格式时的缺省：WebP 高质量，肉眼与 PNG 无异、体积小一个量级
+const UPLOAD_DEFAULTS = { format: 'webp', quality: 0.92 };
+const UPLOAD_TYPES = { webp: 'image/webp', jpeg: 'image/jpeg', png: 'image/png' };
+
+class ImageEncoder {
+    constructor() {
+        this.worker = null;
+        this.pending = new Map();
+        this.ids = 0;
+        if (typeof OffscreenCanvas !== 'undefined' && typeof Worker !== 'undefined') {
+            try {
+                this.worker = new Worker('/static/js/encode-worker.js');
+                this.worker.onmessage = ({ data }) => this.onReply(data);
+                this.worker.onerror = () => { this.worker = null; };
+            } catch (e) { this.worker = null; }
+        }
+    }
+
+    // 目标尺寸：不超过 limits（调用方的上限）与模型的 max_edge / max_pixels
+    targetSize(width, height, constraints = {}, limits = {}) {
+        let scale = 1;
+        const maxEdge = Math.min(constraints.max_edge || Infinity, limits.maxEdge || Infinity);
+        if (Number.isFinite(maxEdge)) scale = Math.min(scale, maxEdge / Math.max(width, height));
+        if (constraints.max_pixels) scale = Math.min(scale, Math.sqrt(constraints.max_pixels / (width * height)));
+        return { width: Math.max(1, Math.round(width * scale)), height: Math.max(1, Math.round(height * scale)) };
+    }
+
+    async encode(canvas, constraints = {}, limits = {}) {
+        const { width, height } = this.targetSize(canvas.width, canvas.height, constraints, limits);
+        const type = UPLOAD_TYPES[limits.format || constraints.upload_format] || UPLOAD_TYPES[UPLOAD_DEFAULTS.format];
+        const quality = limits.quality || constraints.upload_quality || UPLOAD_DEFAULTS.quality;
+        const grayscale = !!constraints.grayscale;
+        const start = performance.now();
+        let result = null;
+        if (this.worker) {
+            try {
+                const bitmap = await createImageBitmap(canvas);
+                result = await this.post({ bitmap, width, height, type, quality, grayscale }, [bitmap]);
+                result.worker = true;
+            } catch (e) {
+                console.warn('worker encode failed, falling back', e);
+            }
+        }
+        if (!result) result = { blob: await this.encodeInline(canvas, width, height, type, quality, grayscale), worker: false };
+        return {
+            blob: result.blob, width, height, type: result.blob.type, bytes: result.blob.size,
+            ms: Math.round(performance.now() - start), worker: result.worker
+        };
+    }
+
+    post(message, transfer) {
+        const id = ++this.ids;
+        return new Promise((resolve, reject) => {
+            this.pending.set(id, { resolve, reject });
+            this.worker.postMessage({ id, ...message }, transfer);
+        });
+    }
+
+    onReply(data) {
+        const p = this.pending.get(data.id);
+        if (!p) return;
+        this.pending.delete(data.id);
+        if (data.error) p.reject(new Error(data.error));
+        else p.resolve({ blob: data.blob });
+    }
+
+    async encodeInline(source, width, height, type, quality, grayscale) {
+        let canvas = source;
+        if (width !== source.width || height !== source.height || grayscale) {
+            canvas = document.createElement('canvas');
+            canvas.width = width;
+            canvas.height = height;
+            const ctx = canvas.getContext('2d');
+            ctx.fillStyle = '#fff';
+            ctx.fillRect(0, 0, width, height);
+            ctx.imageSmoothingQuality = 'high';
+            if (grayscale) ctx.filter = 'grayscale(1)';
+            ctx.drawImage(source, 0, 0, width, height);
+        }
+        const toBlob = t => new Promise(resolve => canvas.toBlob(resolve, t, quality));
+        let blob = await toBlob(type);
+        if (blob && blob.type !== type && type !== 'image/png') blob = await toBlob('image/jpeg');
+        if (!blob) throw new Error('无法生成裁剪图');
+        return blob;
+    }
+}
@@ -2,19 +2,64 @@
    SnapSolver 主控制器（设计方案 1a/1d/1e/1f/1j 落地）
    状态机：body[data-view] = empty | workspace | answer
    核心流程：截屏解题(圆钮) → 框选工作台 → 发送解题 → 流式解答
-   socket 契约：capture_screenshot / analyze_image / stop_generation
-              screenshot_complete / ai_response（thinking 已在后端归一）
+   socket 契约：capture_screenshot / analyze_image / stop_generation / resync_stream / stream_ack
+              / resume_generation（断线重连后凭 job_id + last_seq 续传）
+              / watch_generation / unwatch_generation（旁观其他设备发起的生成）
+              / request_tiles（放大到预览不够清晰时按块取原分辨率）/ live_start / live_stop（实时画面）
+              / screen_watch_start / screen_watch_stop（监视模式：翻页自动截图解题）
+              / prefetch_start / prefetch_stop（停在首页时让电脑预先截好一帧）
+              / capture_and_solve（一键解题：电脑截屏并按上次框选直接解，图片不经手机）
+              （capture_screenshot 可带 {monitor, region}，analyze_image 可带 trim: false 关闭自动裁白）
+              screenshot_complete（预览）/ screenshot_tile / live_frame / image_trimmed
+              / screen_watch_status / screen_watch_triggered / capture_and_solve_started / generation_job / generation_available / ai_response（thinking 已在后端归一，
+              v2 增量帧在 decodeFrame 里还原为累计全文再走原有渲染）
+              带图的事件在载荷大时只给 blob_id，图片经 blob.js 的 /blob 命名空间分块收齐
    入口：文件尾 DOMContentLoaded 顺序构造
         UIManager → SettingsManager(await ready) → ModelPage → SnapSolver
    ============================================================ */
 
+// ai_response 下发协议版本（与 streaming.py 对应）：2 = 带偏移的增量帧
+const STREAM_PROTOCOL = 2;
+
+// stream_ack 回报间隔（ms）：服务端据此统计在途帧做背压
+const ACK_INTERVAL = 200;
+
+// 与服务端 zlib.adler32 一致：按 UTF-8 字节计算
+function adler32(text) {
+    const bytes = new TextEncoder().encode(text);
+    let a = 1, b = 0;
+    for (let i = 0; i < bytes.length;) {
+        const end = Math.min(i + 3800, bytes.length);
+        for (; i < end; i++) { a += bytes[i]; b += a; }
+        a %= 65521; b %= 65521;
+    }
+    return ((b << 16) | a) >>> 0;
+}
+
 class SnapSolver {
     constructor() {
         this.socket = null;
         this.cropper = null;
-        this.originalImage = null;      // 回传的电脑全屏原图（data URL），重裁始终基于它
+        this.originalImage = null;      // 回传的电脑全屏原图（Object URL），重裁始终基于它
+        this.originalBlob = null;       // 同一张原图的 Blob（服务端以二进制附件下发）
         this.lastCropBoxData = null;    // 上次裁剪框，连刷题预填
-        this.lastImageData = null;      // 上次送出的裁剪图，重解/换模型重答用
+        this.pendingCapture = null;     // 正在截的截屏范围，随截图记入 shot.capture
+        this.screenshotId = null;       // 服务端持有的原图 id，解题时只回传 id + 裁剪框
+        this.shot = null;               // 原图尺寸与切块 {id, width, height, tileSize, previewScale}
+        this.hires = null;              // 已取回的原分辨率块拼成的画布 {id, canvas, have, pending, …}
+        this._tileTimer = 0;
+        this._cropping = false;         // 正在拖框/拖图，高清图换入推迟到松手
+        this.live = false;              // 用户开启了实时画面（只在首页且已连接时实际订阅）
+        this._liveActive = false;
+        this._liveChain = Promise.resolve();
+        this._prefetchKey = null;       // 已向服务端订阅预取的截屏范围（JSON），null 为未订阅
+        this.screenWatch = false;       // 监视模式开着（断线重连后自动重新开启）
+        this.screenWatchId = null;      // 服务端当前会话 id，旧会话的状态直接丢弃
+        this.lastImageRef = null;       // 上次解题的 {screenshot_id, crop_rect}；null 表示直接上传图片
+        this.lastImageBlob = null;      // 上次送出的裁剪图（引用解题时只是本地预览），重解/换模型重答用
+        this.lastImageData = null;      // 同一张裁剪图的 Object URL，缩略条/全屏对照显示用
+        this.lastUpload = null;         // 上次上传图的编码统计 {bytes, encode_ms, ...}，随 analyze_image 报给服务端
+        this.encoder = new ImageEncoder();
         this.hasAnswer = false;         // 是否有一屏答案可返回（显式状态）
         this.autoFollow = true;         // 流式是否贴底跟随
         this.generating = false;
@@ -28,10 +73,22 @@ class SnapSolver {
         this.followupTurns = [];        // [{q, answerText, thinkingText, …DOM refs}]
         this.currentTurn = null;        // 生成中的追问轮，null = 事件路由到主解答
         this.followupGenerating = false;
+
+        // v2 增量协议：两条流在本地拼接的全文；漂移后等待快照期间丢弃增量
+        this.streams = { thinking: '', answer: '' };
+        this.resyncPending = false;
+        this.lastSeq = 0;               // 已收到的最大帧序号：stream_ack 与断线续传共用
+        this._ackTimer = 0;
+        this.jobId = null;              // 当前生成任务，重连后凭它续传
+        this.watching = false;          // 正在旁观其他设备发起的生成（只收广播）
     }
 
     /* ---------- 视图状态机 ---------- */
-    setView(view) { document.body.setAttribute('data-view', view); }
+    setView(view) {
+        document.body.setAttribute('data-view', view);
+        this.syncLive();
+        this.syncPrefetch();
+    }
     get view() { return document.body.getAttribute('data-view'); }
 
     el(id) { return document.getElementById(id); }
@@ -43,6 +100,12 @@ class SnapSolver {
         this.connectionStatus = this.el('connectionStatus');
         this.connectionText = this.el('connectionText');
         this.emptyDesc = this.el('emptyDesc');
+        this.liveCanvas = this.el('liveCanvas');
+        this.liveToggle = this.el('liveToggle');
+        this.liveToggleLabel = this.el('liveToggleLabel');
+        this.quickSolveBtn = this.el('quickSolveBtn');
+        this.screenWatchToggle = this.el('screenWatchToggle');
+        this.screenWatchLabel = this.el('screenWatchLabel');
         this.cropArea = document.querySelector('.crop-area');
         this.responseContent = this.el('responseContent');
         this.answerScroll = this.el('answerScroll');
@@ -71,8 +134,14 @@ class SnapSolver {
         this.connectToServer();
 
         // 模型入口卡随配置联动
-        window.settingsManager.addEventListener('change', () => this.refreshModelEntry());
+        window.settingsManager.addEventListener('change', () => {
+            this.refreshModelEntry();
+            this.refreshCaptureHint();
+            this.syncPrefetch();
+        });
         this.refreshModelEntry();
+        window.settingsManager.ready.then(() => this.refreshCaptureHint());
+        this.quickSolveBtn.addEventListener('click', () => this.captureAndSolve());
 
         this.setView('empty');
     }
@@ -107,30 +176,303 @@ class SnapSolver {
 
     /* ---------- Socket 连接 ---------- */
     connectToServer() {
-        // 强制轮询：threading 后端 + 大图上传场景下 websocket 推送偶发停摆，
-        // 局域网内轮询开销可忽略且经验上零丢失
-        this.socket = io({ transports: ['polling'], upgrade: false, reconnectionAttempts: 5, reconnectionDelay: 1000, timeout: 20000 });
+        // 先轮询握手再升级 websocket：二进制附件（截图、裁剪图、分块）在 websocket 上是原始字节帧，
+        // 长轮询下 Engine.IO 会把它们转成 base64 文本（多 1/3）。大图已由 /blob 分块 + 流控下发，
+        // 不再有整张图堵住推送的问题；升级失败时自动留在轮询。
+        // 个别网络（代理不放行 websocket）可在控制台设 localStorage.socketTransport = 'polling' 退回纯轮询
+        const pollingOnly = localStorage.getItem('socketTransport') === 'polling';
+        this.socket = io({
+            transports: pollingOnly ? ['polling'] : ['polling', 'websocket'],
+            upgrade: !pollingOnly,
+            reconnectionAttempts: 5, reconnectionDelay: 1000, timeout: 20000
+        });
+        // 大块二进制走 /blob 命名空间分块收（复用同一条连接）
+        this.blobs = new BlobReceiver(this.socket);
 
         this.socket.on('connect', () => {
             this.updateConnectionStatus(true);
+            this.blobs.bind();
+            // 生成途中断线（换网等）：重连后续上同一任务，只补错过的帧
+            if (this.jobId && this.watching && this.generating) {
+                this.socket.emit('watch_generation', { job_id: this.jobId, last_seq: this.lastSeq });
+            } else if (this.jobId && (this.generating || this.followupGenerating)) {
+                this.socket.emit('resume_generation', { job_id: this.jobId, last_seq: this.lastSeq });
+            }
+            this.syncLive();
+            this.syncPrefetch();
+            if (this.screenWatch) this.startScreenWatch();
             window.settingsManager.maybeStartOnboarding();
         });
-        this.socket.on('disconnect', () => this.updateConnectionStatus(false));
+        this.socket.on('disconnect', () => {
+            this._liveActive = false;       // 服务端随断线退订，重连后 syncLive 重新订阅并收关键帧
+            this._prefetchKey = null;
+            this.updateConnectionStatus(false);
+        });
         this.socket.on('connect_error', () => this.updateConnectionStatus(false));
         this.socket.on('reconnect', () => this.updateConnectionStatus(true));
         this.socket.on('reconnect_failed', () => this.updateConnectionStatus(false));
 
-        this.socket.on('screenshot_complete', data => {
-            this.restoreCaptureBtn();
+        this.socket.on('screenshot_complete', async data => {
             if (data.success) {
-                this.originalImage = 'data:image/png;base64,' + data.image;
+                let image;
+                try {
+                    image = await this.blobs.resolve(data);
+                } catch (e) {
+                    this.restoreCaptureBtn();
+                    window.uiManager.showToast('截图传输失败: ' + e.message, 'error');
+                    return;
+                }
+                this.restoreCaptureBtn();
+                this.screenshotId = data.screenshot_id || null;
+                // 先到的是预览：立即可框选，原分辨率块放大时再按需取
+                this.shot = data.width ? {
+                    id: data.screenshot_id, width: data.width, height: data.height,
+                    tileSize: data.tile_size, previewScale: data.width / (data.encode?.width || data.width),
+                    origin: data.origin || { x: 0, y: 0 }, capture: this.pendingCapture
+                } : null;
+                this.hires = null;
+                this.setOriginalImage(image, data.mime);
                 this.openWorkspace();
             } else {
+                this.restoreCaptureBtn();
                 window.uiManager.showToast('截图失败: ' + (data.error || '未知错误'), 'error');
             }
         });
 
-        this.socket.on('ai_response', data => this.handleAiResponse(data));
+        this.socket.on('screenshot_tile', data => this.applyTile(data));
+
+        // 电脑端送模型前裁掉了空白：在题目条上注明省下的像素比例
+        this.socket.on('image_trimmed', data => {
+            if (!data.trimmed || data.job_id !== this.jobId) return;
+            this.questionMeta.textContent += ` · 已裁去 ${Math.round(data.saved_ratio * 100)}% 空白`;
+        });
+
+        // 一键解题：截图留在电脑上，只记下引用供重解 / 追问
+        this.socket.on('capture_and_solve_started', data => {
+            this.screenshotId = data.screenshot_id;
+            this.lastImageRef = { screenshot_id: data.screenshot_id, crop_rect: data.crop_rect || null };
+        });
+
+        this.socket.on('screen_watch_status', data => this.onScreenWatchStatus(data));
+        this.socket.on('screen_watch_triggered', async data => {
+            try {
+                this.onScreenWatchTriggered(data, await this.blobs.resolve(data));
+            } catch (e) {
+                console.error('screen watch image failed', e);
+            }
+        });
+
+        // 实时画面帧按到达顺序串行绘制，块解码异步进行
+        this.socket.on('live_frame', data => {
+            this._liveChain = this._liveChain.then(() => this.drawLiveFrame(data)).catch(e => console.error('live frame failed', e));
+        });
+
+        this.socket.on('generation_job', data => {
+            this.jobId = data.job_id;
+            this.lastSeq = 0;
+            this.watching = false;
+        });
+
+        // 其他设备发起了解题：本机空闲在首页时自动同看，不打断正在进行的操作
+        this.socket.on('generation_available', data => {
+            if (document.body.getAttribute('data-view') !== 'empty' || this.generating) return;
+            this.watchGeneration(data.job_id, data.model);
+        });
+
+        this.socket.on('ai_response', data => {
+            if (data && data.seq) this.scheduleAck(data.seq);
+            const frame = this.decodeFrame(data);
+            if (frame) this.handleAiResponse(frame);
+        });
+    }
+
+    /* ---------- 实时画面：只在首页且用户开启时订阅，只收变化的块 ---------- */
+    toggleLive() {
+        this.live = !this.live;
+        this.liveCanvas.classList.toggle('hidden', !this.live);
+        this.emptyDesc.classList.toggle('hidden', this.live);
+        this.liveToggleLabel.textContent = this.live ? '关闭实时画面' : '实时画面';
+        this.syncLive();
+    }
+
+    syncLive() {
+        const on = Boolean(this.live && this.view === 'empty' && this.isConnected());
+        if (on === this._liveActive) return;
+        this._liveActive = on;
+        this.socket.emit(on ? 'live_start' : 'live_stop');
+    }
+
+    /* ---------- 空闲预取：停在首页时服务端按当前截屏范围备好一帧，点截屏即可秒出 ---------- */
+    syncPrefetch() {
+        const on = this.view === 'empty' && this.isConnected();
+        const capture = on ? window.settingsManager.getSettings().capture || {} : null;
+        const key = capture && JSON.stringify(capture);
+        if (key === this._prefetchKey) return;
+        this._prefetchKey = key;
+        if (capture) this.socket.emit('prefetch_start', capture);
+        else this.socket?.emit('prefetch_stop');
+    }
+
+    async drawLiveFrame(data) {
+        if (!this._liveActive) return;
+        const canvas = this.liveCanvas;
+        if (canvas.width !== data.width || canvas.height !== data.height) {
+            canvas.width = data.width;
+            canvas.height = data.height;
+        }
+        const bitmaps = await Promise.all(data.tiles.map(t => createImageBitmap(new Blob([t.image], { type: t.mime }))));
+        const ctx = canvas.getContext('2d');
+        bitmaps.forEach((bitmap, i) => {
+            ctx.drawImage(bitmap, data.tiles[i].x, data.tiles[i].y);
+            bitmap.close?.();
+        });
+    }
+
+    /* ---------- 监视模式：服务端轮询画面哈希，翻页稳定后自动截图并按当前设置解题 ---------- */
+    toggleScreenWatch() {
+        if (this.screenWatch) {
+            this.screenWatch = false;
+            this.socket.emit('screen_watch_stop');
+            this.setScreenWatchLabel();
+            return;
+        }
+        const s = window.settingsManager;
+        if (!s.getSettings().model) { window.modelPage.open(); return; }
+        if (s.missingKeyForCurrentModel()) { window.modelPage.open({ focusKey: true }); return; }
+        this.screenWatch = true;
+        this.startScreenWatch();
+        window.uiManager.showToast('监视中：翻到新题后会自动截图解题', 'info');
+    }
+
+    startScreenWatch() {
+        const s = window.settingsManager;
+        const settings = s.getSettings();
+        this.screenWatchId = null;
+        this.setScreenWatchLabel('监视中');
+        this.socket.emit('screen_watch_start', {
+            settings: { ...settings, apiKeys: s.collectApiKeys() },
+            capture: settings.capture || {},
+            trim: settings.autoTrim,
+            protocol: STREAM_PROTOCOL
+        });
+    }
+
+    setScreenWatchLabel(text) {
+        this.screenWatchToggle.classList.toggle('active', !!text);
+        this.screenWatchLabel.textContent = text || '翻页自动解题';
+    }
+
+    onScreenWatchStatus(data) {
+        if (data.state === 'watching') this.screenWatchId = data.id;
+        if (data.id !== this.screenWatchId || !this.screenWatch) return;
+        if (data.state === 'triggered') {
+            this.setScreenWatchLabel(`监视中 ${data.solved}/${data.budget}`);
+        } else if (data.state === 'stopped') {
+            this.screenWatch = false;
+            this.setScreenWatchLabel();
+            const reasons = { budget: `已自动解 ${data.solved} 题，达到本次上限`, timeout: '监视时间已到', error: '截屏失败，监视已停止' };
+            if (reasons[data.reason]) window.uiManager.showToast(reasons[data.reason], data.reason === 'error' ? 'error' : 'info');
+        }
+    }
+
+    // 自动截到的新题：预览当题目缩略图，随后的 generation_job / ai_response 照常走解答屏
+    onScreenWatchTriggered(data, image) {
+        const s = window.settingsManager;
+        this.stopWatching();
+        this.screenshotId = data.screenshot_id;
+        this.shot = {
+            id: data.screenshot_id, width: data.width, height: data.height, tileSize: data.tile_size,
+            previewScale: 1, origin: data.origin || { x: 0, y: 0 }
+        };
+        this.hires = null;
+        this.setOriginalImage(image, data.mime);
+        this.setLastImage(this.originalBlob);
+        this.lastImageRef = { screenshot_id: data.screenshot_id, crop_rect: null };
+        if (this.questionThumbImg) this.questionThumbImg.src = this.lastImageData;
+        this.questionMeta.textContent = `自动 · ${s.currentModel?.display_name || ''} · ${TIER_INFO[s.currentTier()]?.label || ''}`;
+        this.enterAnswerView();
+        this.resetStreams();
+    }
+
+    /* ---------- 同看：加入其他设备的生成任务房间 ---------- */
+    watchGeneration(jobId, modelId) {
+        this.jobId = jobId;
+        this.lastSeq = 0;
+        this.watching = true;
+        this.resetStreams();
+        if (this.questionThumbImg) this.questionThumbImg.removeAttribute('src');
+        const model = window.settingsManager?.models?.find(m => m.id === modelId);
+        this.questionMeta.textContent = `同看 · ${model?.display_name || modelId || '其他设备'}`;
+        this.enterAnswerView();
+        this.socket.emit('watch_generation', { job_id: jobId, last_seq: 0 });
+    }
+
+    stopWatching() {
+        if (!this.watching) return;
+        this.watching = false;
+        if (this.socket?.connected) this.socket.emit('unwatch_generation');
+    }
+
+    /* ---------- 图片持有：Blob + Object URL，换图时释放旧 URL ---------- */
+    setOriginalImage(image, mime) {
+        // 二进制附件到达时是 ArrayBuffer；兼容老服务端的 base64 字符串
+        const bytes = typeof image === 'string' ? Uint8Array.from(atob(image), c => c.charCodeAt(0)) : image;
+        if (this.originalImage) URL.revokeObjectURL(this.originalImage);
+        this.originalBlob = new Blob([bytes], { type: mime || 'image/png' });
+        this.originalImage = URL.createObjectURL(this.originalBlob);
+    }
+
+    // blob 为 null：一键解题时图片只在电脑上，手机端没有题图
+    setLastImage(blob) {
+        if (blob === this.lastImageBlob) return;
+        if (this.lastImageData) URL.revokeObjectURL(this.lastImageData);
+        this.lastImageBlob = blob;
+        this.lastImageData = blob ? URL.createObjectURL(blob) : null;
+    }
+
+    /* ---------- v2 增量协议：offset 对齐拼接 + 校验，漂移即请求快照 ---------- */
+    resetStreams() {
+        this.streams = { thinking: '', answer: '' };
+        this.resyncPending = false;
+    }
+
+    decodeFrame(data) {
+        if (!data || data.v !== 2) return data;          // v1 / 服务端直发的状态帧
+        if (data.status === 'started') this.resetStreams();
+        if (!data.stream) return data;
+
+        if (data.reset) {
+            this.streams[data.stream] = '';
+            this.resyncPending = false;
+        } else if (this.resyncPending) {
+            return null;
+        }
+        const text = this.streams[data.stream];
+        if (data.offset !== text.length) return this.requestResync();
+        const full = data.delta ? text + data.delta : text;
+        if (data.adler32 !== undefined && (data.length !== full.length || adler32(full) !== data.adler32)) {
+            return this.requestResync();
+        }
+        this.streams[data.stream] = full;
+        return { ...data, content: full };
+    }
+
+    scheduleAck(seq) {
+        // 合并回报：每 ACK_INTERVAL 至多一次，只报最大 seq
+        this.lastSeq = Math.max(this.lastSeq, seq);
+        if (this._ackTimer) return;
+        this._ackTimer = setTimeout(() => {
+            this._ackTimer = 0;
+            this.socket.emit('stream_ack', { seq: this.lastSeq });
+        }, ACK_INTERVAL);
+    }
+
+    requestResync() {
+        if (!this.resyncPending) {
+            this.resyncPending = true;
+            this.socket.emit('resync_stream', {});
+        }
+        return null;
     }
 
     updateConnectionStatus(connected) {
@@ -138,6 +480,9 @@ class SnapSolver {
         this.connectionStatus.classList.toggle('ok', connected);
         this.connectionStatus.classList.toggle('warn', !connected);
         this.captureBtn.disabled = !connected;
+        this.liveToggle.disabled = !connected;
+        this.screenWatchToggle.disabled = !connected;
+        this.quickSolveBtn.disabled = !connected;
         this.emptyDesc.textContent = connected
             ? '将截取电脑的整个屏幕\n回传后在手机上框选题目'
             : '请先在电脑上运行 Snap-Solver\n手机与电脑同一网络后自动连接';
@@ -146,6 +491,16 @@ class SnapSolver {
     isConnected() { return this.socket && this.socket.connected; }
 
     /* ---------- 截图触发 ---------- */
+    refreshCaptureHint() {
+        const { capture, lastCrop } = window.settingsManager.getSettings();
+        const { monitor, region } = capture || {};
+        this.quickSolveBtn.classList.toggle('hidden', !lastCrop);
+        const screen = monitor ? `屏幕 ${monitor}` : '电脑';
+        this.emptyDesc.textContent = region
+            ? `将截取${screen}上记住的 ${region.width}×${region.height} 区域\n回传后在手机上框选题目`
+            : `将截取${screen}的整个屏幕\n回传后在手机上框选题目`;
+    }
+
     triggerCapture() {
         if (!this.isConnected()) {
             window.uiManager.showToast('未连接到电脑，请确认电脑端程序已启动', 'error');
@@ -154,7 +509,33 @@ class SnapSolver {
         this.captureBtn.disabled = true;
         this.captureBtn.querySelector('i').className = 'fas fa-spinner fa-spin';
         if (this.captureBtnLabel) this.captureBtnLabel.textContent = '截取中…';
-        this.socket.emit('capture_screenshot', {});
+        this.pendingCapture = window.settingsManager.getSettings().capture || {};
+        this.socket.emit('capture_screenshot', this.pendingCapture);
+    }
+
+    // 一键解题：截屏、按上次框选裁剪、预处理都在电脑上做，省掉截图下发与裁剪图上传两趟
+    captureAndSolve() {
+        const s = window.settingsManager;
+        const settings = s.getSettings();
+        if (!this.isConnected() || !settings.lastCrop) return;
+        if (!settings.model) { window.modelPage.open(); return; }
+        if (s.missingKeyForCurrentModel()) { window.modelPage.open({ focusKey: true }); return; }
+        if (this.generating || this.followupGenerating) this.stopGeneration();
+        this.stopWatching();
+        this.setLastImage(null);
+        this.lastImageRef = null;
+        if (this.questionThumbImg) this.questionThumbImg.removeAttribute('src');
+        const r = settings.lastCrop;
+        this.questionMeta.textContent = `${s.currentModel.display_name} · ${TIER_INFO[s.currentTier()]?.label || ''} · 上次框选 ${r.width}×${r.height}`;
+        this.enterAnswerView();
+        this.resetStreams();
+        this.socket.emit('capture_and_solve', {
+            capture: settings.capture || {},
+            crop_rect: r,
+            settings: { ...settings, apiKeys: s.collectApiKeys() },
+            trim: settings.autoTrim,
+            protocol: STREAM_PROTOCOL
+        });
     }
 
     restoreCaptureBtn() {
@@ -194,6 +575,13 @@ class SnapSolver {
                 background: false,
                 responsive: true,
                 crop() { self.scheduleSizeReadout(); },
+                zoom() { self.scheduleTiles(); },
+                cropstart() { self._cropping = true; },
+                cropend() {
+                    self._cropping = false;
+                    self.scheduleTiles();
+                    if (self.hires?.swapDue) self.swapInHires();
+                },
                 ready() {
                     // 连刷题：预填上次裁剪框
                     if (self.lastCropBoxData) {
@@ -208,6 +596,110 @@ class SnapSolver {
         }
     }
 
+    /* ---------- 渐进清晰：预览先行，放大处按块换上原分辨率 ---------- */
+    // 原图像素 / 工作台当前图片像素（预览时 > 1，换上高清拼图后为 1）
+    cropScale() {
+        if (!this.shot || !this.cropper) return 1;
+        const natural = this.cropper.getImageData().naturalWidth;
+        return natural ? this.shot.width / natural : 1;
+    }
+
+    scheduleTiles() {
+        if (!this.shot || this._tileTimer) return;
+        this._tileTimer = setTimeout(() => {
+            this._tileTimer = 0;
+            this.requestTiles();
+        }, 250);
+    }
+
+    // 预览像素被放大到超过 1.25 个物理像素时，请求可视区覆盖的原分辨率块
+    requestTiles() {
+        const shot = this.shot;
+        if (!this.cropper || !shot || !this.isConnected()) return;
+        const canvas = this.cropper.getCanvasData();
+        const container = this.cropper.getContainerData();
+        const cssPerPx = canvas.width / shot.width;                 // 每原图像素占多少 CSS 像素
+        if (cssPerPx * shot.previewScale * (window.devicePixelRatio || 1) <= 1.25) return;
+
+        const x0 = -canvas.left / cssPerPx, y0 = -canvas.top / cssPerPx;
+        const x1 = x0 + container.width / cssPerPx, y1 = y0 + container.height / cssPerPx;
+        const size = shot.tileSize;
+        const cols = Math.ceil(shot.width / size), rows = Math.ceil(shot.height / size);
+        if (!this.hires || this.hires.id !== shot.id) {
+            this.hires = { id: shot.id, canvas: null, ready: null, have: new Set(), pending: new Set(), swapDue: false };
+        }
+        const h = this.hires;
+        const tiles = [];
+        for (let r = Math.max(0, Math.floor(y0 / size)); r < Math.min(rows, Math.ceil(y1 / size)); r++) {
+            for (let c = Math.max(0, Math.floor(x0 / size)); c < Math.min(cols, Math.ceil(x1 / size)); c++) {
+                const key = c + ',' + r;
+                if (h.have.has(key) || h.pending.has(key)) continue;
+                h.pending.add(key);
+                tiles.push([c, r]);
+            }
+        }
+        if (tiles.length) this.socket.emit('request_tiles', { screenshot_id: shot.id, tiles });
+    }
+
+    // 高清底图：原图尺寸的画布，先用预览铺满，没取到的区域保持预览画质
+    async initHires(h) {
+        h.canvas = document.createElement('canvas');
+        h.canvas.width = this.shot.width;
+        h.canvas.height = this.shot.height;
+        h.ctx = h.canvas.getContext('2d');
+        const base = await createImageBitmap(this.originalBlob);
+        h.ctx.drawImage(base, 0, 0, this.shot.width, this.shot.height);
+        base.close?.();
+    }
+
+    async applyTile(data) {
+        const h = this.hires;
+        if (!h || !this.shot || data.screenshot_id !== h.id) return;
+        if (data.error) { h.pending.clear(); return; }
+        const key = data.col + ',' + data.row;
+        try {
+            h.ready = h.ready || this.initHires(h);
+            await h.ready;
+            const image = await this.blobs.resolve(data);
+            const bitmap = await createImageBitmap(new Blob([image], { type: data.mime }));
+            h.ctx.drawImage(bitmap, data.x, data.y);
+            bitmap.close?.();
+            h.have.add(key);
+        } catch (e) {
+            console.error('tile decode failed', e);
+        }
+        h.pending.delete(key);
+        if (!h.pending.size) this.swapInHires();
+    }
+
+    // 一批块到齐后换入工作台：保留当前缩放位置与裁剪框（换算到新图像素）
+    swapInHires() {
+        const h = this.hires;
+        if (!h?.canvas || !this.cropper || h.swapping) return;
+        if (this._cropping) { h.swapDue = true; return; }
+        h.swapDue = false;
+        h.swapping = true;
+        h.canvas.toBlob(blob => {
+            h.swapping = false;
+            if (!blob || this.hires !== h || !this.cropper) return;
+            const k = this.cropScale();
+            const d = this.cropper.getData();
+            const canvas = this.cropper.getCanvasData();
+            const restore = () => {
+                try {
+                    this.cropper.setCanvasData({ left: canvas.left, top: canvas.top, width: canvas.width, height: canvas.height });
+                    this.cropper.setData({ x: d.x * k, y: d.y * k, width: d.width * k, height: d.height * k });
+                } catch (e) {}
+            };
+            // ready 选项只在首次构建时触发，换图后的 ready 单独监听一次
+            this.cropper.element.addEventListener('ready', restore, { once: true });
+            if (this.originalImage) URL.revokeObjectURL(this.originalImage);
+            this.originalBlob = blob;
+            this.originalImage = URL.createObjectURL(blob);
+            this.cropper.replace(this.originalImage);
+        }, 'image/jpeg', 0.92);
+    }
+
     // 裁剪框右上角的尺寸读数（原图像素）
     scheduleSizeReadout() {
         if (this._sizeRaf) return;
@@ -218,7 +710,8 @@ class SnapSolver {
                 const data = this.cropper.getData(true);
                 const box = this.cropper.getCropBoxData();
                 const label = this.cropSizeReadout;
-                label.textContent = `${data.width} × ${data.height}`;
+                const scale = this.cropScale();
+                label.textContent = `${Math.round(data.width * scale)} × ${Math.round(data.height * scale)}`;
                 label.classList.remove('hidden');
                 const w = label.offsetWidth;
                 label.style.left = Math.max(8, box.left + box.width - w) + 'px';
@@ -232,30 +725,82 @@ class SnapSolver {
         this.setView(this.hasAnswer ? 'answer' : 'empty');
     }
 
+    // 当前裁剪框换算到原图像素坐标
+    cropRect() {
+        const { x, y, width, height } = this.cropper.getData();
+        const k = this.cropScale();
+        return { x: Math.round(x * k), y: Math.round(y * k), width: Math.round(width * k), height: Math.round(height * k) };
+    }
+
+    // 把当前框记为截屏区域：之后只截这块，截屏、编码、传输都只碰这些像素
+    rememberRegion() {
+        if (!this.cropper || !this.shot) return;
+        const r = this.cropRect();
+        const origin = this.shot.origin || { x: 0, y: 0 };
+        window.settingsManager.setCapture({
+            region: { x: origin.x + r.x, y: origin.y + r.y, width: r.width, height: r.height }
+        });
+        window.uiManager.showToast(`已记住 ${r.width}×${r.height} 区域，下次只截这里（设置 › 截屏范围 可清除）`, 'success');
+    }
+
     /* ---------- 发送解题 ---------- */
-    sendForSolve() {
-        let imageData;
+    async sendForSolve() {
+        let image;
+        let ref = null;
         try {
             if (this.cropper) {
                 this.lastCropBoxData = this.cropper.getCropBoxData();
-                const canvas = this.cropper.getCroppedCanvas({
-                    maxWidth: 2560, maxHeight: 1440, fillColor: '#fff',
+                // 原图在服务端：只回传裁剪框（原图像素坐标），本地裁一张小预览图给缩略条/对照用
+                if (this.screenshotId) {
+                    ref = { screenshot_id: this.screenshotId, crop_rect: this.cropRect() };
+                    // 记下这次的框，首页的“按上次框选直接解”用
+                    if (this.shot?.capture) window.settingsManager.setLastCrop(this.shot.capture, ref.crop_rect);
+                }
+                const canvas = this.cropper.getCroppedCanvas(ref ? {
+                    maxWidth: 1280, maxHeight: 1280, fillColor: '#fff'
+                } : {
+                    maxWidth: 2560, maxHeight: 2560, fillColor: '#fff',
                     imageSmoothingEnabled: true, imageSmoothingQuality: 'high'
                 });
                 if (!canvas) throw new Error('无法生成裁剪图');
-                imageData = canvas.toDataURL('image/png');
+                // 编码放 Worker：有引用时只是本地预览，否则按所选模型公布的约束编码后上传
+                const constraints = window.settingsManager.currentModel?.image_constraints || {};
+                const encoded = ref
+                    ? await this.encoder.encode(canvas, {}, { maxEdge: 1280, format: 'jpeg', quality: 0.85 })
+                    : await this.encoder.encode(canvas, constraints, { maxEdge: 2560 });
+                image = encoded.blob;
+                this.lastUpload = ref ? null : {
+                    bytes: encoded.bytes, encode_ms: encoded.ms, mime: encoded.type,
+                    width: encoded.width, height: encoded.height, worker: encoded.worker
+                };
             } else {
-                imageData = this.originalImage;
+                image = this.originalBlob;
+                this.lastUpload = { bytes: image.size, encode_ms: 0, mime: image.type, worker: false };
+                if (this.screenshotId) ref = { screenshot_id: this.screenshotId, crop_rect: null };
             }
         } catch (e) {
             window.uiManager.showToast('处理图片出错: ' + e.message, 'error');
             return;
         }
-        this.solveImage(imageData);
+        this.solveImage(image, ref);
     }
 
-    // 统一发送入口：框选发送 / 重解 / 换模型重答 共用
-    solveImage(imageData) {
+    // 解题请求里的图片部分：服务端截图只发引用，否则以二进制附件上传
+    async imagePayload() {
+        if (this.lastImageRef) return { ...this.lastImageRef };
+        // 重解 / 追问重传同一张图：不再重复计编码耗时
+        const upload = this.lastUpload;
+        if (upload) this.lastUpload = { ...upload, encode_ms: 0 };
+        return { image: await this.lastImageBlob.arrayBuffer(), upload: upload || undefined };
+    }
+
+    retryLast() {
+        if (this.lastImageBlob || this.lastImageRef) this.solveImage(this.lastImageBlob, this.lastImageRef);
+    }
+
+    // 统一发送入口：框选发送 / 重解 / 换模型重答 共用；
+    // image 为 Blob（预览，无 ref 时上传），ref 为服务端截图引用
+    async solveImage(image, ref = null) {
         if (!this.isConnected()) {
             window.uiManager.showToast('连接已断开，等待重连后再试', 'error');
             return;
@@ -275,18 +820,21 @@ class SnapSolver {
             return;
         }
 
-        this.lastImageData = imageData;
-        if (this.questionThumbImg) this.questionThumbImg.src = imageData;
+        this.setLastImage(image);
+        this.lastImageRef = ref;
+        if (this.questionThumbImg && this.lastImageData) this.questionThumbImg.src = this.lastImageData;
         this.questionMeta.textContent = `${s.currentModel.display_name} · ${TIER_INFO[s.currentTier()]?.label || ''}`;
 
         this.enterAnswerView();
 
         const apiKeys = s.collectApiKeys();
-        const processed = imageData.startsWith('data:') ? imageData.split(',')[1] : imageData;
+        this.resetStreams();
         try {
             this.socket.emit('analyze_image', {
-                image: processed,
-                settings: { ...settings, apiKeys }
+                ...await this.imagePayload(),
+                settings: { ...settings, apiKeys },
+                trim: settings.autoTrim,
+                protocol: STREAM_PROTOCOL
             });
         } catch (e) {
             this.renderErrorScreen('发送失败：' + e.message);
@@ -298,9 +846,7 @@ class SnapSolver {
         const s = window.settingsManager;
         const before = s.currentModelId;
         await window.modelPage.open();
-        if (s.currentModelId !== before && this.lastImageData) {
-            this.solveImage(this.lastImageData);
-        }
+        if (s.currentModelId !== before) this.retryLast();
     }
 
     /* ---------- 解答屏 ---------- */
@@ -369,8 +915,8 @@ class SnapSolver {
                 this.setStatus('completed', '解答完成', secs + 's');
                 this.setGenerating(false);
                 this.answerActions.classList.add('visible');
-                // 追问框只在完成态出现（设计 4a）
-                if (this.mainAnswerText) this.followupBar.classList.remove('hidden');
+                // 追问框只在完成态出现（设计 4a）；旁观端没有原图，不能追问
+                if (this.mainAnswerText && !this.watching) this.followupBar.classList.remove('hidden');
                 this.followBottom();
                 break;
             }
@@ -404,14 +950,14 @@ class SnapSolver {
     /* ---------- 同题追问（设计 4a/4b/4c） ----------
        上下文 = 题图 + 原解答 + 问答链，共用当前模型与档位；
        历史由前端持有随请求上送，后端保持无状态。 */
-    sendFollowup() {
+    async sendFollowup() {
         const q = this.followupInput.value.trim();
         if (!q || this.generating || this.followupGenerating) return;
         if (!this.isConnected()) {
             window.uiManager.showToast('连接已断开，等待重连后再试', 'error');
             return;
         }
-        if (!this.lastImageData || !this.mainAnswerText) return;
+        if (!(this.lastImageBlob || this.lastImageRef) || !this.mainAnswerText) return;
         const s = window.settingsManager;
         if (s.missingKeyForCurrentModel()) {
             window.modelPage.open({ focusKey: true });
@@ -440,12 +986,13 @@ class SnapSolver {
 
         const settings = s.getSettings();
         const apiKeys = s.collectApiKeys();
-        const processed = this.lastImageData.startsWith('data:') ? this.lastImageData.split(',')[1] : this.lastImageData;
+        this.resetStreams();
         try {
             this.socket.emit('analyze_image', {
-                image: processed,
+                ...await this.imagePayload(),
                 settings: { ...settings, apiKeys },
-                history
+                history,
+                protocol: STREAM_PROTOCOL
             });
         } catch (e) {
             this.failFollowupTurn(turn, '发送失败：' + e.message);
@@ -637,7 +1184,7 @@ class SnapSolver {
                 icon: 'fa-triangle-exclamation',
                 title: '解答失败',
                 hint: '模型服务返回了错误。可以直接重试一次，或换个模型再答。',
-                primary: { label: '重试', icon: 'fa-rotate-right', fn: () => this.lastImageData && this.solveImage(this.lastImageData) },
+                primary: { label: '重试', icon: 'fa-rotate-right', fn: () => this.retryLast() },
             },
         }[kind];
 
@@ -669,7 +1216,7 @@ class SnapSolver {
             b.addEventListener('click', fn);
             row.appendChild(b);
         };
-        if (kind !== 'other') addBtn('重试', 'fa-rotate-right', () => this.lastImageData && this.solveImage(this.lastImageData));
+        if (kind !== 'other') addBtn('重试', 'fa-rotate-right', () => this.retryLast());
         addBtn('换个模型', 'fa-shuffle', () => this.switchModelAndRetry());
 
         this.responseContent.innerHTML = '';
@@ -699,6 +1246,13 @@ class SnapSolver {
     }
 
     stopGeneration() {
+        // 旁观端不能停别人的生成，只退出同看
+        if (this.watching) {
+            this.stopWatching();
+            this.setStatus('stopped', '已停止同看', '');
+            this.setGenerating(false);
+            return;
+        }
         if (this.socket?.connected) {
             this.socket.emit('stop_generation');
             this.stopGenerationBtn?.classList.remove('visible');
@@ -708,9 +1262,13 @@ class SnapSolver {
     /* ---------- 事件绑定 ---------- */
     setupEventListeners() {
         this.captureBtn.addEventListener('click', () => this.triggerCapture());
+        this.liveToggle.addEventListener('click', () => this.toggleLive());
+        this.screenWatchToggle.addEventListener('click', () => this.toggleScreenWatch());
+        this.liveCanvas.addEventListener('click', () => this.triggerCapture());
         this.el('modelEntry').addEventListener('click', () => window.modelPage.open());
         this.el('cropSendToAI').addEventListener('click', () => this.sendForSolve());
         this.el('cropReset').addEventListener('click', () => this.cropper?.reset());
+        this.el('rememberRegion').addEventListener('click', () => this.rememberRegion());
         this.el('reshootBtn').addEventListener('click', () => this.triggerCapture());
         this.el('workspaceExit').addEventListener('click', () => this.exitWorkspace());
         this.stopGenerationBtn.addEventListener('click', () => this.stopGeneration());
@@ -725,6 +1283,7 @@ class SnapSolver {
                 if (idx !== 1) return;
             }
             if (this.followupGenerating) this.stopGeneration();
+            this.stopWatching();
             if (this.cropper) { this.cropper.destroy(); this.cropper = null; }
             this.hasAnswer = false;
             this.resetFollowups();
@@ -732,7 +1291,7 @@ class SnapSolver {
         });
 
         // 完成后的动作行（设计 4a：重解 / 换模型重解 / 复制）
-        this.el('resolveBtn').addEventListener('click', () => this.lastImageData && this.solveImage(this.lastImageData));
+        this.el('resolveBtn').addEventListener('click', () => this.retryLast());
         this.el('switchModelBtn').addEventListener('click', () => this.switchModelAndRetry());
         this.el('copyAnswerBtn').addEventListener('click', () => this.copyText(this.mainAnswerText));
 
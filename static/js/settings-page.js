@@ -108,6 +108,7 @@ class SettingsPage {
                 onClick: () => this.show('prompts')
             }),
             this.navRow({ icon: 'fa-language', label: '回复语言', value: s._language, onClick: () => this.openLanguageSheet() }),
+            this.navRow({ icon: 'fa-display', label: '截屏范围', value: s.captureLabel(), onClick: () => this.openCaptureSheet() }),
         ));
 
         wrap.appendChild(this.sectionLabel('模型接入'));
@@ -440,6 +441,61 @@ class SettingsPage {
         });
     }
 
+    // 截屏范围：选显示器；记住的区域在框选工作台里设置，这里只能清除
+    openCaptureSheet() {
+        const s = this.s;
+        Sheets.open({
+            name: 'capture',
+            build: async (body, ctl) => {
+                const h = document.createElement('h3');
+                h.className = 'confirm-title';
+                h.textContent = '截屏范围';
+                const seg = document.createElement('div');
+                seg.className = 'segmented';
+                const region = document.createElement('button');
+                region.className = 'btn btn-ghost';
+                const done = document.createElement('button');
+                done.className = 'btn btn-ghost';
+                done.textContent = '完成';
+                done.addEventListener('click', () => ctl.close());
+                const trimRow = document.createElement('div');
+                trimRow.className = 'nav-row static';
+                trimRow.innerHTML = `
+                    <span class="nav-row-label">发送前自动裁去空白</span>
+                    <label class="switch"><input type="checkbox" /><span class="switch-slider"></span></label>`;
+                const trimBox = trimRow.querySelector('input');
+                trimBox.checked = s._autoTrim;
+                trimBox.addEventListener('change', () => s.setCapture({ autoTrim: trimBox.checked }));
+                body.append(h, seg, trimRow, done);
+
+                const syncRegion = () => {
+                    const r = s._captureRegion;
+                    region.textContent = r ? `清除记住的区域（${r.width}×${r.height}）` : '';
+                    region.classList.toggle('hidden', !r);
+                };
+                region.addEventListener('click', () => { s.setCapture({ region: null }); syncRegion(); });
+                syncRegion();
+                body.insertBefore(region, done);
+
+                let monitors = [];
+                try { monitors = (await (await fetch('/api/monitors')).json()).monitors || []; } catch (e) {}
+                if (!monitors.length) monitors = [{ index: 1, primary: true }];
+                const current = s._captureMonitor || 1;
+                monitors.forEach(m => {
+                    const opt = document.createElement('button');
+                    opt.className = 'segmented-option' + (m.index === current ? ' active' : '');
+                    opt.textContent = `屏幕 ${m.index}${m.primary ? '（主）' : ''}` + (m.width ? ` ${m.width}×${m.height}` : '');
+                    opt.addEventListener('click', () => {
+                        s.setCapture({ monitor: m.index === 1 ? null : m.index });
+                        seg.querySelectorAll('.segmented-option').forEach(o => o.classList.toggle('active', o === opt));
+                        syncRegion();
+                    });
+                    seg.appendChild(opt);
+                });
+            }
+        });
+    }
+
     openAppearanceSheet() {
         Sheets.open({
             name: 'appearance',
@@ -6,7 +6,7 @@
    UI 渲染在 model-page.js（模型）与 settings-page.js（设置）。
    对外契约：ready(Promise) / getSettings() / collectApiKeys() /
             missingKeyForCurrentModel() / selectModel() / setTier() /
-            currentTier() / saveApiKey() / maybeStartOnboarding()
+            currentTier() / saveApiKey() / setCapture() / setLastCrop() / maybeStartOnboarding()
    ============================================================ */
 
 const KEY_META = {
@@ -59,6 +59,10 @@ class SettingsManager extends EventTarget {
         this._proxyEnabled = false;
         this._proxyHost = '127.0.0.1';
         this._proxyPort = 4780;
+        this._captureMonitor = null;    // 截哪个显示器（/api/monitors 的 index），null 为主屏
+        this._captureRegion = null;     // 记住的区域 {x, y, width, height}，相对所选显示器
+        this._autoTrim = true;          // 送模型前由电脑端裁掉空白边距
+        this._lastCrop = null;          // 上次框选 {capture, rect}：rect 为截图像素坐标，capture 为当时的截屏范围
         this.ready = this.init();
     }
 
@@ -105,6 +109,10 @@ class SettingsManager extends EventTarget {
         this._proxyEnabled = !!saved.proxyEnabled;
         this._proxyHost = saved.proxyHost || '127.0.0.1';
         this._proxyPort = parseInt(saved.proxyPort || 4780, 10);
+        this._captureMonitor = Number.isInteger(saved.captureMonitor) ? saved.captureMonitor : null;
+        this._captureRegion = saved.captureRegion || null;
+        this._autoTrim = saved.autoTrim !== false;
+        this._lastCrop = saved.lastCrop || null;
         this.currentModel = this.models.find(m => m.id === saved.model) || this.models[0] || null;
         this.currentModelId = this.currentModel ? this.currentModel.id : null;
     }
@@ -118,6 +126,10 @@ class SettingsManager extends EventTarget {
             proxyEnabled: this._proxyEnabled,
             proxyHost: this._proxyHost,
             proxyPort: this._proxyPort,
+            captureMonitor: this._captureMonitor,
+            captureRegion: this._captureRegion,
+            autoTrim: this._autoTrim,
+            lastCrop: this._lastCrop,
         }));
     }
 
@@ -227,6 +239,37 @@ class SettingsManager extends EventTarget {
         this.emitChange('network');
     }
 
+    // 换显示器时记住的区域随之作废（坐标相对原显示器）
+    setCapture({ monitor, region, autoTrim } = {}) {
+        if (autoTrim !== undefined) this._autoTrim = !!autoTrim;
+        if (monitor !== undefined && monitor !== this._captureMonitor) {
+            this._captureMonitor = monitor;
+            this._captureRegion = null;
+        }
+        if (region !== undefined) this._captureRegion = region;
+        this.persist();
+        this.emitChange('capture');
+    }
+
+    // 记下本机上次的框选，一键解题按它裁剪；截屏范围变了框就对不上，getSettings 不再给出
+    setLastCrop(capture, rect) {
+        this._lastCrop = rect ? { capture, rect } : null;
+        this.persist();
+        this.emitChange('capture');
+    }
+
+    lastCropRect() {
+        const c = this._lastCrop;
+        const capture = { monitor: this._captureMonitor, region: this._captureRegion };
+        return c && JSON.stringify(c.capture) === JSON.stringify(capture) ? c.rect : null;
+    }
+
+    captureLabel() {
+        const screen = this._captureMonitor ? `屏幕 ${this._captureMonitor}` : '主屏';
+        const r = this._captureRegion;
+        return r ? `${screen} · ${r.width}×${r.height} 区域` : `${screen} · 整屏`;
+    }
+
     /* ---------- 中转地址（填了即走中转） ---------- */
     async setRelay(provider, url) {
         this.relayApis[provider] = (url || '').trim();
@@ -288,6 +331,9 @@ class SettingsManager extends EventTarget {
             proxyEnabled: this._proxyEnabled,
             proxyHost: this._proxyHost,
             proxyPort: this._proxyPort,
+            capture: { monitor: this._captureMonitor, region: this._captureRegion },
+            autoTrim: this._autoTrim,
+            lastCrop: this.lastCropRect(),
         };
     }
 
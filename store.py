@@ -0,0 +1,152 @@
+"""服务端截图存储：截图原始像素留在内存里，凭 screenshot_id 引用
+
+手机只拿到编码后的截图用于框选，解题时回传 screenshot_id + crop_rect（原图像素坐标），
+服务端从原始像素裁剪（送模型用无损 PNG），免去每次解题/重答都上传一张数 MB 的裁剪图。
+条目按 TTL 过期，另有条数上限（一张 2560x1440 RGB 约 11 MB），超出时淘汰最久未用的。
+原分辨率切块按需编码，编码结果随截图缓存，重复放大同一区域不再重编。
+条目存的是截屏服务的 Frame：切块编码、送模型前的预处理经 Frame 交给截屏进程，就地读它的共享内存槽位。
+切块 / 预处理期间钉住条目，淘汰时若仍有读者，等读完再归还槽位，不会读到下一次截屏覆盖的像素。
+"""
+import collections
+import threading
+import time
+import uuid
+
+# 截图保留时长（秒）与最多保留张数
+SCREENSHOT_TTL = 30 * 60
+MAX_SCREENSHOTS = 6
+
+
+class StoredScreenshot:
+    __slots__ = ('screenshot_id', 'frame', 'image', 'created', 'last_used', 'tiles', 'readers', 'evicted')
+
+    def __init__(self, screenshot_id: str, frame):
+        self.screenshot_id = screenshot_id
+        self.frame = frame
+        self.image = frame.image
+        self.created = self.last_used = time.monotonic()
+        self.tiles = {}     # (col, row, tile_size) → 编码结果
+        self.readers = 0        # 正在读像素的调用数
+        self.evicted = False
+
+    def drop(self) -> None:
+        self.image = None
+        self.tiles = {}
+        if self.frame is not None:
+            self.frame.release()
+            self.frame = None
+
+
+class ScreenshotStore:
+    """线程安全的 LRU + TTL 截图存储"""
+
+    def __init__(self, ttl: float = SCREENSHOT_TTL, max_items: int = MAX_SCREENSHOTS):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, frame) -> str:
+        """存入一帧截图（worker.Frame），返回 screenshot_id。
+        条目被淘汰时调用 frame.release()（截屏进程的共享内存槽位借此归还）"""
+        shot = StoredScreenshot(uuid.uuid4().hex, frame)
+        with self._lock:
+            self._purge(shot.created)
+            self._items[shot.screenshot_id] = shot
+            while len(self._items) > self.max_items:
+                self._evict(self._items.popitem(last=False)[1])
+        return shot.screenshot_id
+
+    def get(self, screenshot_id):
+        """取出截图条目（顺带续期）；不存在或已过期返回 None。
+        只用于判断是否存在；要读像素用 prepare() / tile()，它们会钉住条目"""
+        if not isinstance(screenshot_id, str):
+            return None
+        with self._lock:
+            return self._lookup(screenshot_id)
+
+    def prepare(self, screenshot_id, crop_rect=None, trim: bool = True, constraints: dict = None):
+        """按原图像素坐标裁剪（crop_rect 为 {x, y, width, height}，缺省为整张）后做送模型前的预处理（frame.prepare，工作进程下在截屏进程里做），
+        返回同 preprocess.prepare_image；截图不存在时抛 KeyError"""
+        shot = self._pin(screenshot_id)
+        try:
+            return shot.frame.prepare(clamp_rect(crop_rect, shot.image.size), trim, constraints)
+        finally:
+            self._unpin(shot)
+
+    def tile(self, screenshot_id, col: int, row: int, tile_size: int):
+        """原图第 (col, row) 块（边长 tile_size）的编码结果（frame.encode），按块缓存。
+        返回 (box, encoded)，块越界返回 None；截图不存在时抛 KeyError"""
+        shot = self._pin(screenshot_id)
+        try:
+            width, height = shot.image.size
+            left, top = col * tile_size, row * tile_size
+            if col < 0 or row < 0 or left >= width or top >= height:
+                return None
+            box = (left, top, min(width, left + tile_size), min(height, top + tile_size))
+            key = (col, row, tile_size)
+            encoded = shot.tiles.get(key)
+            if encoded is None:
+                # 截屏进程直接读槽位编码，期间须钉着条目；并发请求同一块时可能重复编码一次，结果相同
+                encoded = shot.tiles[key] = shot.frame.encode(box)
+            return box, encoded
+        finally:
+            self._unpin(shot)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def _lookup(self, screenshot_id):
+        now = time.monotonic()
+        self._purge(now)
+        shot = self._items.get(screenshot_id)
+        if shot is not None:
+            shot.last_used = now
+            self._items.move_to_end(screenshot_id)
+        return shot
+
+    def _pin(self, screenshot_id) -> StoredScreenshot:
+        with self._lock:
+            shot = self._lookup(screenshot_id) if isinstance(screenshot_id, str) else None
+            if shot is None:
+                raise KeyError(screenshot_id)
+            shot.readers += 1
+            return shot
+
+    def _unpin(self, shot: StoredScreenshot) -> None:
+        with self._lock:
+            shot.readers -= 1
+            if shot.evicted and shot.readers == 0:
+                shot.drop()
+
+    def _evict(self, shot: StoredScreenshot) -> None:
+        """移出存储；还有读者时槽位等最后一个读者放手再归还"""
+        shot.evicted = True
+        if shot.readers == 0:
+            shot.drop()
+
+    def _purge(self, now: float) -> None:
+        expired = [key for key, shot in self._items.items() if now - shot.last_used > self.ttl]
+        for key in expired:
+            self._evict(self._items.pop(key))
+
+
+def clamp_rect(crop_rect, size):
+    """把客户端给的裁剪框（可能越界、带小数）收敛为 PIL 的 (left, top, right, bottom)；
+    无效或覆盖整张时返回 None"""
+    if not isinstance(crop_rect, dict):
+        return None
+    width, height = size
+    try:
+        left = max(0, int(round(float(crop_rect.get('x', 0)))))
+        top = max(0, int(round(float(crop_rect.get('y', 0)))))
+        right = min(width, left + int(round(float(crop_rect.get('width', width)))))
+        bottom = min(height, top + int(round(float(crop_rect.get('height', height)))))
+    except (TypeError, ValueError):
+        return None
+    if right <= left or bottom <= top:
+        return None
+    if (left, top, right, bottom) == (0, 0, width, height):
+        return None
+    return left, top, right, bottom
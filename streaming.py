@@ -0,0 +1,609 @@
+"""ai_response 下发协议与合帧
+
+模型生成器只吐原始增量，这里负责：合帧节流（coalesce）→ 按协议编码（DeltaEncoder）。
+
+v1（legacy）：每个事件携带该流到目前为止的累计全文 content，原样下发。
+v2（delta）：thinking / answer 两条流分别只下发新增片段 delta，
+    并带上该片段在流中的起始偏移 offset（UTF-16 码元，与浏览器 String.length 一致）；
+    每隔 CHECKSUM_EVERY 帧及每条流的结束帧附带 length + adler32（UTF-8 字节）校验，
+    客户端发现偏移或校验对不上时发 resync_stream，服务端回整段快照帧（reset=True）。
+
+背压（FlowControl）：v2 客户端按 seq 回 stream_ack，服务端据此统计每个连接
+在途的帧数/字节数，另参考 engine.io 层待发包数；跟不上时暂扣增量——
+答案流只按低频下发合并后的最新状态，思考流整体暂停，追上后一次补齐。
+
+续传（GenerationJob）：每次生成有稳定的 job_id 和有界的帧重放缓冲；
+连接断开后生成照常跑完，客户端换 sid 重连时带 job_id + last_seq 重新挂上，
+只补发错过的帧；缓冲已滚出时改发快照（已结束的流带结束状态）+ error / stopped 帧。
+
+同看（fan-out）：每个任务有一个 Socket.IO 房间，发起端与旁观设备都在里面，
+每帧只编码一次向房间广播，不再为旁观设备重复调用模型；
+旁观端 engine.io 积压过多时广播跳过它，积压回落后从重放缓冲补齐。
+"""
+import collections
+import queue
+import threading
+import time
+import zlib
+
+from models.base import StreamAccumulator, StreamEvent
+
+PROTOCOL_LEGACY = 1
+PROTOCOL_DELTA = 2
+
+# 每多少个增量帧附带一次校验
+CHECKSUM_EVERY = 16
+
+# 合帧预算：两帧最小间隔 / 增量最长滞留（秒）
+FRAME_INTERVAL = 0.05
+FRAME_MAX_DELAY = 0.15
+
+# 背压水位：在途字节超过高水位进入拥塞，回落到低水位以下解除
+HIGH_WATER = 64 * 1024
+LOW_WATER = 16 * 1024
+# 帧的固定开销估计（v / seq / status / stream / offset 等字段与事件名），加上正文的 UTF-8 字节数即帧大小
+FRAME_OVERHEAD = 100
+# engine.io 层待发包数上限（轮询下即客户端还没取走的包）
+BACKLOG_LIMIT = 16
+# 拥塞期间答案流的最低刷新间隔（秒）
+CONGESTED_INTERVAL = 1.0
+
+# 每次生成保留的重放帧数 / 结束后保留多久供重连续传（秒）
+REPLAY_FRAMES = 512
+JOB_TTL = 300
+
+# 事件状态 → 所属流
+_STREAM_STATUS = {
+    'thinking': 'thinking',
+    'streaming': 'answer',
+}
+_COMPLETE_STATUS = {
+    'thinking_complete': 'thinking',
+    'completed': 'answer',
+}
+# 携带增量的流式状态（含各家模型归一前的别名）
+_DELTA_STATUSES = ('thinking', 'reasoning', 'streaming')
+# 结束类状态：缓冲滚出后随快照一并补发
+_TERMINAL_STATUSES = ('thinking_complete', 'completed', 'error', 'stopped')
+# 快照帧沿用流式状态名，老逻辑无需区分；已结束的流改用其结束状态（见 DeltaEncoder.snapshot）
+_SNAPSHOT_STATUS = {
+    'thinking': 'thinking',
+    'answer': 'streaming',
+}
+
+
+def negotiate_protocol(value) -> int:
+    """客户端在 analyze_image 里声明 protocol；缺省或非法一律回落 v1"""
+    try:
+        return PROTOCOL_DELTA if int(value) >= PROTOCOL_DELTA else PROTOCOL_LEGACY
+    except (TypeError, ValueError):
+        return PROTOCOL_LEGACY
+
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode('utf-16-le')) // 2
+
+
+class _StreamState:
+    """单条流已下发的状态：全文、UTF-16 偏移、滚动校验。
+    全文用 StreamAccumulator 累积（属性上逐片 += 每次都整段拷贝），用到时才拼；
+    completed 为已下发的结束状态（thinking_complete / completed），流未结束时为 None"""
+    __slots__ = ('_text', 'offset', 'adler', 'completed')
+
+    def __init__(self):
+        self._text = StreamAccumulator()
+        self.offset = 0
+        self.adler = 1
+        self.completed = None
+
+    @property
+    def text(self) -> str:
+        return self._text.text
+
+    def append(self, delta: str) -> None:
+        if delta:
+            self._text.append(delta)
+            self.offset += _utf16_len(delta)
+            self.adler = zlib.adler32(delta.encode('utf-8'), self.adler)
+
+    def reset(self) -> None:
+        self._text = StreamAccumulator()
+        self.offset = 0
+        self.adler = 1
+
+
+class DeltaEncoder:
+    """把模型生成器吐出的事件编码为某一协议版本的下发帧。
+    流式事件携带增量 delta（见 coalesce），结束事件携带全文 content。
+    一次生成一个实例；快照（resync）可能来自 socket 线程，故加锁。"""
+
+    def __init__(self, protocol: int = PROTOCOL_DELTA, checksum_every: int = CHECKSUM_EVERY):
+        self.protocol = protocol
+        self.checksum_every = checksum_every
+        self.seq = 0
+        self._streams = {'thinking': _StreamState(), 'answer': _StreamState()}
+        self._since_checksum = 0
+        self._lock = threading.Lock()
+
+    def encode(self, response: StreamEvent) -> list:
+        """编码一个事件，返回待下发的帧列表（可能为空）"""
+        with self._lock:
+            status = response.status
+            stream = _STREAM_STATUS.get(status)
+            if stream is not None:
+                state = self._streams[stream]
+                delta = response.delta
+                if delta is None:
+                    # 兼容仍吐累计全文的生成器
+                    return self._sync(status, stream, response.content or '')
+                offset = state.offset
+                state.append(delta)
+                if not delta:
+                    return []
+                if self.protocol == PROTOCOL_LEGACY:
+                    return [{'status': status, 'content': state.text}]
+                return [self._delta_frame(status, stream, offset, delta)]
+
+            if self.protocol == PROTOCOL_LEGACY:
+                return [response.to_dict()]
+
+            stream = _COMPLETE_STATUS.get(status)
+            if stream is not None:
+                # 结束帧补齐尚未下发的尾巴，并强制附带校验
+                content = response.content
+                if content is None:
+                    content = self._streams[stream].text
+                frames = self._sync(status, stream, content, force=True)
+                self._streams[stream].completed = status
+                return frames
+
+            fields = response.to_dict()
+            del fields['status']
+            return [self._frame(status, **fields)]
+
+    def snapshot(self) -> list:
+        """两条流的整段快照帧，用于客户端重同步。
+        已结束的流以结束状态下发：客户端在结束帧上发现漂移时，快照本身就是它的结束帧"""
+        with self._lock:
+            frames = []
+            for stream, state in self._streams.items():
+                if not state.text and state.completed is None:
+                    continue
+                frames.append(self._frame(
+                    state.completed or _SNAPSHOT_STATUS[stream],
+                    stream=stream,
+                    offset=0,
+                    delta=state.text,
+                    reset=True,
+                    length=state.offset,
+                    adler32=state.adler & 0xffffffff,
+                ))
+            return frames
+
+    def _sync(self, status: str, stream: str, content: str, force: bool = False) -> list:
+        """按全文对齐流状态：追加式变化发尾部增量，否则整段重发"""
+        state = self._streams[stream]
+        if content.startswith(state.text):
+            offset = state.offset
+            delta = content[len(state.text):]
+            state.append(delta)
+            if not delta and not force:
+                return []
+            if self.protocol == PROTOCOL_LEGACY:
+                return [{'status': status, 'content': state.text}]
+            return [self._delta_frame(status, stream, offset, delta, force=force)]
+
+        state.reset()
+        state.append(content)
+        if self.protocol == PROTOCOL_LEGACY:
+            return [{'status': status, 'content': state.text}]
+        return [self._delta_frame(status, stream, 0, content, reset=True)]
+
+    def _delta_frame(self, status: str, stream: str, offset: int, delta: str,
+                     force: bool = False, reset: bool = False) -> dict:
+        state = self._streams[stream]
+        fields = {'stream': stream, 'offset': offset, 'delta': delta}
+        if reset:
+            fields['reset'] = True
+        self._since_checksum += 1
+        if force or reset or self._since_checksum >= self.checksum_every:
+            self._since_checksum = 0
+            fields['length'] = state.offset
+            fields['adler32'] = state.adler & 0xffffffff
+        return self._frame(status, **fields)
+
+    def _frame(self, status: str, **fields) -> dict:
+        self.seq += 1
+        frame = {'v': PROTOCOL_DELTA, 'seq': self.seq, 'status': status}
+        frame.update(fields)
+        return frame
+
+
+def _frame_size(frame: dict) -> int:
+    """帧大小的估计：热路径上不为计数再序列化一遍"""
+    text = frame.get('delta') or frame.get('content') or frame.get('error') or ''
+    return FRAME_OVERHEAD + len(text.encode('utf-8'))
+
+
+class FlowControl:
+    """单个连接的下发背压：包住 DeltaEncoder，所有 ai_response 帧都经这里发出。
+
+    在途量只对会回 stream_ack 的 v2 客户端统计；v1 客户端只看 engine.io 待发包数。
+    拥塞时增量事件不编码、按状态暂存合并（编码器状态停在已下发处，偏移天然连续），
+    答案流每 congested_interval 放出一帧最新状态，思考流等追上再放；
+    非增量事件（结束/出错等）先放出暂存再照常下发，保证顺序。
+    生成线程与 stream_ack / resync_stream 处理线程共用，故加锁。"""
+
+    def __init__(self, encoder: DeltaEncoder, emit, backlog=None,
+                 high_water: int = HIGH_WATER, low_water: int = LOW_WATER,
+                 backlog_limit: int = BACKLOG_LIMIT, congested_interval: float = CONGESTED_INTERVAL):
+        self.encoder = encoder
+        self.high_water = high_water
+        self.low_water = low_water
+        self.backlog_limit = backlog_limit
+        self.congested_interval = congested_interval
+        self._emit = emit
+        self._backlog = backlog
+        self._acks = encoder.protocol >= PROTOCOL_DELTA
+        self._inflight = collections.deque()    # [(seq, bytes), ...] 尚未被确认的帧
+        self._inflight_bytes = 0
+        self._held = []                         # [[status, [delta, ...]], ...]，保持到达顺序
+        self._last_release = 0.0
+        self._lock = threading.Lock()
+        self.congested = False
+        self.sent = 0
+        self.merged = 0                         # 拥塞期间被合并掉的中间增量数
+        self.stalls = 0                         # 进入拥塞的次数
+
+    def offer(self, response: StreamEvent) -> int:
+        """提交一个（已归一的）事件，返回实际下发的帧数"""
+        with self._lock:
+            status = response.status
+            delta = response.delta
+            if delta is not None and status in _STREAM_STATUS and self._check():
+                self._hold(status, delta)
+                # 答案流低频放出最新状态；思考流不单独放，等追上或答案流带出
+                if status == 'streaming' and time.monotonic() - self._last_release >= self.congested_interval:
+                    return self._release()
+                return 0
+            return self._release() + self._send(self.encoder.encode(response))
+
+    def ack(self, seq) -> int:
+        """客户端确认已收到 seq 及之前的帧；追上时补发暂存，返回补发帧数"""
+        with self._lock:
+            if not isinstance(seq, int) or seq > self.encoder.seq:
+                return 0    # 上一次生成的迟到确认
+            while self._inflight and self._inflight[0][0] <= seq:
+                self._inflight_bytes -= self._inflight.popleft()[1]
+            if self.congested and not self._check():
+                return self._release()
+            return 0
+
+    def resync(self) -> int:
+        """下发整段快照（暂存部分仍按背压规则稍后补发）"""
+        with self._lock:
+            return self._send(self.encoder.snapshot())
+
+    def exclusive(self, fn):
+        """在锁内执行 fn(encoder)，与帧下发互斥"""
+        with self._lock:
+            return fn(self.encoder)
+
+    def resume(self, replay) -> int:
+        """换连接后续传：在锁内先执行 replay(encoder) 补发错过的帧，
+        再清空旧连接的在途统计、放出暂存增量。返回放出的暂存帧数"""
+        with self._lock:
+            replay(self.encoder)
+            self._inflight.clear()
+            self._inflight_bytes = 0
+            self.congested = False
+            return self._release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'protocol': self.encoder.protocol,
+                'congested': self.congested,
+                'inflight_frames': len(self._inflight),
+                'inflight_bytes': self._inflight_bytes,
+                'transport_backlog': self._transport_backlog(),
+                'held_deltas': sum(len(parts) for _, parts in self._held),
+                'sent': self.sent,
+                'merged': self.merged,
+                'stalls': self.stalls,
+            }
+
+    def _transport_backlog(self) -> int:
+        if self._backlog is None:
+            return 0
+        try:
+            return self._backlog()
+        except Exception:
+            return 0
+
+    def _check(self) -> bool:
+        """按水位更新拥塞状态（带回差，避免在阈值附近抖动）"""
+        backlog = self._transport_backlog()
+        if self.congested:
+            if self._inflight_bytes <= self.low_water and backlog <= self.backlog_limit // 2:
+                self.congested = False
+        elif self._inflight_bytes > self.high_water or backlog > self.backlog_limit:
+            self.congested = True
+            self.stalls += 1
+        return self.congested
+
+    def _hold(self, status: str, delta: str) -> None:
+        if self._held and self._held[-1][0] == status:
+            self._held[-1][1].append(delta)
+            self.merged += 1
+        else:
+            self._held.append([status, [delta]])
+
+    def _release(self) -> int:
+        """把暂存增量合并编码后下发"""
+        if not self._held:
+            return 0
+        held, self._held = self._held, []
+        self._last_release = time.monotonic()
+        frames = []
+        for status, parts in held:
+            frames.extend(self.encoder.encode(StreamEvent(status, delta=''.join(parts))))
+        return self._send(frames)
+
+    def _send(self, frames: list) -> int:
+        for frame in frames:
+            if self._acks and 'seq' in frame:
+                size = _frame_size(frame)
+                self._inflight.append((frame['seq'], size))
+                self._inflight_bytes += size
+            self._emit(frame)
+        self.sent += len(frames)
+        return len(frames)
+
+
+class GenerationJob:
+    """一次生成：稳定的 job_id + 有界重放缓冲 + 同看房间。
+    帧经 FlowControl 发出时先进缓冲，再向房间广播（发起端断开且无人旁观时只进缓冲）。
+    emit(frame, target, skip=None) 负责实际下发（target 为 sid 或房间），
+    backlog(sid) 返回该连接的待发包数，join(sid, room) / leave(sid, room) 维护房间成员。
+    背压只跟发起端走；旁观端跟不上时单独跳过，不拖慢发起端。"""
+
+    def __init__(self, job_id: str, sid, protocol: int, emit, backlog=None,
+                 join=None, leave=None, replay_frames: int = REPLAY_FRAMES,
+                 backlog_limit: int = BACKLOG_LIMIT):
+        self.job_id = job_id
+        self.room = f'job_{job_id}'
+        self.sid = sid
+        self.stop_event = threading.Event()
+        self.finished_at = None
+        self.viewers = {}           # sid → None（实时）/ 已送达的最后 seq（落后中）
+        self.viewer_stalls = 0      # 旁观端因积压被暂停广播的次数
+        self.backlog_limit = backlog_limit
+        self._emit = emit
+        self._backlog = backlog
+        self._join = join
+        self._leave = leave
+        self._replay = collections.deque(maxlen=replay_frames)
+        self._terminal = []
+        self.flow = FlowControl(
+            DeltaEncoder(protocol),
+            self._deliver,
+            backlog=(lambda: backlog(self.sid)) if backlog is not None else None,
+            backlog_limit=backlog_limit,
+        )
+        if sid is not None and join is not None:
+            join(sid, self.room)
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def shareable(self) -> bool:
+        """只有带 seq 的 v2 帧能补发，旁观与续传都依赖它"""
+        return self.flow.encoder.protocol >= PROTOCOL_DELTA
+
+    def finish(self) -> None:
+        self.finished_at = time.monotonic()
+
+    def expired(self, now: float, ttl: float = JOB_TTL) -> bool:
+        return self.finished_at is not None and now - self.finished_at > ttl
+
+    def detach(self, sid) -> None:
+        """发起端断开或改发新题：生成继续，帧只进缓冲（及旁观房间）"""
+        def drop(encoder):
+            if self.sid == sid:
+                self.sid = None
+                if self._leave is not None:
+                    self._leave(sid, self.room)
+
+        self.flow.exclusive(drop)
+
+    def attach(self, sid, last_seq: int = 0) -> int:
+        """挂到新连接并补发 last_seq 之后的帧，返回补发帧数。
+        缓冲里已找不到 last_seq 的下一帧时，改发两条流的快照 + 已出现的 error / stopped 帧。"""
+        sent = 0
+
+        def replay(encoder):
+            nonlocal sent
+            self.sid = sid
+            self.viewers.pop(sid, None)
+            sent = self._catch_up(encoder, sid, last_seq)
+            if self._join is not None:
+                self._join(sid, self.room)
+
+        released = self.flow.resume(replay)
+        return sent + released
+
+    def watch(self, sid, last_seq: int = 0) -> int:
+        """旁观设备加入：补发 last_seq 之后的帧后进房间收实时广播，返回补发帧数"""
+        def join(encoder):
+            sent = self._catch_up(encoder, sid, last_seq)
+            self.viewers[sid] = None
+            if self._join is not None:
+                self._join(sid, self.room)
+            return sent
+
+        return self.flow.exclusive(join)
+
+    def unwatch(self, sid) -> None:
+        def drop(encoder):
+            if sid in self.viewers:
+                del self.viewers[sid]
+                if self._leave is not None:
+                    self._leave(sid, self.room)
+
+        self.flow.exclusive(drop)
+
+    def resync(self, sid) -> int:
+        """发起端走 FlowControl（计入在途统计）；旁观端单独补一份快照"""
+        if sid == self.sid:
+            return self.flow.resync()
+
+        def snapshot(encoder):
+            if sid not in self.viewers:
+                return 0
+            frames = encoder.snapshot()
+            self._replay.extend(frames)
+            for frame in frames:
+                self._emit(frame, sid)
+            return len(frames)
+
+        return self.flow.exclusive(snapshot)
+
+    def _catch_up(self, encoder, sid, last_seq: int) -> int:
+        """单独补发 last_seq 之后的帧（调用方持有 FlowControl 的锁）"""
+        if self._replay and self._replay[0]['seq'] <= last_seq + 1:
+            frames = [f for f in self._replay if f['seq'] > last_seq]
+        else:
+            frames = encoder.snapshot()
+            self._replay.extend(frames)
+            # 流的结束帧已由快照（以结束状态）覆盖，原帧的 offset 接不上快照后的全文，不再重放；
+            # 只补不带流的结束帧（error / stopped）
+            frames = frames + [f for f in self._terminal if f['seq'] > last_seq and 'stream' not in f]
+        for frame in frames:
+            self._emit(frame, sid)
+        return len(frames)
+
+    def _lagging(self, encoder, frame: dict) -> list:
+        """按各旁观端的待发包数决定这一帧的广播要跳过谁；积压回落的先单独补齐"""
+        if not self.viewers or self._backlog is None or 'seq' not in frame:
+            return []
+        skip = []
+        for sid, behind in list(self.viewers.items()):
+            try:
+                backlog = self._backlog(sid)
+            except Exception:
+                continue
+            if behind is None:
+                if backlog > self.backlog_limit:
+                    self.viewers[sid] = frame['seq'] - 1
+                    skip.append(sid)
+                    self.viewer_stalls += 1
+            elif backlog <= self.backlog_limit // 2:
+                # 当前帧已在缓冲里，补发会带上它，广播时跳过
+                self._catch_up(encoder, sid, behind)
+                self.viewers[sid] = None
+                skip.append(sid)
+            else:
+                skip.append(sid)
+        return skip
+
+    def _deliver(self, frame: dict) -> None:
+        # 在 FlowControl 的锁内调用，与 attach / watch 的补发互斥
+        if 'seq' in frame:
+            self._replay.append(frame)
+            if frame['status'] in _TERMINAL_STATUSES:
+                self._terminal.append(frame)
+        if self.viewers:
+            skip = self._lagging(self.flow.encoder, frame)
+            self._emit(frame, self.room, skip or None)
+        elif self.sid is not None:
+            self._emit(frame, self.sid)
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+def coalesce(events, min_interval: float = FRAME_INTERVAL, max_delay: float = FRAME_MAX_DELAY, stop_event=None):
+    """模型生成器与 socketio.emit 之间的合帧级。
+
+    生成器在独立线程里被抽干进队列，这里按帧预算重新分帧：
+    相邻同状态的增量（thinking / streaming 的 delta）拼成一帧，
+    两帧之间至少间隔 min_interval，任何增量最多滞留 max_delay 即刷出——
+    即使上游正卡在网络读上。其余事件（started/completed/error…）
+    先刷出积压的增量再原样透传，保证顺序。"""
+    q = queue.Queue()
+    closed = threading.Event()
+
+    def pump():
+        try:
+            for event in events:
+                q.put(event)
+                if closed.is_set() or (stop_event is not None and stop_event.is_set()):
+                    break
+        except Exception as e:
+            q.put(_Failure(e))
+        finally:
+            close = getattr(events, 'close', None)
+            if close is not None:
+                close()
+            q.put(_DONE)
+
+    threading.Thread(target=pump, daemon=True).start()
+
+    pending = []            # [[status, [delta, ...]], ...]，保持到达顺序
+    pending_since = 0.0
+    last_flush = 0.0
+
+    def flush():
+        nonlocal last_flush
+        merged = [StreamEvent(status, delta=''.join(parts)) for status, parts in pending]
+        if merged:
+            pending.clear()
+            last_flush = time.monotonic()
+        return merged
+
+    try:
+        while True:
+            timeout = None
+            if pending:
+                due = min(last_flush + min_interval, pending_since + max_delay)
+                timeout = max(0.0, due - time.monotonic())
+            try:
+                item = q.get(timeout=timeout)
+            except queue.Empty:
+                yield from flush()
+                continue
+
+            if item is _DONE:
+                yield from flush()
+                return
+            if isinstance(item, _Failure):
+                yield from flush()
+                raise item.error
+
+            status = item.status
+            delta = item.delta
+            if delta is None or status not in _DELTA_STATUSES:
+                yield from flush()
+                yield item
+                continue
+
+            if pending and pending[-1][0] == status:
+                pending[-1][1].append(delta)
+            else:
+                if not pending:
+                    pending_since = time.monotonic()
+                pending.append([status, [delta]])
+            if time.monotonic() - last_flush >= min_interval:
+                yield from flush()
+    finally:
+        closed.set()
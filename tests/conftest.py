@@ -0,0 +1,13 @@
+"""测试只覆盖不依赖各家 SDK 的模块：仓库根加入 sys.path，
+models 登记为只带路径的空包（不执行 models/__init__，免得连带导入 SDK）"""
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+if 'models' not in sys.modules:
+    _package = types.ModuleType('models')
+    _package.__path__ = [os.path.join(ROOT, 'models')]
+    sys.modules['models'] = _package
@@ -0,0 +1,114 @@
+import threading
+import time
+
+from blob import BLOB_MIN, BlobChannel
+
+CHUNK = 1024
+WINDOW = 2
+BACKLOG_LIMIT = 8
+TIMEOUT = 20
+
+
+class Harness:
+    """假的 emit / 待发包数 / 时钟；发送循环跑在真实后台线程里，断言前等它走到位"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.pending = 0            # 连接的 engine.io 待发包数
+        self.events = []
+        self.lock = threading.Lock()
+        self.channel = BlobChannel(
+            self.emit, backlog=lambda blob_sid: self.pending,
+            sleep=lambda seconds: time.sleep(0.001), clock=lambda: self.now,
+            chunk_size=CHUNK, window=WINDOW, backlog_limit=BACKLOG_LIMIT, timeout=TIMEOUT)
+        self.channel.bind('sid', 'blob-sid')
+
+    def emit(self, blob_sid, event, payload):
+        with self.lock:
+            self.events.append((event, payload))
+
+    def chunks(self):
+        with self.lock:
+            return [payload['index'] for event, payload in self.events if event == 'blob_chunk']
+
+    def aborts(self):
+        with self.lock:
+            return [payload['blob_id'] for event, payload in self.events if event == 'blob_abort']
+
+    def ack(self, blob_id, index):
+        self.channel.ack('blob-sid', blob_id, index)
+
+
+def wait_until(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.005)
+
+
+def settle():
+    """留出几轮发送循环，确认不该发的确实没发"""
+    time.sleep(0.15)
+
+
+def test_at_most_window_chunks_in_flight():
+    harness = Harness()
+    blob_id = harness.channel.send('sid', bytes(CHUNK * 5))
+    wait_until(lambda: len(harness.chunks()) == WINDOW)
+    settle()
+    assert harness.chunks() == [0, 1]
+
+    harness.ack(blob_id, 0)
+    wait_until(lambda: len(harness.chunks()) == 3)
+    settle()
+    assert harness.chunks() == [0, 1, 2]
+
+    for index in range(1, 5):
+        harness.ack(blob_id, index)
+        wait_until(lambda: len(harness.chunks()) == min(5, index + 1 + WINDOW))
+    wait_until(lambda: harness.channel.stats()['sent'] == 1)
+    assert harness.chunks() == [0, 1, 2, 3, 4]
+
+
+def test_pauses_above_backlog_limit_and_resumes_on_ack():
+    harness = Harness()
+    blob_id = harness.channel.send('sid', bytes(CHUNK * 3))
+    wait_until(lambda: len(harness.chunks()) == WINDOW)
+
+    # 答案帧积压：确认腾出了窗口也先不发
+    harness.pending = BACKLOG_LIMIT + 1
+    harness.ack(blob_id, 0)
+    settle()
+    assert harness.chunks() == [0, 1]
+
+    harness.pending = BACKLOG_LIMIT
+    wait_until(lambda: harness.chunks() == [0, 1, 2])
+
+
+def test_timeout_starts_at_first_chunk_not_enqueue():
+    harness = Harness()
+    first = harness.channel.send('sid', bytes(CHUNK))
+    second = harness.channel.send('sid', bytes(CHUNK))
+    wait_until(lambda: harness.chunks() == [0])
+
+    # 第二个传输排队期间过去的时间不算它的超时
+    harness.now = TIMEOUT * 0.9
+    harness.ack(first, 0)
+    wait_until(lambda: harness.chunks() == [0, 0])
+    harness.now = TIMEOUT * 1.5
+    settle()
+    assert harness.aborts() == []
+
+    # 从发出第一块起超过时限仍无确认才放弃
+    harness.now = TIMEOUT * 2
+    wait_until(lambda: harness.aborts() == [second])
+    assert harness.channel.stats() == {'sent': 1, 'aborted': 1, 'channels': {'sid': []}}
+
+
+def test_small_payload_or_unbound_connection_is_inlined():
+    harness = Harness()
+    payload = harness.channel.attach('sid', {}, bytes(BLOB_MIN - 1))
+    assert payload == {'image': bytes(BLOB_MIN - 1)}
+    payload = harness.channel.attach('other', {}, bytes(BLOB_MIN))
+    assert payload == {'image': bytes(BLOB_MIN)}
+    assert harness.events == []
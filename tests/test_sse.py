@@ -0,0 +1,32 @@
+from models.sse import SSEDecoder
+
+
+def decode(*chunks):
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.flush())
+    return [(event.event, event.data) for event in events]
+
+
+def test_lf_terminated():
+    assert decode(b'data: a\n\ndata: b\n\n') == [('message', 'a'), ('message', 'b')]
+
+
+def test_crlf_split_across_chunks():
+    assert decode(b'event: ping\r', b'\ndata: 1\r\n\r', b'\n') == [('ping', '1')]
+
+
+def test_cr_only_trailing_terminator():
+    # 最后的 \r 在 feed 时留待下一块判定，流结束时由 flush 分派
+    assert decode(b'data: a\r\r') == [('message', 'a')]
+    assert decode(b'data: a\r', b'\r') == [('message', 'a')]
+
+
+def test_missing_final_blank_line():
+    assert decode(b'data: a\n\ndata: b') == [('message', 'a'), ('message', 'b')]
+
+
+def test_multiline_data_and_comments():
+    assert decode(b': keepalive\ndata: x\ndata: y\n\n') == [('message', 'x\ny')]
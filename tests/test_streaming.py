@@ -0,0 +1,93 @@
+import zlib
+
+from models.base import StreamEvent
+from streaming import DeltaEncoder
+
+
+class Client:
+    """按 main.js decodeFrame 的规则还原两条流：offset 对不上或校验不符即视为漂移"""
+
+    def __init__(self):
+        self.streams = {'thinking': '', 'answer': ''}
+        self.statuses = []
+
+    def receive(self, frame) -> bool:
+        if not frame.get('stream'):
+            self.statuses.append(frame['status'])
+            return True
+        text = '' if frame.get('reset') else self.streams[frame['stream']]
+        if frame['offset'] != len(text.encode('utf-16-le')) // 2:
+            return False
+        full = text + frame['delta']
+        if 'adler32' in frame and zlib.adler32(full.encode('utf-8')) != frame['adler32']:
+            return False
+        self.streams[frame['stream']] = full
+        self.statuses.append(frame['status'])
+        return True
+
+
+def encode_all(encoder, events):
+    frames = []
+    for event in events:
+        frames.extend(encoder.encode(event))
+    return frames
+
+
+def test_drift_on_completed_frame_resyncs_to_terminal_snapshot():
+    encoder = DeltaEncoder()
+    frames = encode_all(encoder, [
+        StreamEvent('started'),
+        StreamEvent('thinking', '想'),
+        StreamEvent('thinking_complete', content='想'),
+        StreamEvent('streaming', '答'),
+        StreamEvent('streaming', '案'),
+        StreamEvent('completed', content='答案'),
+    ])
+    client = Client()
+    # 丢掉最后一个增量帧：客户端在 completed 帧上发现漂移，请求快照
+    for frame in frames[:-2]:
+        assert client.receive(frame)
+    assert not client.receive(frames[-1])
+
+    snapshot = encoder.snapshot()
+    assert [frame['status'] for frame in snapshot] == ['thinking_complete', 'completed']
+    for frame in snapshot:
+        assert client.receive(frame)
+    assert client.streams == {'thinking': '想', 'answer': '答案'}
+    assert client.statuses[-1] == 'completed'
+
+
+def test_snapshot_mid_stream_keeps_streaming_status():
+    encoder = DeltaEncoder()
+    encode_all(encoder, [StreamEvent('started'), StreamEvent('streaming', 'ab')])
+    assert [frame['status'] for frame in encoder.snapshot()] == ['streaming']
+
+
+def test_snapshot_of_empty_completed_answer():
+    encoder = DeltaEncoder()
+    encode_all(encoder, [StreamEvent('started'), StreamEvent('completed', content='')])
+    snapshot = encoder.snapshot()
+    assert [(frame['status'], frame['delta']) for frame in snapshot] == [('completed', '')]
+
+
+def test_resume_after_replay_rolled_over_does_not_replay_stale_terminal_frames():
+    from streaming import GenerationJob
+
+    sent = []
+    job = GenerationJob('j', 'a', 2, emit=lambda frame, target, skip=None: sent.append((target, frame)),
+                        replay_frames=4)
+    for event in [StreamEvent('started')] + [StreamEvent('streaming', c) for c in 'abcdef']:
+        job.flow.offer(event)
+    job.flow.offer(StreamEvent('completed', content='abcdef!'))
+    job.flow.offer(StreamEvent('stopped', content='生成已停止'))
+
+    # 新连接只收到了 started：缓冲已滚出，改发快照
+    sent.clear()
+    job.attach('b', last_seq=1)
+    frames = [frame for target, frame in sent if target == 'b']
+    assert [frame['status'] for frame in frames] == ['completed', 'stopped']
+
+    client = Client()
+    for frame in frames:
+        assert client.receive(frame)
+    assert client.streams['answer'] == 'abcdef!'
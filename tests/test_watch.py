@@ -0,0 +1,91 @@
+import pytest
+
+from watch import MAX_ERRORS, ScreenWatch
+
+BASE = 0
+PAGE_A = 0xFFFF           # 与 BASE 相差 16 位：实质变化
+PAGE_B = 0xFFFF0000       # 与 PAGE_A 相差 32 位：画面仍在变
+
+
+class Harness:
+    """假时钟：sleep 推进时间；指纹按脚本逐次返回，脚本用完即停止监视"""
+
+    def __init__(self, frames, busy=False, **options):
+        self.now = 0.0
+        self.frames = iter(frames)
+        self.triggers = []
+        self.statuses = []
+        self.watch = ScreenWatch(
+            self.fingerprint, self.trigger, lambda: busy, self.statuses.append,
+            spawn=lambda fn: fn(), sleep=self.sleep, clock=lambda: self.now,
+            interval=1.0, debounce=1.5, **options)
+
+    def fingerprint(self):
+        frame = next(self.frames, None)
+        if frame is None:
+            self.watch.stop()
+            return BASE
+        if isinstance(frame, Exception):
+            raise frame
+        return frame
+
+    def trigger(self):
+        self.triggers.append(self.now)
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def run(self):
+        self.watch.start()
+        return self.statuses[-1]
+
+
+def test_no_trigger_while_screen_keeps_changing():
+    harness = Harness([BASE] + [PAGE_A, PAGE_B] * 5)
+    assert harness.run()['reason'] == 'stopped'
+    assert harness.triggers == []
+
+
+def test_trigger_after_debounce_of_stable_screen():
+    # t=1 出现新画面开始计时，t=2 才稳定 1 秒，t=3 满 1.5 秒触发
+    harness = Harness([BASE, PAGE_A, PAGE_A, PAGE_A, PAGE_A])
+    harness.run()
+    assert harness.triggers == [3.0]
+    assert harness.watch.solved == 1
+
+
+def test_no_trigger_while_busy():
+    harness = Harness([BASE] + [PAGE_A] * 10, busy=True)
+    harness.run()
+    assert harness.triggers == []
+
+
+def test_min_gap_between_triggers():
+    harness = Harness([BASE] + [PAGE_A] * 4 + [PAGE_B] * 20, min_gap=10)
+    harness.run()
+    assert harness.triggers == [3.0, 13.0]
+
+
+def test_stops_when_budget_is_used():
+    harness = Harness([BASE] + [PAGE_A] * 4 + [PAGE_B] * 20, budget=1)
+    status = harness.run()
+    assert status['state'] == 'stopped' and status['reason'] == 'budget'
+    assert harness.triggers == [3.0]
+
+
+def test_stops_after_max_duration():
+    harness = Harness([BASE] + [PAGE_A, PAGE_B] * 10, max_duration=5)
+    assert harness.run()['reason'] == 'timeout'
+    assert harness.watch.polls == 6
+
+
+@pytest.mark.parametrize('recover', [False, True])
+def test_stops_after_consecutive_fingerprint_errors(recover):
+    failures = [OSError('截屏失败')] * (MAX_ERRORS - 1)
+    if recover:
+        # 中间成功一次则重新计数，不会停
+        frames = [BASE] + failures + [BASE] + failures
+    else:
+        frames = [BASE] + failures + [OSError('截屏失败')]
+    status = Harness(frames).run()
+    assert status['reason'] == ('stopped' if recover else 'error')
@@ -0,0 +1,125 @@
+"""监视模式：屏幕内容有实质变化时自动截图解题
+
+翻页刷题时不必每页手动截：按 WATCH_INTERVAL 轮询屏幕（或记住的区域）的 64 位 dHash
+（截屏进程里算，像素不出子进程），与上次解题时的画面相差超过 CHANGE_BITS 位算实质变化；
+变化后画面还要稳定 WATCH_DEBOUNCE 秒（相邻两次相差不超过 STABLE_BITS 位）才触发，
+翻页动画、滚动途中不会误截。开启时的画面作为基准，不自动解。
+防失控：上一题还在生成时不触发；两次自动解题至少间隔 min_gap 秒；
+每次开启最多解 budget 题，监视最长 max_duration 秒，截屏连续失败 MAX_ERRORS 次即停。
+"""
+import itertools
+import threading
+import time
+
+# 轮询间隔与防抖时长（秒）
+WATCH_INTERVAL = 1.0
+WATCH_DEBOUNCE = 1.5
+# dHash 相差位数阈值：超过 CHANGE_BITS 算换了内容，不超过 STABLE_BITS 算画面已稳定
+CHANGE_BITS = 10
+STABLE_BITS = 3
+# 自动解题的最小间隔（秒）、每次开启的题数预算及其上限、最长监视时长（秒）
+WATCH_MIN_GAP = 15
+WATCH_BUDGET = 20
+WATCH_MAX_BUDGET = 100
+WATCH_MAX_DURATION = 2 * 60 * 60
+MAX_ERRORS = 3
+
+_ids = itertools.count(1)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class ScreenWatch:
+    """一个连接的监视会话。
+    fingerprint() 返回当前画面 dHash；trigger() 截图并发起解题；busy() 为真时不触发；
+    notify(status) 下发状态；spawn(fn) 启动后台线程，sleep(seconds) 让出调度，clock() 取单调时间"""
+
+    def __init__(self, fingerprint, trigger, busy, notify, spawn=None, sleep=time.sleep, clock=time.monotonic,
+                 interval: float = WATCH_INTERVAL, debounce: float = WATCH_DEBOUNCE,
+                 min_gap: float = WATCH_MIN_GAP, budget: int = WATCH_BUDGET,
+                 max_duration: float = WATCH_MAX_DURATION):
+        self.fingerprint = fingerprint
+        self.trigger = trigger
+        self.busy = busy
+        self.notify = notify
+        self.spawn = spawn or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.sleep = sleep
+        self.clock = clock
+        self.interval = interval
+        self.debounce = debounce
+        self.min_gap = max(WATCH_MIN_GAP / 3, min_gap)
+        self.budget = max(1, min(int(budget), WATCH_MAX_BUDGET))
+        self.max_duration = max_duration
+        self.watch_id = next(_ids)   # 客户端据此丢弃已被顶替的旧会话的状态
+        self.solved = 0
+        self.polls = 0
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self.spawn(self._run)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def status(self, state: str, reason: str = None) -> dict:
+        status = {'id': self.watch_id, 'state': state, 'solved': self.solved, 'budget': self.budget, 'polls': self.polls}
+        if reason:
+            status['reason'] = reason
+        return status
+
+    def _run(self) -> None:
+        started = self.clock()
+        last_trigger = -self.min_gap
+        errors = 0
+        baseline = candidate = None
+        candidate_since = 0.0
+        reason = 'stopped'
+        self.notify(self.status('watching'))
+        while not self._stop.is_set():
+            now = self.clock()
+            if now - started > self.max_duration:
+                reason = 'timeout'
+                break
+            try:
+                current = self.fingerprint()
+                errors = 0
+            except Exception as e:
+                errors += 1
+                print(f"监视模式截屏失败（{errors}/{MAX_ERRORS}）: {e}")
+                if errors >= MAX_ERRORS:
+                    reason = 'error'
+                    break
+                self.sleep(self.interval)
+                continue
+            self.polls += 1
+
+            if baseline is None or hamming(current, baseline) <= CHANGE_BITS:
+                # 开启时的画面作基准；回到与上次解题相同的画面也不算变化
+                baseline = current if baseline is None else baseline
+                candidate = None
+            elif candidate is None or hamming(current, candidate) > STABLE_BITS:
+                # 变化还在进行（翻页动画、滚动）：重新计时
+                candidate, candidate_since = current, now
+            elif now - candidate_since >= self.debounce and now - last_trigger >= self.min_gap and not self.busy():
+                try:
+                    self.trigger()
+                except Exception as e:
+                    print(f"监视模式自动解题失败: {e}")
+                    reason = 'error'
+                    break
+                self.solved += 1
+                last_trigger = now
+                baseline, candidate = current, None
+                self.notify(self.status('triggered'))
+                if self.solved >= self.budget:
+                    reason = 'budget'
+                    break
+            self.sleep(self.interval)
+        self._stop.set()
+        self.notify(self.status('stopped', reason))
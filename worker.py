@@ -0,0 +1,458 @@
+"""截屏工作进程：截屏、编码、感知哈希放进独立进程，原始像素经共享内存环交给 Web 进程
+
+Web 进程里压一张 4K 截图要占着 GIL 几百毫秒（PIL 的量化、打包等环节不释放 GIL），
+期间其他连接的流式输出都跟着卡顿。现在截屏、像素格式转换、预览编码、dHash 全在子进程里做，
+之后对这张图的编码也按槽位交给子进程（像素就在它写的共享内存段里）：
+- 父进程为每次截图租出环上的一个槽位，子进程把原始像素（RGBX，4 字节/像素）写进该槽的
+  共享内存段；段不够大时子进程换一段更大的（新名字），父进程按名字重新映射；
+- 父进程用 Image.frombuffer 直接映射共享内存（RGBX 是 PIL 可零拷贝映射的模式），
+  截图存储持有这份映射，不再复制整帧（子进程不可用时本进程的切块、预处理就读它）；
+- 原分辨率切块（Frame.encode）与送模型前的裁白、按约束编码（Frame.prepare）凭槽位号在子进程里做，
+  只回编码结果；子进程重启过、槽位已失效时退回本进程，读父进程自己的映射；
+- 槽位在截图存储持有期间不会被覆盖，淘汰时归还；没有空槽时（不应发生）像素随回复发来，之后的编码也在本进程；
+- 实时画面的缩放、按块比对与变化块编码（live.LiveSampler）整个在子进程里跑，只回变化块；
+  监视模式与预取只取 dHash，不传像素。
+子进程用 subprocess 只跑本文件（不经 multiprocessing 的 spawn 重新导入 app.py），
+经 multiprocessing.connection 通信；意外退出时挂起的请求报错，下一次请求自动重启。
+SNAPSOLVER_CAPTURE_WORKER=0 关闭，回到进程内截屏（编码仍在编码池线程里）。
+"""
+import collections
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+from multiprocessing.connection import Client, Listener
+
+from PIL import Image
+
+from store import MAX_SCREENSHOTS
+
+WORKER_ENV = 'SNAPSOLVER_CAPTURE_WORKER'
+_ADDRESS_ENV = 'SNAPSOLVER_WORKER_ADDRESS'
+_AUTHKEY_ENV = 'SNAPSOLVER_WORKER_AUTHKEY'
+
+# 环上的槽位数：截图存储最多持有 MAX_SCREENSHOTS 张，多留两个给正在截的、一个给预取的
+RING_SLOTS = MAX_SCREENSHOTS + 3
+# 子进程启动（含试截一帧）与单次请求的超时（秒）
+STARTUP_TIMEOUT = 20
+REQUEST_TIMEOUT = 15
+
+
+def dhash(img: Image.Image, size: int = 8) -> int:
+    """size² 位差值哈希：缩成 (size+1)×size 灰度，逐行比较相邻像素，画面没变则哈希不变。
+    缺省 64 位只看版面；预取校验用更细的 size，换了几行字也能分辨"""
+    small = img.resize((size + 1, size), Image.Resampling.BILINEAR, reducing_gap=2.0).convert('L')
+    px = small.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            i = row * (size + 1) + col
+            bits = (bits << 1) | (px[i] > px[i + 1])
+    return bits
+
+
+def grab_region(backend, monitor=None, region=None):
+    """截第 monitor 个显示器（缺省主屏）或其中的 region，返回 (PIL.Image, 截图在该显示器内的左上角)"""
+    if monitor is None and not region:
+        return backend.grab(), (0, 0)
+    box = backend.resolve(monitor, region)
+    screen = next(m for m in backend.monitors() if m['index'] == (monitor or 1))
+    return backend.grab(box), (box[0] - screen['left'], box[1] - screen['top'])
+
+
+def _region(img: Image.Image, box=None) -> Image.Image:
+    return img.crop(box) if box else img
+
+
+def _encode_region(img: Image.Image, box=None, format=None):
+    from encode import encode_image
+    return encode_image(_region(img, box), format)
+
+
+def _prepare_region(img: Image.Image, box=None, trim: bool = True, constraints: dict = None):
+    from preprocess import prepare_image
+    return prepare_image(_region(img, box), trim, constraints)
+
+
+class Frame:
+    """一次截图：image 为原始像素（工作进程下是共享内存上的零拷贝映射），
+    preview 为编码好的预览，release() 归还槽位（截图存储淘汰时调用）。
+    encode() / prepare() 在工作进程下交给子进程，调用期间槽位须保持租出（截图存储钉住条目）"""
+    __slots__ = ('image', 'origin', 'preview', 'dhash', 'capture_ms', '_release', '_segment', '_remote')
+
+    def __init__(self, image, origin, preview, dhash, capture_ms, release=None, segment=None, remote=None):
+        self.image = image
+        self.origin = origin
+        self.preview = preview
+        self.dhash = dhash
+        self.capture_ms = capture_ms
+        self._release = release
+        self._segment = segment     # 持有共享内存段，映射在 image 存活期间有效
+        self._remote = remote       # remote(op, *args)：对本槽位的子进程请求
+
+    def _call_remote(self, op, *args):
+        if self._remote is not None:
+            try:
+                return True, self._remote(op, *args)
+            except RuntimeError as e:
+                print(f"截屏进程 {op} 失败，改在本进程做: {e}")
+        return False, None
+
+    def encode(self, box=None, format=None):
+        """原图 box 区域（缺省整张）按内容编码，返回 EncodedImage"""
+        done, result = self._call_remote('encode', box, format)
+        return result if done else _encode_region(self.image, box, format)
+
+    def prepare(self, box=None, trim: bool = True, constraints: dict = None):
+        """原图 box 区域送模型前的预处理，返回同 preprocess.prepare_image"""
+        done, result = self._call_remote('prepare', box, trim, constraints)
+        return result if done else _prepare_region(self.image, box, trim, constraints)
+
+    def release(self) -> None:
+        # 先放掉映射上的图，段对象之后被回收时才能干净地关闭
+        self.image = None
+        self._remote = None
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+
+class LocalCapture:
+    """进程内截屏，接口同 CaptureWorker"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.backend_name = backend.name
+        self._live = None
+
+    def monitors(self) -> list:
+        return self.backend.monitors()
+
+    def capture(self, monitor=None, region=None) -> Frame:
+        from encode import encode_preview
+        start = time.perf_counter()
+        image, origin = grab_region(self.backend, monitor, region)
+        capture_ms = (time.perf_counter() - start) * 1000
+        return Frame(image, origin, encode_preview(image), dhash(image), capture_ms)
+
+    def live_sample(self, max_edge: int, tile_size: int, reset: bool = False):
+        self._live = _live_sampler(self._live, self.backend, max_edge, tile_size)
+        return self._live.sample(reset)
+
+    def fingerprint(self, monitor=None, region=None, size: int = 8) -> int:
+        return dhash(grab_region(self.backend, monitor, region)[0], size)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+class CaptureWorker:
+    """父进程一侧：管理截屏子进程与共享内存环"""
+
+    def __init__(self, slots: int = RING_SLOTS):
+        self.slots = slots
+        self.backend_name = None
+        self._lock = threading.Lock()       # 启动子进程 / 发请求
+        self._conn = None
+        self._proc = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._ring_lock = threading.Lock()
+        self._free = collections.deque(range(slots))    # 空闲槽位，先还的后用
+        self._segments = {}     # 槽位 → 已映射的 SharedMemory
+
+    # ---------- 子进程生命周期 ----------
+    def start(self) -> None:
+        with self._lock:
+            self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._conn is not None and self._proc.poll() is None:
+            return
+        authkey = os.urandom(32)
+        listener = Listener(authkey=authkey)
+        env = dict(os.environ, **{_ADDRESS_ENV: str(listener.address), _AUTHKEY_ENV: authkey.hex()})
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env)
+        accepted = {}
+        # accept 没有超时参数：放到线程里等，子进程起不来时关掉监听让它返回
+        acceptor = threading.Thread(target=lambda: accepted.update(conn=_accept(listener)), daemon=True)
+        acceptor.start()
+        acceptor.join(STARTUP_TIMEOUT)
+        listener.close()
+        conn = accepted.get('conn')
+        if conn is None or not conn.poll(STARTUP_TIMEOUT):
+            proc.kill()
+            raise RuntimeError('截屏进程启动超时')
+        hello = conn.recv()
+        self.backend_name = hello['backend']
+        self._conn, self._proc = conn, proc
+        self._pending = {}
+        # 旧子进程的段已随之失效；还在用的帧各自持有自己的映射
+        with self._ring_lock:
+            self._free = collections.deque(range(self.slots))
+            self._segments = {}
+        threading.Thread(target=self._read_loop, args=(conn, self._pending), daemon=True,
+                         name='capture-worker-reader').start()
+        print(f"截屏进程已启动: pid {proc.pid}, 后端 {self.backend_name}")
+
+    def _read_loop(self, conn, pending) -> None:
+        while True:
+            try:
+                req_id, ok, result = conn.recv()
+            except (EOFError, OSError):
+                break
+            future = pending.pop(req_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+        with self._lock:
+            if self._conn is conn:
+                self._conn = None
+        for future in list(pending.values()):
+            future.set_exception(RuntimeError('截屏进程已退出'))
+        pending.clear()
+
+    def _call(self, op, *args, timeout: float = REQUEST_TIMEOUT):
+        future = Future()
+        with self._lock:
+            self._ensure_started()
+            req_id = next(self._ids)
+            pending = self._pending
+            pending[req_id] = future
+            self._conn.send((op, req_id) + args)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            pending.pop(req_id, None)
+            # 卡住的子进程直接杀掉，下次请求重启
+            with self._lock:
+                if self._proc is not None:
+                    self._proc.kill()
+            raise RuntimeError(f'截屏进程无响应（{op}）')
+
+    def close(self) -> None:
+        with self._lock:
+            conn, proc, self._conn = self._conn, self._proc, None
+        if conn is not None:
+            try:
+                conn.send(('stop', 0))
+                proc.wait(2)
+            except Exception:
+                proc.kill()
+            conn.close()
+
+    # ---------- 共享内存环 ----------
+    def _lease(self):
+        with self._ring_lock:
+            return self._free.popleft() if self._free else None
+
+    def _give_back(self, slot, generation) -> None:
+        with self._ring_lock:
+            # 子进程重启后槽位已重置，旧帧的归还作废
+            if generation is self._segments and slot not in self._free:
+                self._free.append(slot)
+
+    def _map(self, slot, name):
+        with self._ring_lock:
+            segment = self._segments.get(slot)
+            if segment is None or segment.name != name.lstrip('/'):
+                # 子进程换了更大的段；旧映射若还有帧在用，由那些帧持有，这里只是不再复用
+                segment = self._segments[slot] = _attach(name)
+            return segment, self._segments
+
+    # ---------- 对外接口 ----------
+    def monitors(self) -> list:
+        return self._call('monitors')
+
+    def capture(self, monitor=None, region=None) -> Frame:
+        slot = self._lease()
+        try:
+            reply = self._call('capture', slot, monitor, region)
+        except Exception:
+            if slot is not None:
+                with self._ring_lock:
+                    self._free.append(slot)
+            raise
+        width, height = reply['size']
+        if slot is None:
+            image = Image.frombuffer('RGBX', (width, height), reply['data'], 'raw', 'RGBX', 0, 1)
+            segment = release = remote = None
+        else:
+            segment, generation = self._map(slot, reply['segment'])
+            image = Image.frombuffer('RGBX', (width, height), segment.buf[:width * height * 4], 'raw', 'RGBX', 0, 1)
+            release = lambda: self._give_back(slot, generation)
+            target = (slot, reply['segment'], (width, height))
+            remote = lambda op, *args: self._slot_call(generation, op, target, *args)
+        return Frame(image, reply['origin'], reply['preview'], reply['dhash'], reply['capture_ms'],
+                     release=release, segment=segment, remote=remote)
+
+    def _slot_call(self, generation, op, target, *args):
+        # 子进程重启后旧段已被 unlink，新进程里同号槽位是别的图
+        with self._ring_lock:
+            if generation is not self._segments:
+                raise RuntimeError('截屏进程已重启，槽位失效')
+        return self._call(op, target, *args)
+
+    def live_sample(self, max_edge: int, tile_size: int, reset: bool = False):
+        """实时画面采一帧（同 LiveSampler.sample），缩放、比对、编码都在子进程"""
+        return self._call('live', max_edge, tile_size, reset)
+
+    def fingerprint(self, monitor=None, region=None, size: int = 8) -> int:
+        """只取画面的 dHash，像素不出子进程"""
+        return self._call('fingerprint', monitor, region, size)
+
+
+class _Mapped(shared_memory.SharedMemory):
+    """父进程对子进程共享内存段的映射"""
+
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            pass    # 还有图映射着这段内存，随最后一个视图释放
+
+
+def _attach(name):
+    """映射子进程创建的段。段归子进程所有：不让本进程的 resource_tracker 登记，
+    否则退出时会去 unlink 别人的段并报泄漏"""
+    try:
+        return _Mapped(name=name, track=False)    # 3.13+
+    except TypeError:
+        pass
+    segment = _Mapped(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    except Exception:
+        pass
+    return segment
+
+
+def _accept(listener):
+    try:
+        return listener.accept()
+    except OSError:
+        return None
+
+
+def start_capture_service():
+    """按 SNAPSOLVER_CAPTURE_WORKER 启动截屏服务；子进程起不来时回落进程内截屏"""
+    from capture import select_backend
+    if os.environ.get(WORKER_ENV, '1').strip() not in ('0', 'false', 'no'):
+        worker = CaptureWorker()
+        try:
+            worker.start()
+            return worker
+        except Exception as e:
+            print(f"截屏进程不可用，改为进程内截屏: {e}")
+    return LocalCapture(select_backend())
+
+
+# ---------- 子进程 ----------
+def _capture(backend, segments, names, slot, monitor, region) -> dict:
+    from encode import encode_preview
+    start = time.perf_counter()
+    image, origin = grab_region(backend, monitor, region)
+    capture_ms = (time.perf_counter() - start) * 1000
+    width, height = image.size
+    reply = {
+        'size': (width, height),
+        'origin': origin,
+        'capture_ms': capture_ms,
+        'preview': encode_preview(image),
+        'dhash': dhash(image),
+    }
+    # RGB 直接打包成 RGBX 写入，父进程按 RGBX 零拷贝映射
+    pixels = image.tobytes('raw', 'RGBX')
+    if slot is None:
+        reply['data'] = pixels
+        return reply
+    segment = segments.get(slot)
+    if segment is None or segment.size < len(pixels):
+        if segment is not None:
+            segment.close()
+            segment.unlink()
+        # macOS 的共享内存名最长 31 字符
+        segment = segments[slot] = shared_memory.SharedMemory(
+            name=f'ss{os.getpid()}_{slot}_{next(names)}', create=True, size=len(pixels)
+        )
+    segment.buf[:len(pixels)] = pixels
+    reply['segment'] = segment.name
+    return reply
+
+
+def _slot_image(segments, target) -> Image.Image:
+    """父进程租出的槽位上那张图（只读映射；调用方用完即丢，段才能在换大时关闭）"""
+    slot, name, (width, height) = target
+    segment = segments.get(slot)
+    if segment is None or segment.name != name:
+        raise ValueError(f'槽位 {slot} 已失效')
+    return Image.frombuffer('RGBX', (width, height), segment.buf[:width * height * 4], 'raw', 'RGBX', 0, 1)
+
+
+def _live_sampler(sampler, backend, max_edge: int, tile_size: int):
+    """复用实时画面采样器（保留上一帧）；参数变了换一个"""
+    from live import LiveSampler
+    from encode import encode_image
+    if sampler is None or sampler.max_edge != max_edge or sampler.differ.tile_size != tile_size:
+        sampler = LiveSampler(backend.grab, encode_image, max_edge, tile_size)
+    return sampler
+
+
+def _serve() -> None:
+    from capture import select_backend
+    address = os.environ[_ADDRESS_ENV]
+    conn = Client(address, authkey=bytes.fromhex(os.environ[_AUTHKEY_ENV]))
+    backend = select_backend()
+    conn.send({'backend': backend.name})
+    segments = {}
+    names = itertools.count()
+    live = None
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                break   # 父进程退出
+            op, req_id, args = message[0], message[1], message[2:]
+            if op == 'stop':
+                break
+            try:
+                if op == 'monitors':
+                    result = backend.monitors()
+                elif op == 'capture':
+                    result = _capture(backend, segments, names, *args)
+                elif op == 'encode':
+                    target, box, format = args
+                    result = _encode_region(_slot_image(segments, target), box, format)
+                elif op == 'prepare':
+                    target, box, trim, constraints = args
+                    result = _prepare_region(_slot_image(segments, target), box, trim, constraints)
+                elif op == 'live':
+                    max_edge, tile_size, reset = args
+                    live = _live_sampler(live, backend, max_edge, tile_size)
+                    result = live.sample(reset)
+                elif op == 'fingerprint':
+                    monitor, region, size = args
+                    result = dhash(grab_region(backend, monitor, region)[0], size)
+                else:
+                    raise ValueError(f'未知请求: {op}')
+                conn.send((req_id, True, result))
+            except Exception as e:
+                conn.send((req_id, False, str(e)))
+    finally:
+        for segment in segments.values():
+            segment.close()
+            segment.unlink()
+        backend.close()
+
+
+if __name__ == '__main__':
+    _serve()